@@ -0,0 +1,149 @@
+import os
+import time
+from collections import deque
+
+# ============================== #
+#   Adaptive quality controller  #
+# ============================== #
+# Recording runs at TARGET_FPS and is never degraded. When the detector loop
+# gets close to its frame budget, misses deadlines, or the CPU is saturated
+# (a transcode, many viewers, other cameras), the controller gives up preview
+# quality one step at a time, cheapest loss first:
+#   1. live view FPS  2. live view JPEG quality  3. motion detection resolution
+# and restores them in reverse order once the load has stayed low for a few
+# intervals. Every change is logged and handed to `on_adjust`.
+PREVIEW_FPS = 'preview_fps'
+JPEG_QUALITY = 'jpeg_quality'
+MOTION_WIDTH = 'motion_width'
+KNOBS = (PREVIEW_FPS, JPEG_QUALITY, MOTION_WIDTH)   # Degradation order
+
+BUSY_HIGH = 0.85     # Share of the frame budget spent processing that counts as overload
+BUSY_LOW = 0.60      # ...and as comfortably idle
+MISSED_HIGH = 0.10   # Share of loop iterations that overran their deadline
+MISSED_LOW = 0.02
+
+
+class CpuSampler:
+    """System-wide CPU use between two calls, from /proc/stat (load average elsewhere)"""
+
+    def __init__(self):
+        self.last = self._read()
+
+    @staticmethod
+    def _read():
+        try:
+            with open('/proc/stat') as file:
+                values = [int(value) for value in file.readline().split()[1:]]
+            idle = values[3] + (values[4] if len(values) > 4 else 0)   # idle + iowait
+            return idle, sum(values)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def sample(self):
+        current = self._read()
+        if current is None or self.last is None:
+            try:
+                return min(1.0, os.getloadavg()[0] / (os.cpu_count() or 1))
+            except OSError:
+                return 0.0
+        idle = current[0] - self.last[0]
+        total = current[1] - self.last[1]
+        self.last = current
+        return 1.0 - idle / total if total > 0 else 0.0
+
+
+def read_cpu_temperature():
+    """SoC temperature in °C, None where the thermal zone is not exposed"""
+    try:
+        with open('/sys/class/thermal/thermal_zone0/temp') as file:
+            return int(file.read().strip()) / 1000
+    except (OSError, ValueError):
+        return None
+
+
+class AdaptiveController:
+    def __init__(self, preview_fps, jpeg_quality, motion_width, min_preview_fps, min_jpeg_quality,
+                 min_motion_width, cpu_high, cpu_low, recover_after=3, name='', on_adjust=None):
+        self.maximum = {PREVIEW_FPS: preview_fps, JPEG_QUALITY: jpeg_quality, MOTION_WIDTH: motion_width}
+        self.minimum = {PREVIEW_FPS: min(min_preview_fps, preview_fps),
+                        JPEG_QUALITY: min(min_jpeg_quality, jpeg_quality),
+                        MOTION_WIDTH: min(min_motion_width, motion_width)}
+        self.settings = dict(self.maximum)
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.recover_after = recover_after
+        self.name = name
+        self.on_adjust = on_adjust
+        self.calm_intervals = 0
+        self.adjustments = deque(maxlen=50)
+
+    def __getitem__(self, knob):
+        return self.settings[knob]
+
+    @staticmethod
+    def _lower(knob, value):
+        if knob == PREVIEW_FPS:
+            return int(value * 0.75)
+        if knob == JPEG_QUALITY:
+            return value - 10
+        return int(value * 0.75) // 16 * 16   # Motion width, keep it a multiple of 16
+
+    @staticmethod
+    def _raise(knob, value):
+        if knob == PREVIEW_FPS:
+            return int(value / 0.75) + 1
+        if knob == JPEG_QUALITY:
+            return value + 10
+        return (int(value / 0.75) + 15) // 16 * 16
+
+    def update(self, busy, missed, cpu_load):
+        """One control step from loop utilization, deadline misses and CPU use (all 0..1)"""
+        reason = f"loop {busy:.0%} busy, {missed:.0%} late, CPU {cpu_load:.0%}"
+        if busy > BUSY_HIGH or missed > MISSED_HIGH or cpu_load > self.cpu_high:
+            self.calm_intervals = 0
+            for knob in KNOBS:
+                if self.settings[knob] > self.minimum[knob]:
+                    return self._set(knob, max(self.minimum[knob], self._lower(knob, self.settings[knob])), reason)
+        elif busy < BUSY_LOW and missed < MISSED_LOW and cpu_load < self.cpu_low:
+            self.calm_intervals += 1
+            if self.calm_intervals >= self.recover_after:
+                self.calm_intervals = 0
+                for knob in reversed(KNOBS):
+                    if self.settings[knob] < self.maximum[knob]:
+                        return self._set(knob, min(self.maximum[knob], self._raise(knob, self.settings[knob])), reason)
+        else:
+            self.calm_intervals = 0
+        return None
+
+    def _set(self, knob, value, reason):
+        adjustment = {"time": time.time(), "knob": knob, "old": self.settings[knob], "new": value, "reason": reason}
+        self.settings[knob] = value
+        self.adjustments.append(adjustment)
+        arrow = "⬇️" if value < adjustment["old"] else "⬆️"
+        print(f"🎛️ {self.name} {arrow} {knob} {adjustment['old']} → {value} ({reason})")
+        if self.on_adjust is not None:
+            self.on_adjust(adjustment)
+        return adjustment
+
+
+class FanController:
+    """Fan duty follows SoC temperature between a floor and full speed"""
+
+    def __init__(self, rpi, min_duty, max_duty, temp_low, temp_high):
+        self.rpi = rpi
+        self.min_duty = min_duty
+        self.max_duty = max_duty
+        self.temp_low = temp_low
+        self.temp_high = temp_high
+        self.duty = min_duty
+
+    def update(self, temperature):
+        if temperature is None:
+            return self.duty
+        ratio = min(1.0, max(0.0, (temperature - self.temp_low) / (self.temp_high - self.temp_low)))
+        duty = int(round(self.min_duty + ratio * (self.max_duty - self.min_duty)))
+        if abs(duty - self.duty) >= 5 or (duty != self.duty and duty in (self.min_duty, self.max_duty)):
+            print(f"🌀 Fan duty {self.duty}% → {duty}% at {temperature:.1f}°C")
+            self.duty = duty
+            self.rpi.set_fan_duty(duty)
+        return self.duty
@@ -3,11 +3,10 @@
 from flask import Flask, request, jsonify, send_file, Response, session
 from flask import render_template_string, redirect, url_for     # For block IP
 from flask import send_from_directory, abort
-from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail, Message
 from flask_session import Session
 from flask_socketio import SocketIO, emit
-import logging, os, cv2, threading, time
+import logging, os, signal, threading, time
 from datetime import datetime
 from dotenv import load_dotenv
 from flask_cors import CORS
@@ -15,81 +14,115 @@ import config
 import threading
 # To store armed state into json file
 from state_manager import get_armed_status, set_armed_status, get_motion_sensitivity, set_motion_sensitivity
+from state_manager import add_listener, camera_settings as resolve_camera_settings
+import state_manager
+from settings_channel import SharedSettings
+from heartbeat import Heartbeat
 import multiprocessing
 from detector_service import detector_service  # Import function from `detector_service.py`
-import requests
+from frame_buffer import SharedFrameBuffer
+from stream_hub import FrameHub, make_tier, load_encoder
+from live_h264 import H264LiveStream
+from recorder import ffmpeg_available, recover_clip
+from clip_files import default_camera_id, parse_clip_filename, make_clip_folders
+from models import db, User, Clip, LoginAttempt
+from http_range import send_file_ranges
+import thumbnails
+from notifications import NotificationBridge
+import metrics
+from metrics import MetricsCollector
+from cooperative import is_gevent, run_blocking
+from clip_catalog import add_clip, remove_clip, query_clips, clip_to_dict, parse_time, reconcile_clips
+from clip_catalog import upgrade_clip_table
+from motion_timeline import load_timeline, timeline_filename_for
+from storage import StorageManager, delete_clip_files
+import startup
 import time
 
-load_dotenv()
-
-# Initialize Flask app and SocketIO
+# Flask app and SocketIO, configured by create_app() (importing this module starts nothing)
 app = Flask(__name__, static_folder='build')
-socketio = SocketIO(app, cors_allowed_origins="*")
-
-# Suppress Flask's default HTTP request logs
-log = logging.getLogger('werkzeug')
-log.setLevel(logging.ERROR)  # Suppress non-critical logs
-
-# Flask Session Configuration
-app.secret_key = 'super-secret-key'  # Required for session security
-app.config['SESSION_TYPE'] = 'filesystem'  # Store session data on the server
-app.config['SESSION_PERMANENT'] = True
-app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # Session expiry in seconds (e.g., 1 hour)
-Session(app)  # Initialize Flask-Session
-external_ip = os.getenv('EXTERNAL_IP')
-print(f"External IP: {external_ip}")
-CORS(app)
-#CORS(app, origins=['http://'+external_ip+':3000'])
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSKEY')
-app.default_sender = os.getenv('MAIL_USERNAME')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-app.secret_key = os.getenv('SECRET_KEY')
-#print(f"SECRET KEY: {app.secret_key}")
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///login_attempts.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db = SQLAlchemy(app)
-mail = Mail(app)
+socketio = SocketIO()
+mail = Mail()
 
 sendNotification = False # Notification state
 
-# Queue to receive frames from `detector_service.py`
-frame_queue = multiprocessing.Queue(maxsize=100)
-notification_queue = multiprocessing.Queue(maxsize=50)
-# Shared event flag
-streaming_enabled_event = multiprocessing.Event()
-
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(50), unique=True, nullable=False)
-    password = db.Column(db.String(50), nullable=False)
-    email = db.Column(db.String(100), nullable=False)
-
-class Clip(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    file_path = db.Column(db.String(200), nullable=False)
-    date = db.Column(db.String(50), nullable=False)
-    time = db.Column(db.String(50), nullable=False)
-
-
+# Shared with the detector processes, created by create_app()
+notification_queue = None
+# Metric snapshots pushed by the detector processes, merged into GET /metrics
+metrics_queue = None
+metrics_collector = None
+DETECTOR_RESTARTS = metrics.registry.counter('surveillance_detector_restarts_total', 'Detector processes restarted after exiting or hanging')
+DETECTOR_FAILURES = metrics.registry.counter('surveillance_detector_failures_total', 'Detector processes found dead or hung, by the stage they stopped in')
+DETECTOR_RECOVERY = metrics.registry.histogram('surveillance_detector_recovery_seconds', 'Time from a failed detector\'s last progress to its replacement\'s first frame (MTTR)')
+RECOVERED_CLIPS = metrics.registry.counter('surveillance_recovered_clips_total', 'Clips finished by the watchdog after their detector failed')
+DETECTOR_UP = metrics.registry.gauge('surveillance_detector_up', 'Whether the detector process of a camera is alive')
+STREAM_VIEWERS = metrics.registry.gauge('surveillance_stream_viewers', 'Connected live view clients')
+STREAM_FRAMES = metrics.registry.counter('surveillance_stream_frames_total', 'Live frames fanned out to viewers')
+STREAM_DROPPED = metrics.registry.counter('surveillance_stream_dropped_frames_total', 'Live frames skipped by slow viewers')
+TIER_VIEWERS = metrics.registry.gauge('surveillance_stream_tier_viewers', 'Live view clients per quality tier')
+TIER_FRAMES = metrics.registry.counter('surveillance_stream_tier_frames_total', 'Frames encoded per quality tier')
+TIER_BYTES = metrics.registry.counter('surveillance_stream_tier_bytes_total', 'Encoded bytes per quality tier (sent once per viewer)')
+H264_VIEWERS = metrics.registry.gauge('surveillance_live_h264_viewers', 'H.264 live view clients')
+H264_BYTES = metrics.registry.counter('surveillance_live_h264_bytes_total', 'H.264 live fragments produced (sent once per viewer)')
+TIER_CPU = metrics.registry.counter('surveillance_stream_tier_encode_cpu_seconds_total', 'Encode CPU time per quality tier')
+NOTIFY_QUEUE_DEPTH = metrics.registry.gauge('surveillance_notification_queue_depth', 'Detector events waiting for the web server')
+NOTIFY_LATENCY = metrics.registry.histogram('surveillance_notification_latency_seconds', 'Time from detector event to Socket.IO emit')
+THUMBNAIL_CACHE = metrics.registry.gauge('surveillance_thumbnail_cache', 'Snapshot cache bytes, hits and misses')
+STARTUP_SECONDS = metrics.registry.gauge('surveillance_startup_seconds', 'Seconds from process start to each startup milestone')
+
+class CameraChannel:
+    """Everything the web server shares with the detector process of one camera"""
+    def __init__(self, camera_config, core=None):
+        self.id = camera_config["id"]
+        self.config = camera_config
+        self.core = core
+        # Shared-memory ring to receive JPEG frames from `detector_service.py` without pickling
+        self.frame_buffer = SharedFrameBuffer.for_frames(camera_config.get("width", config.IMAGE_WIDTH),
+                                                         camera_config.get("height", config.IMAGE_HEIGHT),
+                                                         slot_count=config.FRAME_BUFFER_SLOTS)
+        # Shared event flag
+        self.streaming_enabled_event = multiprocessing.Event()
+        # Live view JPEG quality ceiling, lowered by the detector under load
+        self.preview_quality = multiprocessing.Value('i', config.STREAM_JPEG_QUALITY, lock=False)
+        # Encode each frame once per quality tier and broadcast it to every connected viewer
+        self.hub = FrameHub(self.frame_buffer, self.streaming_enabled_event, quality_cap=self.preview_quality)
+        # H.264 alternative for remote viewers, encoded once from the same frames
+        self.h264 = H264LiveStream(self.hub)
+        # Settings pushed to the detector without touching system_state.json
+        settings = resolve_camera_settings(state_manager.state, self.id)
+        self.settings = SharedSettings(settings["isArmed"], settings["motion_sensitivity"])
+        self.process = None
+        self.restarts = 0
+        # Progress reported by the detector, watched by run_detector_process (see heartbeat.py)
+        self.heartbeat = Heartbeat()
+        self.outage_started = None      # Last progress of a failed detector until its replacement is ready
+        self.last_recovery = None       # Seconds the last outage lasted
+
+def detector_cores(count):
+    """CPU core for each detector, leaving the first core to the web server when there is room"""
+    if not config.DETECTOR_PIN_CORES or not hasattr(os, 'sched_getaffinity'):
+        return [None] * count
+    cores = sorted(os.sched_getaffinity(0))
+    offset = 1 if len(cores) > count else 0
+    return [cores[(i + offset) % len(cores)] for i in range(count)]
+
+camera_channels = {}   # Camera id -> CameraChannel, filled by create_app()
+
+def publish_settings(state):
+    """Push the latest settings of every camera to its detector process"""
+    for channel in camera_channels.values():
+        settings = resolve_camera_settings(state, channel.id)
+        channel.settings.update(settings["isArmed"], settings["motion_sensitivity"])
+
+def get_camera_channel(camera_id):
+    channel = camera_channels.get(camera_id)
+    if channel is None:
+        abort(404, description="Camera not found")
+    return channel
 
 ATTEMPT_LIMIT = 3
 BLOCK_DURATION_MINUTES = 5
 
-class LoginAttempt(db.Model):
-    __tablename__ = "login_attempts"
-    id = db.Column(db.Integer, primary_key=True)
-    ip_address = db.Column(db.String(45), unique=True, nullable=False)
-    attempts = db.Column(db.Integer, default=0, nullable=False)
-    blocked_until = db.Column(db.DateTime, nullable=True)
-
-    def __repr__(self):
-        return f"<LoginAttempt {self.ip_address} {self.attempts} {self.blocked_until}>"
-
 def get_or_create_attempt(ip: str) -> LoginAttempt:
     record = LoginAttempt.query.filter_by(ip_address=ip).first()
     if not record:
@@ -110,90 +143,287 @@ def is_blocked(ip: str) -> bool:
     db.session.commit()
     return False
 
-def start_detector_process():
+# Start method of replacement detectors, server.py hands in a preloaded forkserver (None = the default)
+restart_context = None
+
+def start_detector_process(channel, context=multiprocessing):
     """서브프로세스 실행 함수"""
-    process = multiprocessing.Process(
+    channel.heartbeat.reset()
+    process = context.Process(
         target=detector_service, 
-        args=(frame_queue, notification_queue, streaming_enabled_event)
+        args=(channel.config, channel.frame_buffer, notification_queue, channel.streaming_enabled_event,
+              channel.settings, channel.core, metrics_queue, channel.preview_quality, channel.heartbeat),
+        name=f"detector-{channel.id}"
     )
     process.start()
-    logging.info(f"Started detector process PID: {process.pid}")
+    channel.process = process
+    logging.info(f"Started detector process for {channel.id} PID: {process.pid} core: {channel.core}")
     return process
 
+def stop_detector_process(channel):
+    """Ask a detector to exit, killing it if it does not within DETECTOR_STOP_GRACE"""
+    process = channel.process
+    if process.is_alive():
+        process.terminate()
+        process.join(config.DETECTOR_STOP_GRACE)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+def recover_detector_clip(channel, video_filename, encoder_pid):
+    """Finish and announce the clip a failed detector was recording"""
+    stream_path = recover_clip(video_filename, encoder_pid, config.ENCODER_FLUSH_TIMEOUT)
+    clip = parse_clip_filename(video_filename)
+    if stream_path is None or clip is None:
+        print(f"❌ Could not recover clip {video_filename} of detector {channel.id}")
+        return
+    print(f"🩹 Recovered clip {stream_path}")
+    RECOVERED_CLIPS.inc(camera=channel.id)
+    # Indexed and pushed to the frontend like any other finished clip
+    message = {"event": "new_clip", "timestamp": clip["timestamp"], "image_filename": clip["image_filename"],
+               "video_filename": video_filename, "camera_id": channel.id}
+    index_new_clips([message])
+    notification_bridge.publish(message.pop("event"), message)
+
+def restart_detector_process(channel, stage, reason, last_progress):
+    """Replace a dead or hung detector right away, its unfinished clip is recovered in the background"""
+    logging.warning(f"Detector process {channel.id} PID: {channel.process.pid} {reason}. Restarting...")
+    print(f"🚑 Detector {channel.id} {reason}, restarting")
+    stop_detector_process(channel)
+    open_clip = channel.heartbeat.open_clip()
+    channel.restarts += 1
+    DETECTOR_RESTARTS.inc(camera=channel.id)
+    DETECTOR_FAILURES.inc(camera=channel.id, stage=stage)
+    if channel.outage_started is None:   # A replacement that fails too extends the same outage
+        channel.outage_started = last_progress
+    start_detector_process(channel, restart_context or multiprocessing)
+    if open_clip is not None:
+        threading.Thread(target=recover_detector_clip, args=(channel, *open_clip), daemon=True).start()
+
+def watch_detector(channel):
+    """Restart the detector if it exited or its heartbeat stalled, and time the recovery"""
+    heartbeat = channel.heartbeat
+    if not channel.process.is_alive():
+        restart_detector_process(channel, heartbeat.stage(), f"exited with code {channel.process.exitcode}",
+                                 heartbeat.last_progress())
+        return
+    stall = heartbeat.stall(config.HEARTBEAT_TIMEOUT, config.DETECTOR_STARTUP_TIMEOUT)
+    if stall is not None:
+        restart_detector_process(channel, *stall)
+        return
+    if heartbeat.ready:
+        mark_first_frame(channel)
+    if channel.outage_started is not None and heartbeat.ready:
+        channel.last_recovery = heartbeat.ready - channel.outage_started
+        channel.outage_started = None
+        DETECTOR_RECOVERY.observe(channel.last_recovery, camera=channel.id)
+        print(f"✅ Detector {channel.id} back after {channel.last_recovery:.2f}s")
+
+def mark_first_frame(channel):
+    """Startup milestone, the report is printed once every camera has delivered a frame"""
+    if startup.timer.mark(f"first frame {channel.id}", at=channel.heartbeat.ready) and \
+            all(f"first frame {camera_id}" in startup.timer.marks for camera_id in camera_channels):
+        print(f"⏱️ Startup: {startup.timer.report()}")
+        logging.info(f"Startup: {startup.timer.report()}")
+        prepare_restarts()
+
+def prepare_restarts():
+    """Start the forkserver for replacement detectors once start-up has settled, so its imports
+    never compete with the first viewers on a single core (otherwise it starts with the first restart)"""
+    if restart_context is not None and restart_context.get_start_method() == 'forkserver':
+        from multiprocessing import forkserver
+        timer = threading.Timer(config.RESTART_PREPARE_DELAY, forkserver.ensure_running)
+        timer.daemon = True
+        timer.start()
+
+watchdog_thread = None
+watchdog_stop = threading.Event()   # Set by stop_services(), a detector ended on purpose is not restarted
+
 def run_detector_process():
-    detector_process = start_detector_process()
-    #logging.info(f"Started detector process PID: {process.pid}")
+    """Watchdog loop, the detector processes themselves are started by start_services()"""
+    while not watchdog_stop.is_set():
+        # 비정상 종료되거나 멈춘 경우 자동 재시작
+        for channel in camera_channels.values():
+            watch_detector(channel)
+        watchdog_stop.wait(config.WATCHDOG_INTERVAL)
+
+# Detector events are pushed to the frontend as soon as they are queued
+def index_new_clips(batch):
+    """Index every finished clip of a batch in one transaction so listings never scan the folders"""
+    with app.app_context():
+        clips = [(message, add_clip(message["video_filename"], commit=False))
+                 for message in batch if message['event'] == 'new_clip']
+        if clips:
+            db.session.commit()
+        for message, clip in clips:
+            if clip is not None:
+                message["id"] = clip.id
+                message["motion_score"] = clip.motion_score
+    # Recordings starting or finishing are the writes that can fill the disk
+    if any(message['event'] in ('new_clip', 'recording_started') for message in batch):
+        storage_manager.notify_write()
+
+def announce_deleted_clips(video_filenames, reason):
+    notification_bridge.publish('clips_deleted', {"video_filenames": video_filenames, "reason": reason})
+
+# Retention and disk quota (created by create_app(), started once the clip index has been reconciled)
+storage_manager = None
+# Detector events pushed to Socket.IO clients (created by create_app())
+notification_bridge = None
+
+@socketio.on('connect')
+def send_notification_position():
+    emit('position', {"boot": notification_bridge.boot, "seq": notification_bridge.seq})
+    for event, payload in notification_bridge.latest_volatile():
+        emit(event, payload)
+
+@socketio.on('resume')
+def resume_notifications(data):
+    """Send a reconnecting client the events it missed, or ask it to reload"""
+    data = data or {}
     try:
-        while True:
-            # 비정상 종료된 경우 자동 재시작
-            if not detector_process.is_alive():
-                logging.warning(f"Detector process PID: {detector_process.pid} exited with code {detector_process.exitcode}. Restarting...")
-                detector_process = start_detector_process()
-
-            # 주기적으로 데이터 추가 (테스트용)
-            #frame_queue.put("Sample Frame Data")
-            time.sleep(5)
-
-    except KeyboardInterrupt:
-        logging.warning("Main process interrupted. Terminating gracefully...")
-
-    finally:
-        # 종료 처리
-        if detector_process.is_alive():
-            detector_process.terminate()
-            detector_process.join()
-        logging.info(f"Detector process PID: {detector_process.pid} terminated.")
-
-# Start detector process thread
-threading.Thread(target=run_detector_process, daemon=True).start()
-
-# Thread to read notifications and broadcast to frontend
-def notify_frontend():
-    print("Notification thread started!")
-    while True:
-        try:
-            if not notification_queue.empty():
-                clip_info = notification_queue.get(timeout=5)
-                socketio.emit('new_clip', clip_info)
-        except multiprocessing.queues.Empty:
-            pass  # No new clips yet, continue waiting
-        time.sleep(1)
-
-# Start background notification thread
-threading.Thread(target=notify_frontend, daemon=True).start()
-
-def clear_queue(q):
-    while not q.empty():
-        try:
-            q.get_nowait()
-        except Exception:
-            break
+        missed = notification_bridge.replay(data.get('boot'), int(data.get('since', 0)))
+    except (TypeError, ValueError):
+        missed = None
+    if missed is None:
+        emit('resync', {"boot": notification_bridge.boot, "seq": notification_bridge.seq})
+        return
+    for event, payload in missed:
+        emit(event, payload)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Pipeline metrics of the web server and every detector process, Prometheus text format"""
+    for channel in camera_channels.values():
+        DETECTOR_UP.set(int(channel.process is not None and channel.process.is_alive()), camera=channel.id)
+        STREAM_VIEWERS.set(channel.hub.viewer_count(), camera=channel.id)
+        STREAM_FRAMES.set(channel.hub.published, camera=channel.id)
+        STREAM_DROPPED.set(channel.hub.dropped_frames(), camera=channel.id)
+        H264_VIEWERS.set(channel.h264.viewer_count(), camera=channel.id)
+        H264_BYTES.set(channel.h264.bytes, camera=channel.id)
+        for tier in channel.hub.stats()["tiers"]:
+            TIER_VIEWERS.set(tier["viewers"], camera=channel.id, tier=tier["tier"])
+            TIER_FRAMES.set(tier["frames"], camera=channel.id, tier=tier["tier"])
+            TIER_BYTES.set(tier["bytes"], camera=channel.id, tier=tier["tier"])
+            TIER_CPU.set(tier["cpu_seconds"], camera=channel.id, tier=tier["tier"])
+    try:
+        NOTIFY_QUEUE_DEPTH.set(notification_queue.qsize())
+    except NotImplementedError:
+        pass   # qsize() is unavailable on macOS
+    THUMBNAIL_CACHE.set(thumbnails.cache.nbytes, kind='bytes')
+    THUMBNAIL_CACHE.set(thumbnails.cache.hits, kind='hits')
+    THUMBNAIL_CACHE.set(thumbnails.cache.misses, kind='misses')
+    for milestone, seconds in startup.timer.marks.items():
+        STARTUP_SECONDS.set(seconds, milestone=milestone)
+    return Response(metrics_collector.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/notifications/stats')
+def notification_stats():
+    return jsonify(notification_bridge.stats())
 
 @app.route('/api/video_stream')
 def video_stream():
-    clear_queue(frame_queue)
-    clear_queue(notification_queue)
-    streaming_enabled_event.set()
-    # Get frame in the queue received from 'detector_service.py'
+    return camera_video_stream(default_camera_id())
+
+@app.route('/api/cameras/<string:camera_id>/video_stream')
+def camera_video_stream(camera_id):
+    """MJPEG live view, ?tier=low|medium|high and/or ?width=&quality=&fps= pick the quality"""
+    channel = get_camera_channel(camera_id)
+    try:
+        tier = make_tier(request.args.get('tier'), request.args.get('width'),
+                         request.args.get('quality'), request.args.get('fps'))
+    except ValueError as e:
+        abort(400, description=str(e))
+    if tier.width >= channel.config.get("width", config.IMAGE_WIDTH):
+        tier = tier._replace(width=0)   # Not a downscale, share the full-resolution encode
+    subscriber = channel.hub.subscribe(policy=config.STREAM_DROP_POLICY, depth=config.STREAM_CLIENT_DEPTH, tier=tier)
+    # Each viewer gets its own mailbox filled by the hub, a slow client only drops frames
     def generate_video_stream():
-        while True:
-            try:
-                if not frame_queue.empty():
-                   frame = frame_queue.get()
-                   _, buffer = cv2.imencode('.jpg', frame)
-                   frame_bytes = buffer.tobytes()
-
-                   yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                else:
-                    # Yield a minimal keepalive so the connection doesn't close
-                    # Or at least sleep a bit to avoid CPU spinning
-                    time.sleep(0.1)
-            except Exception as e:
-                print(f"❌ Error fetching frame from queue: {e}")
+        try:
+            while True:
+                part = subscriber.get(timeout=1.0)
+                if part is not None:
+                    yield part
+        finally:
+            channel.hub.unsubscribe(subscriber)
 
     return Response(generate_video_stream(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/api/live.mp4')
+def live_h264():
+    return camera_live_h264(default_camera_id())
+
+@app.route('/api/cameras/<string:camera_id>/live.mp4')
+def camera_live_h264(camera_id):
+    """H.264 live view as one fragmented MP4 stream (for Media Source Extensions)"""
+    channel = get_camera_channel(camera_id)
+    if not ffmpeg_available():
+        abort(503, description="H.264 live view needs ffmpeg")
+    subscriber = channel.h264.subscribe()
+    def generate_fragments():
+        try:
+            while not (subscriber.closed and not subscriber.frames):
+                fragment = subscriber.get(timeout=1.0)
+                if fragment is not None:
+                    yield fragment
+        finally:
+            channel.h264.unsubscribe(subscriber)
+
+    response = Response(generate_fragments(), mimetype='video/mp4')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/cameras/<string:camera_id>/stream_stats')
+def camera_stream_stats(camera_id):
+    """Encode cost per quality tier and bandwidth per connected viewer"""
+    channel = get_camera_channel(camera_id)
+    return jsonify(dict(channel.hub.stats(), h264=channel.h264.stats()))
+
+@app.route('/api/cameras', methods=['GET'])
+def list_cameras():
+    return jsonify([{
+        "id": channel.id,
+        "name": channel.config.get("name", channel.id),
+        "running": channel.process is not None and channel.process.is_alive(),
+        "restarts": channel.restarts,
+        "last_recovery_seconds": channel.last_recovery and round(channel.last_recovery, 3),
+        "stage": channel.heartbeat.stage(),
+        "seconds_since_stage": channel.heartbeat.snapshot(),
+        "viewers": channel.hub.viewer_count(),
+        "core": channel.core,
+    } for channel in camera_channels.values()])
+
+def parse_sensitivity(data):
+    """The request's motion sensitivity as an int, 400 unless it is a whole number in 0..MOTION_SENSITIVITY_MAX"""
+    value = data.get('sensitivity', 3)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value) \
+            or not 0 <= value <= config.MOTION_SENSITIVITY_MAX:
+        abort(400, description=f"Sensitivity must be a whole number from 0 to {config.MOTION_SENSITIVITY_MAX}")
+    return int(value)
+
+def request_settings():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description="Expected a JSON object")
+    return data
+
+@app.route('/api/cameras/<string:camera_id>/settings', methods=['GET', 'POST'])
+def camera_settings(camera_id):
+    get_camera_channel(camera_id)
+    if request.method == 'POST':
+        data = request_settings()
+        # Validated before anything is stored, a bad value must not reach the detector or system_state.json
+        sensitivity = parse_sensitivity(data) if 'sensitivity' in data else None
+        if 'isArmed' in data:
+            set_armed_status(data['isArmed'], camera_id)
+        if sensitivity is not None:
+            set_motion_sensitivity(sensitivity, camera_id)
+        print(f"🎯 Camera {camera_id} settings updated: {data}")
+    return jsonify({
+        "isArmed": get_armed_status(camera_id),
+        "motion_sensitivity": get_motion_sensitivity(camera_id)
+    })
+
 # Endpoint to get current settings
 @app.route('/api/get_settings', methods=['GET'])
 def get_settings():
@@ -225,40 +455,87 @@ def set_notification():
 @app.route('/api/set_sensitivity', methods=['POST'])
 def set_sensitivity():
     #global motion_sensitivity
-    data = request.json
-    motion_sensitivity = data.get('sensitivity', 3)
+    motion_sensitivity = parse_sensitivity(request_settings())
     set_motion_sensitivity(motion_sensitivity)
     print(f"🎯 Motion detection sensitivity set to: {motion_sensitivity}")
     return jsonify({"message": f"Sensitivity set to {motion_sensitivity}"})
 
+def list_clips(camera_id=None):
+    """Page through indexed clips: ?limit=&cursor=&start=&end=&order=asc|desc&sort=time|motion&camera="""
+    try:
+        clips, next_cursor = query_clips(
+            camera_id=camera_id or request.args.get('camera'),
+            start=parse_time(request.args.get('start')),
+            end=parse_time(request.args.get('end'), end_of_day=True),
+            order=request.args.get('order', 'desc'),
+            limit=request.args.get('limit', 50),
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'time'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {e}"}), 400
+    return jsonify({"clips": [clip_to_dict(clip) for clip in clips], "next_cursor": next_cursor})
+
 @app.route('/api/clips')
 def get_clips():
     """List recorded motion-detected clips"""
-    clips = []
-    # Collect both video and image data
-    for video_file in os.listdir(config.CLIPS_FOLDER):
-        if video_file.endswith('.mp4'):
-            timestamp_str = '_'.join(video_file.split('_')[1:3]).replace('.mp4','')
-            image_file = f"image_{timestamp_str}.jpg"
-            # Format timestamp for display (e.g., "2025-03-11 23:46:30")
-            formatted_timestamp = timestamp_str.replace('_', ' ')
-            #print(f"video_file = {video_file}")
-            #print(f"image_file = {image_file}")
-            clips.append({
-                "id": len(clips) + 1,
-                "video_filename": video_file,
-                "image_filename": image_file,
-                "timestamp": formatted_timestamp
-            })
-    return jsonify(clips)
+    return list_clips()
+
+@app.route('/api/cameras/<string:camera_id>/clips')
+def get_camera_clips(camera_id):
+    get_camera_channel(camera_id)
+    return list_clips(camera_id)
 
 # Serve Images
+# Snapshot filenames are unique per event and never rewritten, so every size can be cached for good
+IMAGE_MAX_AGE = 365 * 24 * 3600
+
 @app.route('/api/image/<string:filename>')
 def view_image(filename):
-    try:
-        return send_from_directory(config.IMAGES_FOLDER, filename, mimetype='image/jpeg')
-    except FileNotFoundError:
-        abort(404, description="Image not found")
+    """Event snapshot, ?size=thumb|preview|full and ?format=jpeg|webp|auto (auto follows Accept)"""
+    size = request.args.get('size', thumbnails.FULL)
+    fmt = request.args.get('format', 'jpeg')
+    if fmt == 'auto':
+        fmt = 'webp' if any(value == 'image/webp' for value, _ in request.accept_mimetypes) else 'jpeg'
+    if size != thumbnails.FULL and size not in config.THUMBNAIL_SIZES or fmt not in thumbnails.FORMATS:
+        abort(400, description="Unknown image size or format")
+    if size == thumbnails.FULL and fmt == 'jpeg':
+        try:
+            response = send_from_directory(config.IMAGES_FOLDER, filename, mimetype='image/jpeg', max_age=IMAGE_MAX_AGE)
+        except FileNotFoundError:
+            abort(404, description="Image not found")
+    else:
+        data = run_blocking(thumbnails.get_thumbnail, filename, size, fmt)   # May decode and resize
+        if data is None:
+            abort(404, description="Image not found")
+        response = Response(data, mimetype=thumbnails.FORMATS[fmt][1])
+        response.add_etag()
+        response.cache_control.max_age = IMAGE_MAX_AGE
+        response = response.make_conditional(request)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept')
+    return response
+
+@app.route('/api/clips/<int:clip_id>/timeline')
+def clip_timeline(clip_id):
+    """Per-sample motion score, brightness and boxes of a clip, ?format=json|npz (the raw sidecar)"""
+    clip = db.session.get(Clip, clip_id)
+    if clip is None:
+        abort(404, description="Clip not found")
+    if request.args.get('format') == 'npz':
+        try:
+            return send_from_directory(config.TIMELINES_FOLDER, timeline_filename_for(clip.file_path),
+                                       mimetype='application/octet-stream', max_age=IMAGE_MAX_AGE)
+        except FileNotFoundError:
+            abort(404, description="No motion timeline for this clip")
+    timeline = load_timeline(clip.file_path)
+    if timeline is None:
+        abort(404, description="No motion timeline for this clip")
+    # Written once when the clip closes, never changed afterwards
+    response = jsonify(dict(timeline, id=clip.id, video_filename=clip.file_path))
+    response.add_etag()
+    response.cache_control.max_age = IMAGE_MAX_AGE
+    return response.make_conditional(request)
 
 # Serve Videos with Streaming Support
 @app.route('/api/video/<string:filename>')
@@ -268,33 +545,8 @@ def view_video(filename):
     if not os.path.exists(video_path):
         abort(404, description="Video file not found")
 
-    print(f"✅ Serving video: {video_path}")
-    
-    # Correct headers for video playback
-    return Response(
-        generate_rec_video_stream(video_path),
-        mimetype='video/mp4',
-        headers={
-            'Content-Disposition': f'inline; filename={filename}',  
-            'Accept-Ranges': 'bytes'
-        }
-    )
-
-# Efficient Video Streaming
-def generate_rec_video_stream(video_path):
-    print(f"🎬 Attempting to stream: {video_path}")
-    try:
-        with open(video_path, 'rb') as video_file:
-            while True:
-                chunk = video_file.read(1024 * 1024)
-                if not chunk:
-                    break
-                yield chunk
-            #while chunk := video_file.read(1024 * 1024):  # 1MB chunks
-                #print(f"📹 Streaming chunk of size: {len(chunk)} bytes")
-                #yield chunk
-    except Exception as e:
-        print(f"❌ Error streaming video: {e}")
+    # Range requests let the browser seek without downloading the clip from the start
+    return send_file_ranges(video_path, 'video/mp4')
 
 @app.route('/api/download_clip/<string:filename>')
 def download_clip(filename):
@@ -303,20 +555,22 @@ def download_clip(filename):
     if not os.path.exists(video_path):
         abort(404, description="Video file not found")
 
-    return send_file(video_path, as_attachment=True)
+    return send_file_ranges(video_path, 'video/mp4', as_attachment=True)
 
 @app.route('/api/delete_clip/<string:filename>', methods=['DELETE'])
 def delete_clip(filename):
     """Delete recorded video"""
-    try:
-        os.remove(os.path.join(config.CLIPS_FOLDER, filename))
-        os.remove(os.path.join(config.STREAM_FOLDER, filename))
-        image_filename = filename.replace('.mp4','.jpg').replace('motion','image')
-        #print(f"DELETE: image_filename={image_filename}")
-        os.remove(os.path.join(config.IMAGES_FOLDER, image_filename))
-        return jsonify({"message": "Clip deleted successfully"})
-    except FileNotFoundError:
+    # Clip, stream copy, snapshot and thumbnails go together, whichever of them still exist
+    freed = delete_clip_files(filename)
+    remove_clip(filename)
+    if freed is None:
         return jsonify({"error": "File not found"}), 404
+    return jsonify({"message": "Clip deleted successfully"})
+
+@app.route('/api/storage')
+def storage_status():
+    """Disk use, watermarks, retention and what the storage manager deleted so far"""
+    return jsonify(storage_manager.stats())
 
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -404,8 +658,150 @@ def serve_frontend(path):
         return send_from_directory('build', path)
     return send_from_directory('build', 'index.html')
 
-# 로깅 설정
-logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+@app.after_request
+def mark_first_response(response):
+    if startup.timer.mark('first response'):
+        # The first page is out, get OpenCV ready for the live view while the cameras start
+        threading.Thread(target=run_blocking, args=(load_encoder,), daemon=True).start()
+    return response
+
+# ============================== #
+#      Application lifecycle     #
+# ============================== #
+def create_app():
+    """Configure the app and create what it shares with the detector processes.
+    Nothing runs until start_services(), importing this module has no side effects."""
+    global notification_queue, metrics_queue, metrics_collector, storage_manager, notification_bridge
+    if notification_queue is not None:
+        return app
+    startup.timer.mark('imported')
+    # 로깅 설정
+    logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    # Suppress Flask's default HTTP request logs
+    log = logging.getLogger('werkzeug')
+    log.setLevel(logging.ERROR)  # Suppress non-critical logs
+
+    load_dotenv()
+    # Flask Session Configuration
+    app.secret_key = 'super-secret-key'  # Required for session security
+    app.config['SESSION_TYPE'] = 'filesystem'  # Store session data on the server
+    app.config['SESSION_PERMANENT'] = True
+    app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # Session expiry in seconds (e.g., 1 hour)
+    Session(app)  # Initialize Flask-Session
+    external_ip = os.getenv('EXTERNAL_IP')
+    print(f"External IP: {external_ip}")
+    CORS(app)
+    #CORS(app, origins=['http://'+external_ip+':3000'])
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
+    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSKEY')
+    app.default_sender = os.getenv('MAIL_USERNAME')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    app.secret_key = os.getenv('SECRET_KEY')
+    #print(f"SECRET KEY: {app.secret_key}")
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///login_attempts.db"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    mail.init_app(app)
+    # gevent when started through server.py, Flask's threaded development server otherwise
+    socketio.init_app(app, cors_allowed_origins="*", async_mode='gevent' if is_gevent() else 'threading')
+
+    notification_queue = multiprocessing.Queue(maxsize=50)
+    metrics_queue = multiprocessing.Queue(maxsize=20)
+    metrics_collector = MetricsCollector(metrics_queue)
+    camera_channels.update({
+        camera_config["id"]: CameraChannel(camera_config, core)
+        for camera_config, core in zip(config.CAMERAS, detector_cores(len(config.CAMERAS)))
+    })
+    add_listener(publish_settings)
+    storage_manager = StorageManager(app, on_delete=announce_deleted_clips)
+    notification_bridge = NotificationBridge(notification_queue, socketio.emit, on_batch=index_new_clips,
+                                             batch_window=config.NOTIFY_BATCH_WINDOW,
+                                             batch_max=config.NOTIFY_BATCH_MAX,
+                                             replay_size=config.NOTIFY_REPLAY_SIZE,
+                                             latency_metric=NOTIFY_LATENCY.labels())
+    startup.timer.mark('configured')
+    return app
+
+def start_services():
+    """Start the detectors first so their camera start-up overlaps the server's, then the background threads"""
+    global watchdog_thread
+    make_clip_folders()
+    for channel in camera_channels.values():
+        start_detector_process(channel)
+    startup.timer.mark('detectors started')
+    watchdog_thread = threading.Thread(target=run_detector_process, daemon=True)
+    watchdog_thread.start()
+    metrics_collector.start()
+    notification_bridge.start()
+
+def stop_services():
+    """Terminate the detector processes and release the shared frame buffers, the background threads are daemons"""
+    # The watchdog goes first, otherwise it restarts each detector terminated below
+    watchdog_stop.set()
+    if watchdog_thread is not None:
+        watchdog_thread.join()
+    state_manager.flush()   # A setting changed just before shutdown is not lost with the daemon persist thread
+    # 종료 처리
+    for channel in camera_channels.values():
+        if channel.process is not None and channel.process.is_alive():
+            channel.process.terminate()
+            channel.process.join()
+            logging.info(f"Detector process {channel.id} PID: {channel.process.pid} terminated.")
+    for channel in camera_channels.values():
+        channel.frame_buffer.close()   # The web server owns the block, this unlinks it
+
+def interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_server(detector_restart_context=None):
+    global restart_context
+    restart_context = detector_restart_context
+    create_app()
+    # The schema exists before any detector can finish a clip and have it indexed
+    with app.app_context():
+        db.create_all()
+        upgrade_clip_table()
+    startup.timer.mark('database ready')
+    start_services()
+    # Rebuild the clip index from disk in the background, the API is usable meanwhile
+    def run_reconcile():
+        with app.app_context():
+            reconcile_clips()
+        storage_manager.start()
+    threading.Thread(target=run_reconcile, daemon=True).start()
+    if is_gevent():
+        from gevent import pywsgi, socket
+        try:
+            from geventwebsocket.handler import WebSocketHandler as handler_class
+        except ImportError:
+            handler_class = pywsgi.WSGIHandler   # WebSockets come from simple-websocket instead
+        listener = socket.create_server((config.SERVER_HOST, config.SERVER_PORT), backlog=1024)
+        # Accepted sockets inherit this; without it keep-alive responses wait ~40 ms for delayed ACKs
+        listener.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        print(f"🚀 Serving on {config.SERVER_HOST}:{config.SERVER_PORT} with gevent")
+        server = pywsgi.WSGIServer(listener, app, handler_class=handler_class, log=None,
+                                   spawn=config.SERVER_MAX_CONNECTIONS)
+    # systemctl stop and kill_app.sh send SIGTERM: stop serving, then stop_services() below ends the
+    # detectors, including replacements forked by the forkserver, which are not our children
+    if is_gevent():
+        import gevent
+        gevent.signal_handler(signal.SIGTERM, server.stop)
+    else:
+        signal.signal(signal.SIGTERM, interrupt)
+    try:
+        startup.timer.mark('listening')
+        if is_gevent():
+            server.serve_forever()
+        else:
+            app.run(host=config.SERVER_HOST, port=config.SERVER_PORT, debug=False)
+    except KeyboardInterrupt:
+        logging.warning("Main process interrupted. Terminating gracefully...")
+    finally:
+        stop_services()
 
 if __name__ == "__main__":
 
@@ -418,6 +814,4 @@ if __name__ == "__main__":
     #detector_process.start()
     #logging.info(f"Started detector process PID: {detector_process.pid}")
 
-    with app.app_context():
-        db.create_all()
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    run_server()
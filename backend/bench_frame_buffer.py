@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Compare frame transport between processes:
+#   - multiprocessing.Queue (pickles every frame, the old path)
+#   - SharedFrameBuffer (shared-memory ring, consumer reads NumPy views)
+# Usage: python3 bench_frame_buffer.py [seconds] [width] [height]
+
+import multiprocessing
+import resource
+import sys
+import time
+import numpy as np
+from frame_buffer import SharedFrameBuffer
+
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+WIDTH = int(sys.argv[2]) if len(sys.argv) > 2 else 640
+HEIGHT = int(sys.argv[3]) if len(sys.argv) > 3 else 480
+
+
+def queue_producer(q, stop_event):
+    frame = np.random.randint(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    while not stop_event.is_set():
+        if not q.full():
+            q.put(frame.copy(), block=False)
+        else:
+            time.sleep(0.0005)
+
+
+def ring_producer(buf, stop_event):
+    frame = np.random.randint(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    while not stop_event.is_set():
+        buf.write(frame)
+        time.sleep(0.0005)
+
+
+def run(name, producer, transport, consume):
+    stop_event = multiprocessing.Event()
+    proc = multiprocessing.Process(target=producer, args=(transport, stop_event))
+    cpu_start = time.process_time()
+    child_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = time.monotonic()
+    proc.start()
+    frames = 0
+    checksum = 0
+    while time.monotonic() - wall_start < DURATION:
+        frame = consume(transport)
+        if frame is not None:
+            checksum += int(frame[0, 0, 0])
+            frames += 1
+    stop_event.set()
+    consume_cpu = time.process_time() - cpu_start
+    proc.join(timeout=2)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join()
+    wall = time.monotonic() - wall_start
+    child = resource.getrusage(resource.RUSAGE_CHILDREN)
+    produce_cpu = (child.ru_utime - child_start.ru_utime) + (child.ru_stime - child_start.ru_stime)
+    print(f"{name:<14} {frames / wall:9.1f} frames/s   "
+          f"consumer CPU {100 * consume_cpu / wall:5.1f}%   producer CPU {100 * produce_cpu / wall:5.1f}%")
+
+
+def consume_queue(q):
+    try:
+        return q.get(timeout=0.1)
+    except Exception:
+        return None
+
+
+_last_seq = [0]
+def consume_ring(buf):
+    seq = buf.wait_for_new(_last_seq[0], timeout=0.1, poll_interval=0.0002)
+    if seq is None:
+        return None
+    item = buf.read(seq)
+    if item is None:
+        return None
+    _last_seq[0], frame, _ = item
+    return frame
+
+
+if __name__ == "__main__":
+    print(f"Transport benchmark: {WIDTH}x{HEIGHT}x3 frames for {DURATION:.0f}s each")
+    run("Queue", queue_producer, multiprocessing.Queue(maxsize=10), consume_queue)
+    ring = SharedFrameBuffer.for_frames(WIDTH, HEIGHT)
+    try:
+        run("Shared ring", ring_producer, ring, consume_ring)
+    finally:
+        ring.close()
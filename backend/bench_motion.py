@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# Microbenchmark of the motion engines in ms/frame at 480p, 720p and 1080p.
+# "full" rows run frame differencing at native resolution (the old check_motion).
+# Usage: python3 bench_motion.py [frames_per_case]
+
+import sys
+import time
+import numpy as np
+import config
+from motion import create_motion_engine
+
+FRAMES = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+MODES = ['diff', 'mog2', 'knn', 'running_avg']
+
+
+def synthetic_frames(width, height, count):
+    rng = np.random.default_rng(0)
+    base = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+    size = height // 6
+    for i in range(count):
+        frame = base.copy()
+        x = (i * width // 50) % (width - size)
+        frame[height // 3:height // 3 + size, x:x + size] = 230
+        yield frame
+
+
+def bench(width, height, mode, process_width):
+    engine = create_motion_engine(mode=mode, process_width=process_width)
+    frames = list(synthetic_frames(width, height, FRAMES))
+    engine.detect(frames[0])   # Warm up (allocations, background model)
+    start = time.perf_counter()
+    detected = 0
+    for frame in frames:
+        detected += engine.detect(frame)[0] > 0
+    elapsed = time.perf_counter() - start
+    return 1000 * elapsed / len(frames), detected
+
+
+if __name__ == "__main__":
+    print(f"Motion engine benchmark, {FRAMES} frames per case, process width {config.MOTION_PROCESS_WIDTH}")
+    print(f"{'resolution':<11} {'mode':<12} {'ms/frame':>9} {'detections':>11}")
+    for width, height in RESOLUTIONS:
+        ms, hits = bench(width, height, 'diff', 0)
+        print(f"{f'{width}x{height}':<11} {'full':<12} {ms:9.2f} {hits:11d}")
+        for mode in MODES:
+            ms, hits = bench(width, height, mode, config.MOTION_PROCESS_WIDTH)
+            print(f"{f'{width}x{height}':<11} {mode:<12} {ms:9.2f} {hits:11d}")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Throughput of N detector processes fed by synthetic cameras (no hardware needed).
+# Each detector runs unthrottled with live streaming enabled, so every frame goes
+# through motion detection, overlay and publishing. Aggregate frames/s should
+# grow with the number of detectors until all cores are busy.
+# Usage: python3 bench_multicamera.py [seconds] [max_cameras]
+
+import multiprocessing
+import os
+import sys
+import time
+import config
+import detector_service
+from frame_buffer import SharedFrameBuffer
+from settings_channel import SharedSettings
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+MAX_CAMERAS = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+
+def run(count):
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else [None]
+    buffers, processes = [], []
+    for i in range(count):
+        camera_config = {"id": f"bench{i}", "source": "synthetic"}
+        buf = SharedFrameBuffer.for_frames(config.IMAGE_WIDTH, config.IMAGE_HEIGHT)
+        streaming = multiprocessing.Event()
+        streaming.set()
+        proc = multiprocessing.Process(target=detector_service.detector_service,
+                                       args=(camera_config, buf, None, streaming,
+                                             SharedSettings(isArmed=False), cores[i % len(cores)]))
+        proc.start()
+        buffers.append(buf)
+        processes.append(proc)
+    time.sleep(1.0)   # Let every detector start up
+    start_seqs = [buf.latest_seq for buf in buffers]
+    time.sleep(SECONDS)
+    frames = [buf.latest_seq - seq for buf, seq in zip(buffers, start_seqs)]
+    for proc in processes:
+        proc.terminate()
+        proc.join()
+    for buf in buffers:
+        buf.close()
+    total = sum(frames) / SECONDS
+    print(f"{count:3d} camera(s): {total:8.1f} frames/s total, {total / count:7.1f} per camera")
+    return total
+
+
+if __name__ == "__main__":
+    # Unthrottled and disarmed, so nothing is recorded
+    config.TARGET_FPS = 10000
+    config.PREROLL_SECONDS = 0
+    print(f"Multi-camera benchmark, {config.IMAGE_WIDTH}x{config.IMAGE_HEIGHT} synthetic sources, {os.cpu_count()} CPUs")
+    baseline = None
+    for count in range(1, MAX_CAMERAS + 1):
+        total = run(count)
+        baseline = baseline or total
+        print(f"    scaling vs 1 camera: {total / baseline:.2f}x")
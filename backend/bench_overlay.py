@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# Per-frame cost of the on-screen text, on a replayed second-by-second clock:
+#   putText   : what every frame used to get, three cv2.putText calls
+#   cached    : overlay.py, text rasterized when it changes and blended otherwise,
+#               for the recording and live view policies in config.py
+# The timestamp changes every TARGET_FPS frames and the status on every motion
+# check (twice a second), as in the detector loop.
+# Usage: python3 bench_overlay.py [frames] [width height]
+
+import sys
+import time
+import cv2
+import numpy as np
+import config
+from overlay import OverlayCompositor, layers_for, POLICIES, TIMESTAMP, STATUS
+
+FRAMES = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+WIDTH, HEIGHT = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (config.IMAGE_WIDTH, config.IMAGE_HEIGHT)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+GREEN = (0, 255, 0)
+
+
+def texts(index):
+    """Timestamp and status lines of frame `index`"""
+    second = index // config.TARGET_FPS
+    check = index // (config.TARGET_FPS // 2)
+    timestamp = time.strftime("%d/%m/%y, %H:%M:%S", time.gmtime(1700000000 + second))
+    return timestamp, (f"ARMED Motion: {check % 7}(10)", f"Brightness:{100 + check % 50}")
+
+
+def run(name, draw):
+    frame = np.random.randint(0, 255, (HEIGHT, WIDTH, 3), np.uint8)
+    samples = []
+    for index in range(FRAMES):
+        timestamp, status = texts(index)
+        started = time.perf_counter()
+        draw(frame, timestamp, status)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    print(f"{name:>24} {1e6 * sum(samples) / len(samples):>9.1f} {1e6 * samples[len(samples) // 2]:>9.1f} "
+          f"{1e6 * samples[int(len(samples) * 0.99)]:>9.1f}")
+
+
+def put_text(frame, timestamp, status):
+    cv2.putText(frame, timestamp, (10, 30), FONT, 1, GREEN, 2)
+    cv2.putText(frame, status[0], (10, 60), FONT, 1, GREEN, 2)
+    cv2.putText(frame, status[1], (10, 90), FONT, 1, GREEN, 2)
+
+
+def cached(policy):
+    overlay = OverlayCompositor({TIMESTAMP: (10, 30), STATUS: (10, 60)})
+    layers = layers_for(policy)
+    def draw(frame, timestamp, status):
+        overlay.set_text(TIMESTAMP, timestamp)
+        overlay.set_text(STATUS, *status)
+        overlay.draw(frame, layers)
+    return draw, overlay
+
+
+if __name__ == "__main__":
+    print(f"{FRAMES} frames of {WIDTH}x{HEIGHT}, OVERLAY_RECORDING={config.OVERLAY_RECORDING}, "
+          f"OVERLAY_PREVIEW={config.OVERLAY_PREVIEW}")
+    print(f"{'':>24} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    run("putText x3", put_text)
+    for policy in POLICIES:
+        draw, overlay = cached(policy)
+        run(f"cached '{policy}'", draw)
+        print(f"{'':>24} {overlay.rasterized} rasterizations")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# Time-to-first-frame when seeking into a recorded clip served by a running backend.
+#   full  : what the old endpoint forced, read from byte 0 until the seek offset arrives
+#   range : one Range request starting at the seek offset (206 Partial Content)
+# Usage: python3 bench_range.py http://localhost:5000 motion_2025-03-11_23-46-30.mp4 [seek_fraction]
+
+import sys
+import time
+import urllib.request
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:5000'
+FILENAME = sys.argv[2] if len(sys.argv) > 2 else None
+SEEK = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5   # Seek to the middle of the clip
+RUNS = 5
+
+
+def clip_size(url):
+    with urllib.request.urlopen(urllib.request.Request(url, method='HEAD')) as response:
+        return int(response.headers['Content-Length'])
+
+
+def time_full(url, offset):
+    start = time.perf_counter()
+    received = 0
+    with urllib.request.urlopen(url) as response:
+        while received <= offset:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                break
+            received += len(chunk)
+    return time.perf_counter() - start
+
+
+def time_range(url, offset):
+    start = time.perf_counter()
+    request = urllib.request.Request(url, headers={'Range': f'bytes={offset}-'})
+    with urllib.request.urlopen(request) as response:
+        assert response.status == 206, f"expected 206, got {response.status}"
+        response.read(64 * 1024)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    if FILENAME is None:
+        sys.exit("usage: bench_range.py BASE_URL CLIP_FILENAME [seek_fraction]")
+    url = f"{BASE_URL}/api/video/{FILENAME}"
+    size = clip_size(url)
+    offset = int(size * SEEK)
+    print(f"Seeking to {SEEK:.0%} of {FILENAME} ({size / 1e6:.2f} MB), {RUNS} runs")
+    for name, measure in (('full', time_full), ('range', time_range)):
+        samples = sorted(measure(url, offset) for _ in range(RUNS))
+        print(f"{name:<6} median {1000 * samples[len(samples) // 2]:8.1f} ms   best {1000 * samples[0]:8.1f} ms")
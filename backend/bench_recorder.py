@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# Compare the two recording backends on the same synthetic clip:
+#   - opencv : cv2.VideoWriter + ffmpeg web conversion (two passes)
+#   - ffmpeg : frames piped once into ffmpeg, web-ready output
+# Reports wall time until the web-compatible file exists, CPU time
+# (this process + ffmpeg children) and bytes on disk.
+# Usage: python3 bench_recorder.py [seconds_of_video]
+
+import os
+import resource
+import sys
+import tempfile
+import time
+import numpy as np
+import config
+import recorder
+from detector_service import convert_to_web_compatible
+
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+
+
+def synthetic_frames(count):
+    frame = np.zeros((config.IMAGE_HEIGHT, config.IMAGE_WIDTH, 3), dtype=np.uint8)
+    for i in range(count):
+        frame[:] = 40
+        x = (i * 7) % (config.IMAGE_WIDTH - 80)
+        frame[200:280, x:x + 80] = (0, 200, 255)
+        yield frame
+
+
+def cpu_time():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    child = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + child.ru_utime + child.ru_stime
+
+
+def disk_usage(*folders):
+    seen = set()
+    total = 0
+    for folder in folders:
+        for name in os.listdir(folder):
+            st = os.stat(os.path.join(folder, name))
+            if st.st_ino not in seen:   # Hard links count once
+                seen.add(st.st_ino)
+                total += st.st_size
+    return total
+
+
+def run(backend, workdir):
+    config.RECORDING_BACKEND = backend
+    config.CLIPS_FOLDER = os.path.join(workdir, backend, 'clips')
+    config.STREAM_FOLDER = os.path.join(workdir, backend, 'stream')
+    os.makedirs(config.CLIPS_FOLDER)
+    os.makedirs(config.STREAM_FOLDER)
+    video_path = os.path.join(config.CLIPS_FOLDER, 'motion_bench.mp4')
+
+    cpu_start = cpu_time()
+    wall_start = time.monotonic()
+    rec = recorder.create_recorder(video_path, (config.IMAGE_WIDTH, config.IMAGE_HEIGHT), config.TARGET_FPS)
+    for frame in synthetic_frames(int(SECONDS * config.TARGET_FPS)):
+        rec.write(frame, block=True)
+    rec.stop(on_ready=lambda path: None)
+    rec.finish(120)   # Until the recorder's own file is complete
+    if rec.needs_transcode:
+        convert_to_web_compatible(video_path, os.path.join(config.STREAM_FOLDER, 'motion_bench.mp4'))
+    wall = time.monotonic() - wall_start
+    cpu = cpu_time() - cpu_start
+    print(f"{backend:<7} ready in {wall:6.2f}s   CPU {cpu:6.2f}s   "
+          f"disk {disk_usage(config.CLIPS_FOLDER, config.STREAM_FOLDER) / 1e6:6.2f} MB")
+
+
+if __name__ == "__main__":
+    if not recorder.ffmpeg_available():
+        sys.exit("ffmpeg is required for this benchmark")
+    print(f"Recording benchmark: {SECONDS:.0f}s of {config.IMAGE_WIDTH}x{config.IMAGE_HEIGHT} @ {config.TARGET_FPS} FPS")
+    with tempfile.TemporaryDirectory() as workdir:
+        run('opencv', workdir)
+        run('ffmpeg', workdir)
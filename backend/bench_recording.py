@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# Clips produced by a motion trace, replayed against a fake clock (no camera,
+# no ffmpeg): the old fixed-length timer versus the recording state machine.
+#   timer : a clip of DETECTION_DURATION seconds per trigger, motion while
+#           recording is ignored (one snapshot, encode and notification each)
+#   state : recording_state.py with the post-roll, max length and merge
+#           window from config.py
+# Clips and encoded seconds stand for snapshot/notification count and
+# transcode load. The transitions themselves are tested in tests/test_recording_state.py.
+# Usage: python3 bench_recording.py [seed]
+
+import random
+import sys
+import config
+from recording_state import RecordingStateMachine, RECORDING, START, SPLIT
+
+SEED = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+CHECK_INTERVAL = 0.5   # The detector checks motion every 0.5 s
+FRAME = 1.0 / config.TARGET_FPS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def busy_scene(rng, seconds=600):
+    """Someone working in view: bursts of motion, mostly short pauses, now and then a longer one"""
+    spans, t = [], 5.0
+    while t < seconds:
+        length = rng.uniform(2, 40)
+        spans.append((t, t + length))
+        t += length + rng.choice([rng.uniform(1, 4), rng.uniform(4, 15), rng.uniform(30, 90)])
+    return spans
+
+
+def sparse_scene(rng, seconds=600):
+    """Someone walking past every couple of minutes"""
+    return [(t, t + rng.uniform(2, 5)) for t in range(30, seconds, 120)]
+
+
+def moving(spans, t):
+    return any(start <= t < end for start, end in spans)
+
+
+def replay(spans, duration, step):
+    """Feed one frame at a time to `step(now, motion)`, motion is only sampled every CHECK_INTERVAL"""
+    frames = int(duration / FRAME)
+    last_check = -CHECK_INTERVAL
+    for index in range(frames):
+        now = index * FRAME
+        motion = False
+        if now - last_check >= CHECK_INTERVAL:
+            last_check = now
+            motion = moving(spans, now)
+        step(now, motion)
+
+
+def run_timer(spans, duration):
+    clips, recorded, stop_at = 0, 0, None
+    def step(now, motion):
+        nonlocal clips, recorded, stop_at
+        if stop_at is not None and now >= stop_at:
+            stop_at = None
+        if motion and stop_at is None:
+            clips += 1
+            stop_at = now + config.DETECTION_DURATION
+        if stop_at is not None:
+            recorded += 1
+    replay(spans, duration, step)
+    return clips, recorded * FRAME
+
+
+def run_state(spans, duration):
+    clock = FakeClock()
+    machine = RecordingStateMachine(config.DETECTION_DURATION, config.RECORDING_MAX_SECONDS,
+                                    config.RECORDING_MERGE_WINDOW, clock=clock)
+    recorded = 0
+    def step(now, motion):
+        nonlocal recorded
+        clock.now = now
+        machine.update(motion)
+        if machine.state == RECORDING:
+            recorded += 1
+    replay(spans, duration, step)
+    return machine.counts[START] + machine.counts[SPLIT], recorded * FRAME
+
+
+if __name__ == "__main__":
+    rng = random.Random(SEED)
+    print(f"post-roll {config.DETECTION_DURATION}s, max {config.RECORDING_MAX_SECONDS}s, "
+          f"merge window {config.RECORDING_MERGE_WINDOW}s, seed {SEED}")
+    print(f"{'scene':>8} {'motion s':>9} {'timer clips':>12} {'timer s':>8} {'state clips':>12} {'state s':>8}")
+    for name, scene in (('busy', busy_scene), ('sparse', sparse_scene)):
+        spans = scene(rng)
+        duration = spans[-1][1] + 30
+        motion_seconds = sum(end - start for start, end in spans)
+        timer_clips, timer_seconds = run_timer(spans, duration)
+        state_clips, state_seconds = run_state(spans, duration)
+        print(f"{name:>8} {motion_seconds:>9.0f} {timer_clips:>12} {timer_seconds:>8.0f} "
+              f"{state_clips:>12} {state_seconds:>8.0f}")
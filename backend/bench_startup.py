@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# Cold start of the server as after a `systemctl restart`: launches server.py
+# and measures, from the moment the process is created,
+#   first response : first 200 from a cheap JSON endpoint
+#   first frame    : first MJPEG frame of the live view (the detector process
+#                    is up, its camera delivers and the web server encodes)
+# Each run starts a fresh server and kills it afterwards, so run it with the
+# camera free and nothing else listening on the port. Use the synthetic camera
+# in config.CAMERAS to measure without hardware.
+#
+# Usage: python3 bench_startup.py [--runs 5] [--port 5000] [--command "python3 server.py"]
+
+import argparse
+import http.client
+import os
+import shlex
+import signal
+import subprocess
+import time
+
+BOUNDARY = b'--frame\r\n'
+
+
+def wait_for(probe, deadline):
+    """Call `probe` until it returns True, return False once `deadline` passes"""
+    while time.monotonic() < deadline:
+        try:
+            if probe():
+                return True
+        except OSError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def responds(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+    try:
+        conn.request('GET', '/api/get_settings')
+        return conn.getresponse().status == 200
+    finally:
+        conn.close()
+
+
+def streams(port, deadline):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=max(deadline - time.monotonic(), 0.1))
+    try:
+        conn.request('GET', '/api/video_stream')
+        response = conn.getresponse()
+        data = b''
+        while BOUNDARY not in data[len(BOUNDARY):] and time.monotonic() < deadline:
+            chunk = response.read1(65536)
+            if not chunk:
+                return False
+            data += chunk
+        return BOUNDARY in data[len(BOUNDARY):]   # A whole frame arrived once the next one starts
+    finally:
+        conn.close()
+
+
+def run_once(command, port, timeout):
+    started = time.monotonic()
+    proc = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = started + timeout
+    try:
+        first_response = time.monotonic() - started if wait_for(lambda: responds(port), deadline) else None
+        first_frame = time.monotonic() - started if wait_for(lambda: streams(port, deadline), deadline) else None
+    finally:
+        os.killpg(proc.pid, signal.SIGKILL)   # The detector processes too
+        proc.wait()
+    return first_response, first_frame
+
+
+def summary(values):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return f"{'-':>8} {'-':>8} {'-':>8}"
+    return f"{values[len(values) // 2]:>8.2f} {values[0]:>8.2f} {values[-1]:>8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first HTTP response and first live frame after a restart")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--command', default='python3 server.py')
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    results = []
+    for run in range(args.runs):
+        result = run_once(shlex.split(args.command), args.port, args.timeout)
+        results.append(result)
+        print(f"run {run + 1}: first response {result[0] or float('nan'):.2f}s, first frame {result[1] or float('nan'):.2f}s")
+        time.sleep(1.0)   # Let the port and the camera be released
+    print(f"{'':>16} {'median s':>8} {'min s':>8} {'max s':>8}")
+    print(f"{'first response':>16} {summary(r[0] for r in results)}")
+    print(f"{'first frame':>16} {summary(r[1] for r in results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# End-to-end benchmark of the detector pipeline without camera hardware.
+# A DetectorWorker runs on a synthetic source (a box sweeping across the frame)
+# or replays a video file, for a fixed time after a warm-up, and reports
+# frames/s, per-stage latency percentiles, CPU and memory. Results are written
+# as JSON so runs on different commits can be compared on the same machine.
+#
+# Usage: python3 benchmark.py [--source synthetic|FILE.mp4] [--width 640 --height 480]
+#                             [--fps 0] [--target-fps 0] [--duration 10] [--armed]
+#                             [--output result.json] [--compare baseline.json]
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Samples:
+    """Drop-in for a metrics histogram child that keeps every observation"""
+
+    def __init__(self):
+        self.values = []
+
+    def observe(self, value):
+        self.values.append(value)
+
+    def summary(self):
+        values = sorted(self.values)
+        if not values:
+            return {"count": 0}
+        result = {"count": len(values), "mean_ms": round(1000 * sum(values) / len(values), 3)}
+        for p in PERCENTILES:
+            result[f"p{p}_ms"] = round(1000 * values[min(len(values) - 1, len(values) * p // 100)], 3)
+        result["max_ms"] = round(1000 * values[-1], 3)
+        return result
+
+
+def cpu_seconds(who=resource.RUSAGE_SELF):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def memory_mb():
+    """Current and peak resident set size of this process in MB"""
+    status = {}
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                key, _, value = line.partition(':')
+                status[key] = value.strip()
+        return int(status['VmRSS'].split()[0]) / 1024, int(status['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # kB on Linux
+        return None, peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(args):
+    import cv2
+    import config
+    config.IMAGE_WIDTH, config.IMAGE_HEIGHT = args.width, args.height
+    config.MOTION_MODE = args.motion_mode
+    config.PREROLL_SECONDS = args.preroll
+    config.ADAPTIVE_ENABLED = args.adaptive   # Off by default so runs are comparable
+    if args.target_fps:
+        config.TARGET_FPS = args.target_fps
+    import detector_service
+    from frame_buffer import SharedFrameBuffer
+    from settings_channel import SharedSettings
+    import queue
+    import multiprocessing
+
+    camera_config = {"id": "bench", "source": args.source, "width": args.width, "height": args.height, "fps": args.fps}
+    frame_buffer = SharedFrameBuffer.for_frames(args.width, args.height)
+    streaming = multiprocessing.Event()
+    if args.stream:
+        streaming.set()
+    worker = detector_service.DetectorWorker(camera_config, frame_buffer, queue.Queue(), streaming,
+                                             SharedSettings(isArmed=args.armed, motion_sensitivity=args.sensitivity))
+    if not args.target_fps:
+        worker.frame_delay = 0   # Unpaced: measure how fast the pipeline can go
+
+    # Swap the metric hooks for recorders that keep every sample
+    worker.stage_timers = {stage: Samples() for stage in worker.stage_timers}
+    frame_samples = Samples()
+    process_frame = worker.process_frame
+    def timed_process_frame(*frame_args):
+        started = time.perf_counter()
+        process_frame(*frame_args)
+        frame_samples.observe(time.perf_counter() - started)
+    worker.process_frame = timed_process_frame
+
+    marks = {}
+    def start_measuring():
+        for samples in list(worker.stage_timers.values()) + [frame_samples]:
+            samples.values.clear()
+        marks.update(time=time.perf_counter(), cpu=cpu_seconds(), children=cpu_seconds(resource.RUSAGE_CHILDREN),
+                     frames=worker.frames_processed, captured=worker.camera.latest_id,
+                     dropped=worker.camera.dropped)
+    def stop_measuring():
+        marks.update(end_time=time.perf_counter(), end_cpu=cpu_seconds(),
+                     end_children=cpu_seconds(resource.RUSAGE_CHILDREN), end_frames=worker.frames_processed,
+                     end_captured=worker.camera.latest_id, end_dropped=worker.camera.dropped,
+                     rss=memory_mb())
+        worker.running = False
+
+    threading.Timer(args.warmup, start_measuring).start()
+    threading.Timer(args.warmup + args.duration, stop_measuring).start()
+    worker.run()
+    worker.stop()
+    frame_buffer.close()
+
+    elapsed = marks["end_time"] - marks["time"]
+    rss, peak_rss = marks["rss"]
+    return {
+        "fps": round((marks["end_frames"] - marks["frames"]) / elapsed, 2),
+        "frames": marks["end_frames"] - marks["frames"],
+        "capture_fps": round((marks["end_captured"] - marks["captured"]) / elapsed, 2),
+        "camera_dropped": marks["end_dropped"] - marks["dropped"],
+        "frame": frame_samples.summary(),
+        "stages": {stage: samples.summary() for stage, samples in worker.stage_timers.items()},
+        "cpu_percent": round(100 * (marks["end_cpu"] - marks["cpu"]) / elapsed, 1),
+        "cpu_children_seconds": round(marks["end_children"] - marks["children"], 3),
+        "rss_mb": round(rss, 1) if rss is not None else None,
+        "peak_rss_mb": round(peak_rss, 1),
+        "opencv": cv2.__version__,
+    }
+
+
+def print_report(result):
+    print(f"  {result['fps']:8.1f} frames/s processed   {result['capture_fps']:8.1f} frames/s captured   "
+          f"{result['camera_dropped']} dropped")
+    print(f"  CPU {result['cpu_percent']:.0f}%   RSS {result['rss_mb']} MB (peak {result['peak_rss_mb']} MB)")
+    print(f"  {'stage':<9}{'count':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    rows = dict(result["stages"], frame=result["frame"])
+    for stage, summary in rows.items():
+        if summary["count"]:
+            print(f"  {stage:<9}{summary['count']:>8}{summary['mean_ms']:>9.2f}{summary['p50_ms']:>9.2f}"
+                  f"{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}{summary['max_ms']:>9.2f}")
+
+
+def print_comparison(result, baseline):
+    base = baseline["result"]
+    print(f"Compared with {baseline['meta'].get('commit') or 'baseline'}:")
+    print(f"  frames/s {base['fps']:8.1f} → {result['fps']:8.1f}  ({100 * (result['fps'] / base['fps'] - 1):+.1f}%)")
+    print(f"  CPU      {base['cpu_percent']:7.0f}% → {result['cpu_percent']:7.0f}%")
+    for stage, summary in dict(result["stages"], frame=result["frame"]).items():
+        old = dict(base["stages"], frame=base["frame"]).get(stage, {})
+        if summary["count"] and old.get("count"):
+            change = 100 * (summary["p95_ms"] / old["p95_ms"] - 1) if old["p95_ms"] else 0
+            print(f"  {stage:<8} p95 {old['p95_ms']:7.2f} → {summary['p95_ms']:7.2f} ms  ({change:+.1f}%)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end detector pipeline benchmark")
+    parser.add_argument('--source', default='synthetic', help="'synthetic' or a video file to replay")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--fps', type=float, default=0, help="Source frame rate (0 = as fast as it can produce)")
+    parser.add_argument('--target-fps', type=float, default=0, help="Detector loop pacing (0 = unpaced)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Seconds run before measuring")
+    parser.add_argument('--armed', action='store_true', help="Record clips on motion")
+    parser.add_argument('--sensitivity', type=int, default=10)
+    parser.add_argument('--no-stream', dest='stream', action='store_false', help="Skip live JPEG encoding")
+    parser.add_argument('--motion-mode', default='diff')
+    parser.add_argument('--preroll', type=float, default=3)
+    parser.add_argument('--adaptive', action='store_true', help="Let the adaptive controller lower preview quality")
+    parser.add_argument('--output', help="Write the result as JSON")
+    parser.add_argument('--compare', help="JSON of an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.source != 'synthetic':
+        args.source = os.path.abspath(args.source)
+    output = os.path.abspath(args.output) if args.output else None
+    compare = os.path.abspath(args.compare) if args.compare else None
+    meta = {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ('output', 'compare')}}
+
+    # Clips, images and state files go to a scratch directory
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(tempfile.mkdtemp(prefix='surveillance-bench-'))
+    print(f"Benchmarking {args.source} {args.width}x{args.height} for {args.duration:.0f}s "
+          f"({'armed' if args.armed else 'disarmed'}, {'streaming' if args.stream else 'no stream'})")
+    result = run_benchmark(args)
+    print_report(result)
+    if compare:
+        with open(compare) as file:
+            print_comparison(result, json.load(file))
+    if output:
+        with open(output, 'w') as file:
+            json.dump({"meta": meta, "result": result}, file, indent=2)
+        print(f"Saved {output}")
+    os._exit(0)   # Don't wait on background threads (transcodes, clean-up) started by the detector
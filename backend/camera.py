@@ -1,20 +1,106 @@
 import cv2
-from imutils.video import VideoStream
+import importlib.util
+import numpy as np
+import os
+import threading
 import time
 import config
 
-# Try importing Picamera2 safely
-try:
-    from picamera2 import Picamera2
-    PICAMERA_AVAILABLE = True
-except ImportError:
-    PICAMERA_AVAILABLE = False
+# Picamera2 (and libcamera behind it) is slow to import, so it is only loaded
+# when a picamera source starts, never by the web server
+PICAMERA_AVAILABLE = importlib.util.find_spec("picamera2") is not None
+
+class SyntheticCapture:
+    """Hardware-free source: a box sweeping across a noisy background at a fixed FPS"""
+
+    def __init__(self, width, height, fps=0):
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps if fps else 0
+        self.next_time = time.monotonic()
+        self.index = 0
+        rng = np.random.default_rng(0)
+        self.background = rng.integers(90, 130, (height, width, 3), dtype=np.uint8)
+
+    def read(self):
+        if self.interval:
+            delay = self.next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time = max(self.next_time + self.interval, time.monotonic())
+        frame = self.background.copy()
+        size = self.height // 5
+        x = (self.index * max(1, self.width // 60)) % (self.width - size)
+        frame[self.height // 3:self.height // 3 + size, x:x + size] = (40, 200, 240)
+        self.index += 1
+        return True, frame
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+class FileCapture:
+    """Replays a video file in a loop at its own frame rate (or `fps` if given)"""
+
+    def __init__(self, path, fps=0):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        file_fps = self.capture.get(cv2.CAP_PROP_FPS) or 0
+        self.interval = 1.0 / (fps or file_fps) if (fps or file_fps) else 0
+        self.next_time = time.monotonic()
+
+    def read(self):
+        if self.interval:
+            delay = self.next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_time = max(self.next_time + self.interval, time.monotonic())
+        success, frame = self.capture.read()
+        if not success:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)   # Loop back to the start
+            success, frame = self.capture.read()
+        return success, frame
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def release(self):
+        self.capture.release()
+
+
+def camera_from_config(camera_config):
+    """Build a Camera for one entry of config.CAMERAS"""
+    source = camera_config.get("source", 0)
+    use_picamera = isinstance(source, str) and source.startswith("picamera")
+    return Camera(use_picamera=use_picamera, source=source,
+                  width=camera_config.get("width", config.IMAGE_WIDTH),
+                  height=camera_config.get("height", config.IMAGE_HEIGHT),
+                  fps=camera_config.get("fps", 0))
+
 
 class Camera:
-    def __init__(self, use_picamera=True):
+    def __init__(self, use_picamera=True, threaded=None, source=0, width=None, height=None, fps=0):
         self.use_picamera = use_picamera
+        # Device index, 'picamera[:N]', 'synthetic', or a video file / stream URL
+        self.source = source
+        self.width = width or config.IMAGE_WIDTH
+        self.height = height or config.IMAGE_HEIGHT
+        self.fps = fps   # Pacing for synthetic/file sources (0 = as fast as possible)
         self.stream = None
         self.camera = None
+        # Threaded mode: a capture thread always holds the newest frame
+        self.threaded = config.CAMERA_THREADED if threaded is None else threaded
+        self.capture_thread = None
+        self.running = False
+        self.cond = threading.Condition()
+        self.latest = None          # (frame, capture timestamp)
+        self.latest_id = 0          # Frames captured so far
+        self.consumed_id = 0        # Last frame handed out by get_frame()
+        self.dropped = 0            # Frames overwritten before anyone read them
+        self.last_timestamp = None  # Capture time of the frame returned last
 
         # Handle unavailable Picamera gracefully
         if self.use_picamera and not PICAMERA_AVAILABLE:
@@ -25,45 +111,98 @@ class Camera:
         if self.stream is None:
             if self.use_picamera and PICAMERA_AVAILABLE:
                 print("Starting Picamera2...")
-                self.stream = Picamera2()
+                from picamera2 import Picamera2
+                camera_num = int(self.source.split(':')[1]) if isinstance(self.source, str) and ':' in self.source else 0
+                self.stream = Picamera2(camera_num)
                 #camera_config = self.stream.create_video_configuration(
                 #   controls={"FrameRate": 25}  # Stable 20 FPS
                 #)
                 camera_config = self.stream.create_video_configuration({
                     "format": "RGB888",       # Preferred for OpenCV compatibility
-                    "size": (config.IMAGE_WIDTH, config.IMAGE_HEIGHT)       # Standard HD resolution
+                    "size": (self.width, self.height)       # Standard HD resolution
                 })
                 self.stream.configure(camera_config)
                 self.stream.set_controls({"FrameRate": 20})
                 self.stream.start()
+            elif self.source == 'synthetic':
+                print("Starting synthetic camera...")
+                self.camera = SyntheticCapture(self.width, self.height, self.fps)
+            elif isinstance(self.source, str) and os.path.isfile(self.source):
+                print(f"Starting file camera: {self.source}")
+                self.camera = FileCapture(self.source, self.fps)
             else:
                 try:
                     #self.stream = VideoStream(src=0).start()
-                    self.camera = cv2.VideoCapture(0)
+                    self.camera = cv2.VideoCapture(self.source)
                     print("Starting VideoStream...")
-                    time.sleep(2.0)  # Warm-up time for webcam
+                    self._wait_ready(config.CAMERA_WARMUP_TIMEOUT)
                 except AssertionError as e:
                     print(e)
                     return None
+        if self.threaded and self.capture_thread is None:
+            self.running = True
+            self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.capture_thread.start()
 
-    def get_frame(self):
+    def _wait_ready(self, timeout):
+        """Poll until the webcam delivers a frame instead of sleeping a fixed warm-up time"""
+        started = time.monotonic()
+        while time.monotonic() - started < timeout:
+            if self._read_device() is not None:
+                print(f"📷 Camera ready after {time.monotonic() - started:.2f}s")
+                return True
+            time.sleep(0.02)
+        print(f"❗ No frame from camera {self.source} after {timeout}s")
+        return False
+
+    def _read_device(self):
+        """Blocking read of one frame from the device, None on failure"""
         try:
             if self.use_picamera and PICAMERA_AVAILABLE:
                 frame = self.stream.capture_array()
-                assert frame is not None and frame.size != 0
-                #frame = cv2.cvtColor(frame_in, cv2.COLOR_RGB2BGR)
             else:
                 success, frame = self.camera.read()
-                #print(frame.shape)
-                #frame = self.stream.read()
-                assert frame is not None and frame.size != 0
-            #_, jpeg = cv2.imencode('.jpg', frame)
+            assert frame is not None and frame.size != 0
             return frame
         except AssertionError:
-            #print("Error: Empty or invalid frame detected")
             return None
 
+    def _capture_loop(self):
+        """Drain the device as fast as it delivers so the driver buffer never holds stale frames"""
+        while self.running:
+            frame = self._read_device()
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            timestamp = time.time()
+            with self.cond:
+                if self.latest_id > self.consumed_id:
+                    self.dropped += 1
+                self.latest = (frame, timestamp)
+                self.latest_id += 1
+                self.cond.notify_all()
+
+    def get_frame(self, timeout=1.0):
+        if self.threaded:
+            # Wait for a frame newer than the one returned last time
+            with self.cond:
+                if self.latest_id <= self.consumed_id:
+                    self.cond.wait(timeout)
+                if self.latest_id <= self.consumed_id:
+                    return None
+                self.consumed_id = self.latest_id
+                frame, self.last_timestamp = self.latest
+                return frame
+        frame = self._read_device()
+        if frame is not None:
+            self.last_timestamp = time.time()
+        return frame
+
     def stop(self):
+        if self.capture_thread is not None:
+            self.running = False
+            self.capture_thread.join(timeout=2.0)
+            self.capture_thread = None
         if self.camera:
             self.camera.release()
         if self.stream:
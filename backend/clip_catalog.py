@@ -0,0 +1,147 @@
+import base64
+import os
+from datetime import datetime
+from sqlalchemy import inspect, text
+import config
+from clip_files import parse_clip_filename
+from motion_timeline import read_summary
+from models import db, Clip
+
+# ============================== #
+#          Clip catalog          #
+# ============================== #
+# Clips are indexed in the database when the detector reports them finished,
+# so listing never touches the clip folders. `reconcile_clips` rebuilds the
+# index from disk once at startup to pick up anything recorded while the
+# web server was down.
+#
+# Pages are sorted by start time or, with sort='motion', by the clip's mean
+# motion score read from its timeline sidecar when it is indexed.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+SORT_KEYS = {'time': Clip.started_at, 'motion': Clip.motion_score}
+
+# Columns added to the clips table after it was first created, db.create_all never alters a table
+ADDED_COLUMNS = {
+    "motion_score": ("FLOAT NOT NULL DEFAULT 0", "ix_clips_motion_score_id", "motion_score, id"),
+}
+
+
+def upgrade_clip_table():
+    """Add columns (and their indexes) missing from a clips table created by an older version"""
+    existing = {column["name"] for column in inspect(db.engine).get_columns(Clip.__tablename__)}
+    for name, (definition, index, index_columns) in ADDED_COLUMNS.items():
+        if name in existing:
+            continue
+        with db.engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {Clip.__tablename__} ADD COLUMN {name} {definition}"))
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {Clip.__tablename__} ({index_columns})"))
+        print(f"📚 Clip index upgraded: added {name}")
+
+
+def clip_to_dict(clip):
+    return {
+        "id": clip.id,
+        "video_filename": clip.file_path,
+        "image_filename": clip.image_filename,
+        "timestamp": f"{clip.date} {clip.time}",
+        "camera_id": clip.camera_id,
+        "size": clip.size,
+        "motion_score": clip.motion_score,
+    }
+
+
+def add_clip(video_filename, commit=True):
+    """Index a finished clip (idempotent), return the Clip row or None for unknown filenames"""
+    info = parse_clip_filename(video_filename)
+    if info is None:
+        return None
+    clip = Clip.query.filter_by(file_path=video_filename).first()
+    if clip is None:
+        try:
+            started_at = datetime.strptime(info["timestamp_str"], "%Y-%m-%d_%H-%M-%S")
+        except ValueError:
+            return None
+        date, time = info["timestamp"].split(' ')
+        clip = Clip(file_path=video_filename, date=date, time=time,
+                    image_filename=info["image_filename"], camera_id=info["camera_id"],
+                    started_at=started_at)
+        db.session.add(clip)
+    try:
+        clip.size = os.path.getsize(os.path.join(config.CLIPS_FOLDER, video_filename))
+    except OSError:
+        pass
+    summary = read_summary(video_filename)
+    clip.motion_score = summary["mean_score"] if summary is not None else 0.0
+    if commit:
+        db.session.commit()
+    return clip
+
+
+def remove_clip(video_filename):
+    Clip.query.filter_by(file_path=video_filename).delete()
+    db.session.commit()
+
+
+def encode_cursor(clip, sort='time'):
+    key = clip.started_at.isoformat() if sort == 'time' else repr(clip.motion_score)
+    raw = f"{key}|{clip.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, sort='time'):
+    key, clip_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return (datetime.fromisoformat(key) if sort == 'time' else float(key)), int(clip_id)
+
+
+def parse_time(value, end_of_day=False):
+    """Accept 'YYYY-mm-dd' or a full ISO timestamp for date-range filters"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return parsed
+
+
+def query_clips(camera_id=None, start=None, end=None, order='desc', limit=DEFAULT_PAGE_SIZE, cursor=None,
+                sort='time'):
+    """One page of clips sorted by start time or motion score, plus the cursor for the next page (or None)"""
+    if sort not in SORT_KEYS:
+        raise ValueError(f"unknown sort '{sort}'")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    descending = order != 'asc'
+    key = SORT_KEYS[sort]
+    query = Clip.query
+    if camera_id is not None:
+        query = query.filter(Clip.camera_id == camera_id)
+    if start is not None:
+        query = query.filter(Clip.started_at >= start)
+    if end is not None:
+        query = query.filter(Clip.started_at <= end)
+    if cursor:
+        after_key, after_id = decode_cursor(cursor, sort)
+        if descending:
+            query = query.filter(db.or_(key < after_key, db.and_(key == after_key, Clip.id < after_id)))
+        else:
+            query = query.filter(db.or_(key > after_key, db.and_(key == after_key, Clip.id > after_id)))
+    if descending:
+        query = query.order_by(key.desc(), Clip.id.desc())
+    else:
+        query = query.order_by(key.asc(), Clip.id.asc())
+    rows = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1], sort) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def reconcile_clips():
+    """Rebuild the index from CLIPS_FOLDER: add missing clips, drop rows whose file is gone"""
+    on_disk = set(name for name in os.listdir(config.CLIPS_FOLDER) if name.endswith('.mp4'))
+    indexed = set(row.file_path for row in Clip.query.with_entities(Clip.file_path))
+    for video_filename in on_disk - indexed:
+        add_clip(video_filename, commit=False)
+    stale = indexed - on_disk
+    if stale:
+        Clip.query.filter(Clip.file_path.in_(stale)).delete(synchronize_session=False)
+    db.session.commit()
+    print(f"📚 Clip index reconciled: {len(on_disk - indexed)} added, {len(stale)} removed")
@@ -0,0 +1,49 @@
+import os
+import config
+
+# ============================== #
+#        Clip file naming        #
+# ============================== #
+# motion_<YYYY-mm-dd>_<HH-MM-SS>[_<camera id>].mp4 with a matching image_....jpg
+# snapshot. Clips of the first camera in config.CAMERAS keep the original
+# name without a camera suffix.
+
+
+def default_camera_id():
+    return config.CAMERAS[0]["id"]
+
+
+def clip_filename(timestamp, camera_id=None):
+    """Video filename for a clip started at `timestamp` ("%Y-%m-%d_%H-%M-%S")"""
+    if camera_id is None or camera_id == default_camera_id():
+        return f'motion_{timestamp}.mp4'
+    return f'motion_{timestamp}_{camera_id}.mp4'
+
+
+def image_filename_for(video_filename):
+    """Snapshot filename belonging to a clip"""
+    return 'image' + video_filename[len('motion'):].replace('.mp4', '.jpg')
+
+
+def parse_clip_filename(video_filename):
+    """Split a clip filename into its display timestamp and camera id, None if it does not match"""
+    if not video_filename.startswith('motion_') or not video_filename.endswith('.mp4'):
+        return None
+    parts = video_filename[:-len('.mp4')].split('_')
+    if len(parts) < 3:
+        return None
+    timestamp_str = '_'.join(parts[1:3])
+    return {
+        # Format timestamp for display (e.g., "2025-03-11 23:46:30")
+        "timestamp": timestamp_str.replace('_', ' '),
+        "timestamp_str": timestamp_str,
+        "camera_id": '_'.join(parts[3:]) or default_camera_id(),
+        "video_filename": video_filename,
+        "image_filename": image_filename_for(video_filename),
+    }
+
+
+def make_clip_folders():
+    """Create the folders clips and snapshots are written to (run at start-up, not on import)"""
+    for folder in (config.CLIPS_FOLDER, config.STREAM_FOLDER, config.IMAGES_FOLDER):
+        os.makedirs(folder, exist_ok=True)
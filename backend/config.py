@@ -3,8 +3,94 @@ USE_PICAMERA = False  # Toggle between True/False for different camera sources
 TARGET_FPS = 20  # Change this value for slower frame rates
 IMAGE_WIDTH = 640
 IMAGE_HEIGHT = 480
-DETECTION_DURATION = 5
+DETECTION_DURATION = 5  # Post-roll: seconds a clip keeps recording after the last motion
+RECORDING_MAX_SECONDS = 120  # Clips of continuous motion are split at this length
+RECORDING_MERGE_WINDOW = 10  # Seconds a clip stays open (paused) after the post-roll, motion resumes it (0 = close)
+RECORDING_PAUSE_BUFFER_BYTES = 24 * 1024 * 1024  # Memory cap for the frames buffered while a clip is paused, written on resume
+OVERLAY_RECORDING = 'timestamp'  # Text burned into clips, pre-roll and snapshots: 'none', 'timestamp' or 'full'
+OVERLAY_PREVIEW = 'timestamp'  # Text on the live view, on top of OVERLAY_RECORDING ('full' adds the status lines)
+CAMERA_STATUS_INTERVAL = 0.5  # Minimum seconds between 'camera_status' events (status the dashboard draws itself)
 RETENTION_DAYS = 7
+STORAGE_HIGH_WATERMARK = 0.90  # Disk use (share of the recordings filesystem) that starts deleting the oldest clips
+STORAGE_LOW_WATERMARK = 0.80  # ...and where deleting stops
+STORAGE_SWEEP_INTERVAL = 3600  # Seconds between retention checks while nothing is recorded
 CLIPS_FOLDER = 'recorded_clips'
 STREAM_FOLDER = 'stream_clips'
 IMAGES_FOLDER = 'recorded_images'
+THUMBNAILS_FOLDER = 'recorded_images/sizes'
+TIMELINES_FOLDER = 'recorded_timelines'  # Per-clip motion timeline sidecars (see motion_timeline.py)
+FRAME_BUFFER_SLOTS = 4  # Slots in the shared-memory frame ring between detector and web server
+STREAM_DROP_POLICY = 'latest_only'  # Live view per-client policy: 'latest_only' or 'drop_oldest'
+STREAM_CLIENT_DEPTH = 2  # Frames buffered per client with 'drop_oldest'
+TRANSCODE_WORKERS = 1  # Concurrent ffmpeg conversions
+TRANSCODE_QUEUE_SIZE = 8  # Pending conversions before new clips are left unconverted
+TRANSCODE_NICENESS = 10  # CPU niceness for ffmpeg (0 = same priority as capture)
+TRANSCODE_RETRIES = 2  # Extra attempts for a failed conversion
+RECORDING_BACKEND = 'ffmpeg'  # 'ffmpeg' = single-pass web-ready MP4, 'opencv' = VideoWriter + transcode
+FFMPEG_PRESET = 'veryfast'  # libx264 preset for the single-pass recorder
+FFMPEG_CRF = 23  # libx264 quality for the single-pass recorder
+RECORDER_QUEUE_FRAMES = 40  # Frames buffered towards the recorder's writer thread before new ones are dropped
+RECORDER_STOP_TIMEOUT = 1.0  # Seconds a stopping clip waits for room in a full recorder queue before it is cut short
+PREROLL_SECONDS = 3  # Seconds of video kept before motion is detected (0 = disabled)
+PREROLL_MAX_BYTES = 8 * 1024 * 1024  # Memory cap for the pre-roll buffer
+PREROLL_JPEG_QUALITY = 85  # JPEG quality of buffered pre-roll frames
+MOTION_MODE = 'diff'  # 'diff' (frame differencing), 'mog2', 'knn' or 'running_avg'
+MOTION_PROCESS_WIDTH = 320  # Width frames are downscaled to for motion detection (0 = full size)
+MOTION_MIN_AREA = 500  # Smallest moving region in px² counted, relative to a 640x480 frame
+MOTION_ROI = []  # Regions of interest, polygons of normalized (x, y) points, e.g. [[(0, 0.5), (1, 0.5), (1, 1), (0, 1)]]
+MOTION_SENSITIVITY_MAX = 50  # Largest sensitivity the settings API accepts (moving regions a frame must exceed), the dashboard slider stops at 5
+THUMBNAIL_SIZES = {'thumb': 160, 'preview': 640}  # Snapshot widths served by /api/image?size= ('full' = original)
+THUMBNAIL_QUALITY = 80  # JPEG/WebP quality of resized snapshots
+THUMBNAIL_WEBP = False  # Also write WebP sizes at clip creation (always built on request when asked for)
+THUMBNAIL_CACHE_BYTES = 16 * 1024 * 1024  # In-memory LRU budget for encoded snapshots
+NOTIFY_BATCH_WINDOW = 0.0  # Extra seconds to wait for more events of a burst (0 = batch only what is already queued)
+NOTIFY_BATCH_MAX = 100  # Largest batch handled at once
+NOTIFY_REPLAY_SIZE = 200  # Recent events kept for reconnecting clients
+METRICS_ENABLED = True  # Collect pipeline counters/timings for GET /metrics (off = timing hooks are no-ops)
+METRICS_PUSH_INTERVAL = 1.0  # Seconds between metric snapshots sent by each detector process
+LIVE_H264_FPS = 15  # Frame rate of the H.264 live view (/api/live.mp4)
+LIVE_H264_PRESET = 'veryfast'  # libx264 preset of the live encoder
+LIVE_H264_CRF = 28  # libx264 quality of the live encoder
+LIVE_H264_MAXRATE = '1M'  # Bitrate ceiling of the live encoder
+LIVE_H264_GOP_SECONDS = 0.5  # Keyframe interval = fragment length, new viewers start on the next one
+LIVE_H264_CLIENT_DEPTH = 4  # Fragments buffered per viewer before the oldest is skipped
+LIVE_H264_IDLE_SECONDS = 5  # Keep the live encoder running this long after the last viewer leaves
+STREAM_JPEG_QUALITY = 95  # Live view JPEG quality before any adaptive reduction
+# Live view presets for /api/video_stream?tier=..., width 0 = camera resolution, fps 0 = every frame.
+# Clients can also pass width/quality/fps directly; viewers with the same settings share one encode.
+STREAM_TIERS = {
+    'low': {'width': 320, 'quality': 50, 'fps': 5},
+    'medium': {'width': 640, 'quality': 70, 'fps': 10},
+    'high': {'width': 0, 'quality': STREAM_JPEG_QUALITY, 'fps': 0},
+}
+ADAPTIVE_ENABLED = True  # Trade live view FPS/quality, then detection resolution, to keep recording at TARGET_FPS
+ADAPTIVE_INTERVAL = 2.0  # Seconds between controller decisions
+ADAPTIVE_CPU_HIGH = 0.85  # System CPU use treated as overload
+ADAPTIVE_CPU_LOW = 0.60  # System CPU use below which reduced settings are restored
+ADAPTIVE_MIN_PREVIEW_FPS = 5  # Lowest live view FPS
+ADAPTIVE_MIN_JPEG_QUALITY = 50  # Lowest live view JPEG quality
+ADAPTIVE_MIN_MOTION_WIDTH = 160  # Lowest motion detection width
+FAN_MIN_DUTY = 40  # Fan PWM duty (%) while cool
+FAN_MAX_DUTY = 100  # Fan PWM duty (%) at FAN_TEMP_HIGH
+FAN_TEMP_LOW = 50  # °C where the fan starts speeding up
+FAN_TEMP_HIGH = 75  # °C for full fan speed
+SERVER_HOST = '0.0.0.0'
+SERVER_PORT = 5000
+SERVER_MAX_CONNECTIONS = 1000  # Concurrent connections (viewers, API, Socket.IO) served by server.py
+SERVER_NATIVE_THREADS = 8  # gevent pool for queue waits and JPEG encodes (needs 2 + one per camera)
+CAMERA_THREADED = True  # Capture on a separate thread that always holds the newest frame
+# Camera registry, one detector process per entry. 'source' is a device index,
+# 'picamera' / 'picamera:N', 'synthetic', or a video file / stream URL.
+# Optional keys: name, width, height, fps (synthetic/file pacing), motion_roi
+CAMERAS = [
+    {"id": "cam0", "name": "Camera", "source": "picamera" if USE_PICAMERA else 0},
+]
+DETECTOR_PIN_CORES = True  # Pin each detector process to its own CPU core (Linux)
+CAPTURE_TIMEOUT = 1.0  # Seconds the detector loop waits for a camera frame before going round without one
+HEARTBEAT_TIMEOUT = 3.0  # Seconds without progress before a detector is restarted as hung, keep above CAPTURE_TIMEOUT
+WATCHDOG_INTERVAL = 0.2  # How often the web server checks each detector's heartbeat
+DETECTOR_STARTUP_TIMEOUT = 15  # Seconds a new detector has to deliver its first frame
+DETECTOR_STOP_GRACE = 0.5  # Seconds a hung detector gets to exit on SIGTERM before SIGKILL
+ENCODER_FLUSH_TIMEOUT = 5  # Seconds an orphaned clip's ffmpeg gets to flush before it is killed
+CAMERA_WARMUP_TIMEOUT = 5  # Longest wait for a USB camera's first frame at start
+RESTART_PREPARE_DELAY = 10  # Seconds after every camera is up before the forkserver for restarts starts
@@ -0,0 +1,27 @@
+import sys
+
+# ============================== #
+#   Blocking calls under gevent  #
+# ============================== #
+# In production (server.py) the web server runs on gevent: `threading`,
+# `time.sleep`, sockets, `select` and subprocess pipes are monkey-patched and
+# yield to the event loop. Two kinds of calls still hold the whole process:
+# multiprocessing queues/locks, which wait inside C semaphores, and long
+# OpenCV calls. `run_blocking` sends those to gevent's pool of native threads
+# and waits there cooperatively; under the development server it just calls
+# the function.
+
+
+def is_gevent():
+    """True when the standard library has been monkey-patched by gevent"""
+    if 'gevent.monkey' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('threading')
+
+
+def run_blocking(function, *args, **kwargs):
+    if is_gevent():
+        import gevent
+        return gevent.get_hub().threadpool.apply(function, args, kwargs)
+    return function(*args, **kwargs)
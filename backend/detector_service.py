@@ -2,221 +2,524 @@
 
 import json
 import time
-import cv2
-import numpy as np
-from camera import Camera
-import logging, os, signal, sys, cv2, threading, time, subprocess
+import logging, os, signal, sys, threading, time, subprocess
 from datetime import datetime
 import multiprocessing
 import time
 import config
 import threading
 from rpi_handler import RpiHandler
+from frame_buffer import SharedFrameBuffer
+from transcoder import TranscodePool
+from recorder import create_recorder, link_clip
+from preroll import PreRollBuffer
+from motion_timeline import MotionTimeline
+from recording_state import RecordingStateMachine, RECORDING, COOLDOWN, START, PAUSE, RESUME, SPLIT, STOP
+from thumbnails import generate_thumbnails
+import metrics
+from adaptive import AdaptiveController, CpuSampler, FanController, read_cpu_temperature
+from adaptive import PREVIEW_FPS, JPEG_QUALITY, MOTION_WIDTH
+from clip_files import clip_filename, image_filename_for, parse_clip_filename, make_clip_folders
+from state_manager import camera_settings, load_state
+from settings_channel import SharedSettings
+from heartbeat import Heartbeat
 
-ARMED_FILE = 'system_state.json'
-
-# Path to save motion-detected videos
-#CLIPS_FOLDER = 'recorded_clips'
-os.makedirs(config.CLIPS_FOLDER, exist_ok=True)
-#STREAM_FOLDER = 'stream_clips'
-os.makedirs(config.STREAM_FOLDER, exist_ok=True)
-#IMAGES_FOLDER = 'recorded_images'
-os.makedirs(config.IMAGES_FOLDER, exist_ok=True)
-
-# Motion detection settings
-FRAME_DELAY = 1.0 / config.TARGET_FPS  # Delay to match target FPS
-print(f"FPS={config.TARGET_FPS}, DELAY={FRAME_DELAY}")
 # Brightness threashold for ready to detect motion
 BRIGHTNESS_THREASHOLD = 50
 
-# Motion detection variables
-isArmed = False     # Global state to manage ARM/DISARM mode
-detection_ready_cnt = 0 # Detection readyness delay
-prev_frame = None
-last_motion_check = 0
-motion_count = 0
-brightness = 0
-brightness_prev = 0
-motion_sensitivity = 3
-
-v_stream = None   # VideoStream
-camera = Camera(use_picamera=config.USE_PICAMERA)
-is_recording = False
-v_writer = None     # Video Writer
-recording_timer = None  # To track the timer object
-recorded_video_path = ""
-sendNotification = False # Notification state
-rpi = RpiHandler()
-notifier = None
-
-def check_json():
-    try:
-        with open(ARMED_FILE, 'r') as f:
-            state = json.load(f)
-            return state["isArmed"], state["motion_sensitivity"]
-    except FileNotFoundError:
-        return False, 3
+# The web server imports this module for the process entry point only, so OpenCV, numpy and
+# the capture modules built on them are imported when a worker is built, not with the module.
+# server.py preloads PIPELINE_MODULES in the forkserver, so restarted detectors find them loaded.
+PIPELINE_MODULES = ['camera', 'motion', 'overlay']
+
+def load_pipeline():
+    global cv2, camera_from_config, create_motion_engine, OverlayCompositor, layers_for, TIMESTAMP, STATUS
+    import cv2
+    from camera import camera_from_config
+    from motion import create_motion_engine
+    from overlay import OverlayCompositor, layers_for, TIMESTAMP, STATUS
+
+def save_first_frame(frame, video_filename):
+    """Save the first detected frame as an image"""
+    image_filename = image_filename_for(video_filename)
+    cv2.imwrite(os.path.join(config.IMAGES_FOLDER, image_filename), frame)
+    generate_thumbnails(frame, image_filename)
+
+# Pipeline metrics, shipped to the web server by `DetectorWorker.push_metrics` (see metrics.py)
+STAGES = ('capture', 'motion', 'overlay', 'record', 'preroll', 'publish')
+STAGE_SECONDS = metrics.registry.histogram('surveillance_stage_seconds', 'Time spent in each frame pipeline stage')
+FRAMES_PROCESSED = metrics.registry.counter('surveillance_frames_processed_total', 'Frames run through the detector pipeline')
+CAPTURE_FPS = metrics.registry.gauge('surveillance_capture_fps', 'Frames processed per second over the last push interval')
+CAMERA_DROPPED = metrics.registry.counter('surveillance_camera_dropped_frames_total', 'Captured frames replaced before the detector read them')
+PREROLL_BYTES = metrics.registry.gauge('surveillance_preroll_bytes', 'Memory held by the pre-roll buffer')
+RECORDINGS = metrics.registry.counter('surveillance_recordings_total', 'Clips started on motion')
+RECORDING_ACTIONS = metrics.registry.counter('surveillance_recording_actions_total',
+                                             'Recording state machine actions (start, pause, resume, split, stop)')
+TRANSCODE_SECONDS = metrics.registry.histogram('surveillance_transcode_seconds', 'ffmpeg conversion time per clip')
+TRANSCODE_PENDING = metrics.registry.gauge('surveillance_transcode_queue_depth', 'Clips waiting for a conversion')
+ADAPTIVE_SETTING = metrics.registry.gauge('surveillance_adaptive_setting', 'Current live view FPS, JPEG quality and motion width')
+ADAPTIVE_ADJUSTMENTS = metrics.registry.counter('surveillance_adaptive_adjustments_total', 'Changes made by the adaptive controller')
+LOOP_BUSY = metrics.registry.gauge('surveillance_loop_busy_ratio', 'Share of the frame budget spent processing frames')
+CPU_LOAD = metrics.registry.gauge('surveillance_cpu_load_ratio', 'System CPU use seen by the adaptive controller')
+FAN_DUTY = metrics.registry.gauge('surveillance_fan_duty_percent', 'Fan PWM duty cycle')
+CPU_TEMPERATURE = metrics.registry.gauge('surveillance_cpu_temperature_celsius', 'SoC temperature')
+# Only these leave the process, the rest of the registry is a copy of the web server's after a fork
+DETECTOR_METRICS = frozenset(metric.name for metric in (
+    STAGE_SECONDS, FRAMES_PROCESSED, CAPTURE_FPS, CAMERA_DROPPED, PREROLL_BYTES, RECORDINGS, RECORDING_ACTIONS,
+    TRANSCODE_SECONDS, TRANSCODE_PENDING, ADAPTIVE_SETTING, ADAPTIVE_ADJUSTMENTS, LOOP_BUSY, CPU_LOAD, FAN_DUTY,
+    CPU_TEMPERATURE))
 
 # ============================== #
-#         Motion Detection       #
+#         Detector worker        #
 # ============================== #
-def check_motion(new_frame):
-    global prev_frame
-    gray = cv2.cvtColor(new_frame, cv2.COLOR_RGB2GRAY)
-    gray = cv2.GaussianBlur(gray, (21, 21), 0)
-    if prev_frame is None:
-        prev_frame = gray
-
-    # Compute difference and threshold
-    frame_delta = cv2.absdiff(prev_frame, gray)
-    _, thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
-
-    # Dilate the threshold image to fill in holes
-    thresh = cv2.dilate(thresh, None, iterations=2)
-
-    # Find contours to detect motion
-    contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    detect = 0
-    for contour in contours:
-        if cv2.contourArea(contour) < 500:  # Ignore small movements
-            continue
-        detect += 1
-    
-    prev_frame = gray
-    return detect, int(round(np.mean(gray)))
-
-def detector_service(frame_queue, notification_queue, streaming_enabled_event):
-    global is_recording, v_writer, recording_timer, \
-        recorded_video_path, last_motion_check, isArmed, \
-        motion_count, brightness, motion_sensitivity, detection_ready_cnt, notifier, \
-        latest_frame_bytes
-    notifier = notification_queue
-    position = (10, 30)  # Position to place the text
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 1
-    color = (0, 255, 0)  # Green color in BGR
-    thickness = 2
-    camera.start()
-    
-    try:
-        while True:
-            # get frame from camera
-            frame = camera.get_frame()
-            if frame is not None:
-                motion_detected = False
-
-                # Check for motion every 0.5 seconds
-                current_time = time.time()
-                if current_time - last_motion_check >= 0.5:
-                    isArmed, motion_sensitivity = check_json()
-                    motion_count, brightness = check_motion(frame)
-                    # Check if image is bright enough to check detection
-                    if brightness > BRIGHTNESS_THREASHOLD:
-                        if detection_ready_cnt > 2:
-                            if motion_count > motion_sensitivity:
-                                motion_detected = True
-                        else:
-                            detection_ready_cnt+=1
-                    else:
-                        # Image is too dark for detection so reset count
-                        detection_ready_cnt = 0
-                    
-                    last_motion_check = current_time
-
-                # Get the current time
-                current_time = datetime.now().strftime("%d/%m/%y, %H:%M:%S")
-                
-                # Overlay the text on the frame
-                cv2.putText(frame, current_time, position, font, font_scale, color, thickness)
-                
-                # Start recording when motion is detected
-                if motion_detected and isArmed:
-                    if not is_recording:
-                        is_recording = True
-                        start_recording(frame)
-
-                # Record images to video
-                if is_recording and v_writer is not None:
-                    try:
-                        v_writer.write(frame)
-                    except Exception as e:
-                        print(f"❌ Error writing video: {e}")
-
-                # Stop recording if switching to DISARMED
-                if not isArmed and is_recording:
-                    stop_recording()
-                    
-                # Label onscreen message
-                txt = ("REC " if is_recording else ("ARMED" if isArmed else "DISARMED") ) \
-                    + " Motion: "+str(motion_count) \
-                    + "("+str(motion_sensitivity)+")"
-                cv2.putText(frame, txt, (10, 60), font, font_scale, color, thickness)
-                txt = "Brightness:"+str(brightness)
-                cv2.putText(frame, txt, (10, 90), font, font_scale, color, thickness)
-                
-                # Encode frame for live streaming
-                _, buffer = cv2.imencode('.jpg', frame)
-                frame_bytes = buffer.tobytes()
-                # If streaming is enabled, put frame into the queue
-                if streaming_enabled_event.is_set():
-                    # Add the latest frame to the queue (drop old frames if overloaded)
-                    if not frame_queue.full():
-                        frame_queue.put(frame.copy(), block=False)
-                time.sleep(0.05)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-
-def save_first_frame(frame, timestamp):
-    """Save the first detected frame as an image"""
-    image_path = os.path.join(config.IMAGES_FOLDER, f'image_{timestamp}.jpg')
-    cv2.imwrite(image_path, frame)
-
-def start_recording(frame):
-    global v_writer, recorded_video_path, recording_timer
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    video_path = os.path.join(config.CLIPS_FOLDER, f'motion_{timestamp}.mp4')
-    print(f"🎥 Motion detected : {video_path}")
-    recorded_video_path = video_path
-    save_first_frame(frame, timestamp)
-    #fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    fourcc = cv2.VideoWriter_fourcc(*'avc1')
-    v_writer = cv2.VideoWriter(video_path, fourcc, 20.0, (config.IMAGE_WIDTH, config.IMAGE_HEIGHT))
-    # Start a timer to stop recording after a set duration
-    if recording_timer:
-        recording_timer.cancel()  # Cancel any active timer
-    recording_timer = threading.Timer(config.DETECTION_DURATION, stop_recording)
-    recording_timer.start()
-
-def stop_recording():
-    """Stop recording safely with proper resource cleanup"""
-    global is_recording, v_writer, recorded_video_path, notifier
-    if is_recording:
-        if v_writer is not None:   # Safely release the VideoWriter
-            v_writer.release()
-            v_writer = None
-
-        # Convert mp4 video to web-compatible format
-        filename = os.path.basename(recorded_video_path)
-        converted_path = os.path.join(config.STREAM_FOLDER, filename)
-        convert_to_web_compatible(recorded_video_path, converted_path)
-        is_recording = False
-        timestamp_str = '_'.join(filename.split('_')[1:3]).replace('.mp4','')
-        
-        # Format timestamp for display (e.g., "2025-03-11 23:46:30")
-        formatted_timestamp = timestamp_str.replace('_', ' ')
-        image_filename = filename.replace('.mp4','.jpg').replace('motion','image')
+class DetectorWorker:
+    """Capture, motion detection and recording for one camera (runs in its own process)"""
+
+    def __init__(self, camera_config, frame_buffer, notification_queue, streaming_enabled_event, settings,
+                 metrics_queue=None, preview_quality=None, heartbeat=None):
+        load_pipeline()
+        self.camera_id = camera_config["id"]
+        self.camera_config = camera_config
+        self.camera = camera_from_config(camera_config)
+        make_clip_folders()
+        self.frame_buffer = frame_buffer
+        self.notifier = notification_queue
+        self.streaming_enabled_event = streaming_enabled_event
+        self.frame_delay = 1.0 / config.TARGET_FPS  # Delay to match target FPS
+
+        # Motion detection state, settings are pushed by the web server (see settings_channel.py)
+        self.settings = settings
+        self.settings_version, self.isArmed, self.motion_sensitivity = settings.read()
+        self.detection_ready_cnt = 0    # Detection readyness delay
+        self.last_motion_check = 0
+        self.motion_count = 0
+        self.brightness = 0
+        self.motion_engine = create_motion_engine(roi=camera_config.get("motion_roi"))
+
+        # Recording state
+        self.is_recording = False
+        self.v_writer = None            # Recorder (see recorder.py), stays open while paused
+        self.closing_writers = []       # Stopped recorders still writing out their clip, waited for at shutdown
+        self.recording_state = RecordingStateMachine(config.DETECTION_DURATION, config.RECORDING_MAX_SECONDS,
+                                                     config.RECORDING_MERGE_WINDOW)
+        self.recorded_video_path = ""
+        self.timeline = None            # Motion samples of the open clip (see motion_timeline.py)
+        self.clip_frames = 0            # Frames in the open clip so far, places samples in the video
+        self.paused_at = None           # Wall time the open clip was paused at
+        self.preroll = PreRollBuffer(config.PREROLL_SECONDS, config.PREROLL_MAX_BYTES)   # Frames before motion
+        self.transcoder = TranscodePool(convert_to_web_compatible,
+                                        workers=config.TRANSCODE_WORKERS,
+                                        queue_size=config.TRANSCODE_QUEUE_SIZE,
+                                        niceness=config.TRANSCODE_NICENESS,
+                                        retries=config.TRANSCODE_RETRIES,
+                                        on_status=self.notify_transcode_status)
+        self.frames_processed = 0
+        self.running = True
+        # Per-stage progress read by the web server's watchdog (see heartbeat.py)
+        self.heartbeat = heartbeat if heartbeat is not None else Heartbeat()
+
+        # On-screen text, re-rasterized only when it changes (see overlay.py). Recordings get their
+        # layers before the frame is written, the live view the rest right before publishing.
+        self.overlay = OverlayCompositor({TIMESTAMP: (10, 30), STATUS: (10, 60)})
+        self.recording_layers = layers_for(config.OVERLAY_RECORDING)
+        self.preview_layers = [layer for layer in layers_for(config.OVERLAY_PREVIEW)
+                               if layer not in self.recording_layers]
+        self.last_status = None
+        self.last_status_sent = 0
+
+        # Adaptive preview quality (see adaptive.py), recording always gets every frame
+        frame_width = camera_config.get("width", config.IMAGE_WIDTH)
+        self.adaptive = AdaptiveController(
+            preview_fps=config.TARGET_FPS, jpeg_quality=config.STREAM_JPEG_QUALITY,
+            motion_width=self.motion_engine.process_width or frame_width,
+            min_preview_fps=config.ADAPTIVE_MIN_PREVIEW_FPS, min_jpeg_quality=config.ADAPTIVE_MIN_JPEG_QUALITY,
+            min_motion_width=config.ADAPTIVE_MIN_MOTION_WIDTH, cpu_high=config.ADAPTIVE_CPU_HIGH,
+            cpu_low=config.ADAPTIVE_CPU_LOW, name=self.camera_id, on_adjust=self.notify_adjustment)
+        self.cpu_sampler = CpuSampler()
+        # One fan for the whole device, driven by the first camera's detector
+        self.fan = FanController(RpiHandler(), config.FAN_MIN_DUTY, config.FAN_MAX_DUTY, config.FAN_TEMP_LOW,
+                                 config.FAN_TEMP_HIGH) if self.camera_id == config.CAMERAS[0]["id"] else None
+        self.next_preview = 0
+        self.preview_quality = preview_quality   # Shared with the web server's live view encoder
+        self.loop_busy = 0.0        # Seconds spent in process_frame since the last decision
+        self.loop_iterations = 0
+        self.loop_missed = 0        # Iterations that overran their deadline
+        self.last_adapt = time.monotonic()
+
+        # Metrics, series are bound once so the per-frame hooks are a single call
+        self.metrics_queue = metrics_queue
+        self.stage_timers = {stage: STAGE_SECONDS.labels(camera=self.camera_id, stage=stage) for stage in STAGES}
+        self.recordings_metric = RECORDINGS.labels(camera=self.camera_id)
+        self.last_metrics_push = time.monotonic()
+        self.last_metrics_frames = 0
+
+    # ============================== #
+    #         Motion Detection       #
+    # ============================== #
+    def check_motion(self, new_frame):
+        """Return (moving regions, brightness) using the engine selected in config.py"""
+        return self.motion_engine.detect(new_frame)
+
+    def run(self):
+        heartbeat = self.heartbeat
+        self.camera.start()
+        heartbeat.done('startup')
+        next_deadline = time.monotonic()
+
+        try:
+            while self.running:
+                # get frame from camera
+                heartbeat.enter('capture')
+                started = time.perf_counter()
+                frame = self.camera.get_frame(config.CAPTURE_TIMEOUT)
+                self.stage_timers['capture'].observe(time.perf_counter() - started)
+                heartbeat.done('capture')
+                if frame is not None:
+                    heartbeat.frame()
+                    heartbeat.enter('process')
+                    started = time.perf_counter()
+                    self.process_frame(frame)
+                    self.loop_busy += time.perf_counter() - started
+                    heartbeat.done('process')
+                self.loop_iterations += 1
+                heartbeat.enter('housekeeping')
+                if time.monotonic() - self.last_adapt >= config.ADAPTIVE_INTERVAL:
+                    self.adapt()
+                if self.metrics_queue is not None and \
+                        time.monotonic() - self.last_metrics_push >= config.METRICS_PUSH_INTERVAL:
+                    self.push_metrics()
+                heartbeat.done('housekeeping')
+                heartbeat.beat()
+
+                # Pace the loop to TARGET_FPS with real deadlines instead of a fixed sleep
+                next_deadline += self.frame_delay
+                delay = next_deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.loop_missed += 1
+                    next_deadline = time.monotonic()   # Fell behind, don't burst to catch up
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+
+    def process_frame(self, frame):
+        motion_detected = False
+
+        # Pick up ARM/DISARM and sensitivity changes as soon as they are published
+        if self.settings.version != self.settings_version:
+            self.settings_version, self.isArmed, self.motion_sensitivity = self.settings.read()
+
+        # Check for motion every 0.5 seconds
+        current_time = time.time()
+        checked = current_time - self.last_motion_check >= 0.5
+        if checked:
+            started = time.perf_counter()
+            self.motion_count, self.brightness = self.check_motion(frame)
+            self.stage_timers['motion'].observe(time.perf_counter() - started)
+            # Check if image is bright enough to check detection
+            if self.brightness > BRIGHTNESS_THREASHOLD:
+                if self.detection_ready_cnt > 2:
+                    if self.motion_count > self.motion_sensitivity:
+                        motion_detected = True
+                else:
+                    self.detection_ready_cnt+=1
+            else:
+                # Image is too dark for detection so reset count
+                self.detection_ready_cnt = 0
+
+            self.last_motion_check = current_time
+
+        # Overlay the recordings' text on the frame
+        started = time.perf_counter()
+        self.overlay.set_text(TIMESTAMP, datetime.now().strftime("%d/%m/%y, %H:%M:%S"))
+        self.overlay.draw(frame, self.recording_layers)
+        overlay_time = time.perf_counter() - started
 
+        # Open, extend, pause or close the clip (see recording_state.py)
+        action = self.recording_state.update(motion_detected, self.isArmed)
+        if action is not None:
+            self.apply_recording_action(action, frame)
+        if checked and self.is_recording and self.timeline is not None:
+            self.timeline.add(self.clip_frames / config.TARGET_FPS, self.motion_engine.score, self.brightness,
+                              self.motion_engine.regions)
+
+        # Record images to video
+        started = time.perf_counter()
+        if self.is_recording and self.v_writer is not None:
+            try:
+                self.v_writer.write(frame)
+                self.clip_frames += 1
+            except Exception as e:
+                print(f"❌ Error writing video: {e}")
+            self.stage_timers['record'].observe(time.perf_counter() - started)
+        elif self.isArmed and self.preroll.seconds > 0:
+            # Keep the seconds before an event (or a paused clip's pause) as compressed packets
+            _, packet = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, config.PREROLL_JPEG_QUALITY])
+            self.preroll.push(packet)
+            self.stage_timers['preroll'].observe(time.perf_counter() - started)
+        else:
+            self.preroll.clear()
+
+        # Status for the dashboard, and as text for the live view if OVERLAY_PREVIEW asks for it
+        started = time.perf_counter()
+        state = ("REC" if self.is_recording else "HOLD" if self.recording_state.state == COOLDOWN
+                 else "ARMED" if self.isArmed else "DISARMED")
+        status = (state, self.motion_count, self.motion_sensitivity, self.brightness)
+        self.overlay.set_text(STATUS, f"{state} Motion: {self.motion_count}({self.motion_sensitivity})",
+                              f"Brightness:{self.brightness}")
+        self.notify_status(status)
+        overlay_time += time.perf_counter() - started
+
+        # If streaming is enabled, publish the frame to the shared ring buffer at the
+        # live view rate chosen by the adaptive controller; the web server encodes it
+        # once per quality tier and fans it out to all viewers (see stream_hub.py)
+        if self.streaming_enabled_event.is_set() and self.preview_due():
+            if self.preview_layers:
+                started = time.perf_counter()
+                self.overlay.draw(frame, self.preview_layers)
+                overlay_time += time.perf_counter() - started
+            started = time.perf_counter()
+            self.frame_buffer.write(frame)
+            self.stage_timers['publish'].observe(time.perf_counter() - started)
+        self.stage_timers['overlay'].observe(overlay_time)
+        self.frames_processed += 1
+
+    def preview_due(self):
+        """Whether this frame should go to the live view, half a frame of slack absorbs loop jitter"""
+        now = time.monotonic()
+        interval = 1.0 / self.adaptive[PREVIEW_FPS]
+        if now < self.next_preview - self.frame_delay / 2:
+            return False
+        self.next_preview = max(self.next_preview + interval, now - interval)
+        return True
+
+    def adapt(self):
+        """Feed loop and CPU load to the adaptive controller and apply its settings"""
+        now = time.monotonic()
+        elapsed = now - self.last_adapt
+        busy = self.loop_busy / elapsed if elapsed > 0 else 0
+        missed = self.loop_missed / self.loop_iterations if self.loop_iterations else 0
+        cpu_load = self.cpu_sampler.sample()
+        if config.ADAPTIVE_ENABLED:
+            self.adaptive.update(busy, missed, cpu_load)
+            self.motion_engine.process_width = self.adaptive[MOTION_WIDTH]
+            if self.preview_quality is not None:
+                self.preview_quality.value = self.adaptive[JPEG_QUALITY]
+        camera = self.camera_id
+        for knob in (PREVIEW_FPS, JPEG_QUALITY, MOTION_WIDTH):
+            ADAPTIVE_SETTING.set(self.adaptive[knob], camera=camera, knob=knob)
+        LOOP_BUSY.set(busy, camera=camera)
+        CPU_LOAD.set(cpu_load, camera=camera)
+        if self.fan is not None:
+            temperature = read_cpu_temperature()
+            FAN_DUTY.set(self.fan.update(temperature))
+            if temperature is not None:
+                CPU_TEMPERATURE.set(temperature)
+        self.loop_busy = 0.0
+        self.loop_iterations = 0
+        self.loop_missed = 0
+        self.last_adapt = now
+
+    def notify_adjustment(self, adjustment):
+        """Count and forward adaptive controller changes so the dashboard can show them"""
+        direction = 'down' if adjustment["new"] < adjustment["old"] else 'up'
+        ADAPTIVE_ADJUSTMENTS.inc(camera=self.camera_id, knob=adjustment["knob"], direction=direction)
+        if self.notifier is not None:
+            try:
+                self.notifier.put_nowait({"event": "adaptive_adjustment", "camera_id": self.camera_id,
+                                          "sent_at": time.time(), **adjustment})
+            except Exception:
+                pass
+
+    def start_recording(self, frame):
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        video_filename = clip_filename(timestamp, self.camera_id)
+        video_path = os.path.join(config.CLIPS_FOLDER, video_filename)
+        print(f"🎥 Motion detected : {video_path}")
+        self.recordings_metric.inc()
+        self.recorded_video_path = video_path
+        save_first_frame(frame, video_filename)
+        self.heartbeat.progress()
+        if self.notifier is not None:
+            # Lets the web server make room before the clip grows
+            self.notifier.put({"event": "recording_started", "camera_id": self.camera_id,
+                               "video_filename": video_filename, "sent_at": time.time()})
+        height, width = frame.shape[:2]
+        usage = self.preroll.memory_usage()
+        print(f"⏪ Pre-roll: {usage['frames']} frames, {usage['seconds']:.1f}s, {usage['bytes'] / 1024:.0f} KB")
+        preroll = self.preroll.drain()
+        self.v_writer = create_recorder(video_path, (width, height), config.TARGET_FPS, preroll=preroll)
+        # If this process dies before the clip is announced, the watchdog finishes it from here
+        self.heartbeat.set_clip(video_filename, self.v_writer.encoder_pid)
+        self.timeline = MotionTimeline()
+        self.clip_frames = len(preroll)
+
+    def apply_recording_action(self, action, frame):
+        """Carry out what the recording state machine decided for this frame"""
+        RECORDING_ACTIONS.inc(camera=self.camera_id, action=action)
+        if action == RESUME and self.v_writer is not None:
+            self.resume_recording()
+        if action != PAUSE:
+            # Back to the pre-roll window, the buffer covered the merge window while the clip was paused
+            self.preroll.set_limits(config.PREROLL_SECONDS, config.PREROLL_MAX_BYTES)
+        if action in (STOP, SPLIT):
+            self.stop_recording()
+        if action in (START, SPLIT):
+            self.start_recording(frame)
+        elif action == PAUSE:
+            print(f"⏸️ No motion for {config.DETECTION_DURATION}s, holding the clip open "
+                  f"for {config.RECORDING_MERGE_WINDOW}s")
+            # Buffer the whole pause, so a resumed clip continues without a jump
+            self.paused_at = time.time()
+            self.preroll.set_limits(max(config.PREROLL_SECONDS, config.RECORDING_MERGE_WINDOW),
+                                    max(config.PREROLL_MAX_BYTES, config.RECORDING_PAUSE_BUFFER_BYTES))
+        self.is_recording = self.recording_state.state == RECORDING
+
+    def resume_recording(self):
+        """Fill the pause with the frames buffered meanwhile, what the buffer had to drop is marked in the timeline"""
+        packets = self.preroll.drain()
+        missing = (packets[0][0] if packets else time.time()) - self.paused_at
+        if missing > 2.0 / config.TARGET_FPS and self.timeline is not None:
+            self.timeline.add_gap(self.clip_frames / config.TARGET_FPS, round(missing, 2))
+            print(f"⚠️ Pause buffer full, {missing:.1f}s missing from the clip")
+        self.v_writer.write_preroll(packets)
+        self.clip_frames += len(packets)
+        print(f"⏯️ Motion again, resuming clip at {self.recording_state.clip_seconds():.0f}s")
+
+    def stop_recording(self):
+        """Finalize the open clip, recording or paused, with proper resource cleanup"""
+        writer = self.v_writer
+        self.v_writer = None
+        self.is_recording = False
+        if writer is None:
+            return
         print(f"🛑 Stopping recording : {datetime.now()}")
-        if notifier is not None:
-            notifier.put({"timestamp":formatted_timestamp, "image_filename": image_filename, "video_filename": filename})
+        self.save_timeline()
+        # Finalize the clip in the background, it is announced once the web-compatible file is ready
+        writer.stop(on_ready=self.transcode_clip if writer.needs_transcode else self.notify_new_clip)
+        self.closing_writers = [w for w in self.closing_writers if w.flushing] + [writer]
+
+    def transcode_clip(self, video_path):
+        """Queue the web conversion of a clip the OpenCV recorder has finished writing"""
+        converted_path = os.path.join(config.STREAM_FOLDER, os.path.basename(video_path))
+        self.transcoder.submit(video_path, converted_path,
+                               on_done=lambda job: self.notify_new_clip(job.output_path),
+                               on_failed=self.announce_unconverted)
 
-def convert_to_web_compatible(input_path, output_path):
+    def save_timeline(self):
+        """Write the closed clip's motion timeline sidecar, before the clip is announced and indexed"""
+        timeline, self.timeline = self.timeline, None
+        if timeline is None:
+            return
+        try:
+            summary = timeline.save(os.path.basename(self.recorded_video_path))
+            print(f"📈 Motion timeline: {summary['samples']} samples, peak {summary['peak_score']:.3f} "
+                  f"at {summary['peak_time']:.1f}s")
+        except Exception as e:
+            print(f"❌ Error saving motion timeline: {e}")
+
+    def notify_new_clip(self, stream_path):
+        """Announce a clip to the frontend once its web-compatible copy exists"""
+        video_filename = os.path.basename(stream_path)
+        if (self.heartbeat.open_clip() or (None,))[0] == video_filename:
+            self.heartbeat.set_clip(None)   # Nothing left for the watchdog to recover
+        clip = parse_clip_filename(video_filename)
+        if self.notifier is not None and clip is not None:
+            self.notifier.put({"timestamp": clip["timestamp"], "image_filename": clip["image_filename"],
+                               "video_filename": clip["video_filename"], "camera_id": self.camera_id,
+                               "sent_at": time.time()})
+
+    def announce_unconverted(self, job):
+        """No web copy (transcode queue full or ffmpeg failed): serve and announce the recording as it is"""
+        try:
+            link_clip(job.input_path, job.output_path)
+        except OSError as e:
+            print(f"❌ Could not expose unconverted clip {job.input_path}: {e}")
+            return
+        print(f"⚠️ Announcing unconverted clip ({job.error}): {job.output_path}")
+        self.notify_new_clip(job.output_path)
+
+    def notify_status(self, status):
+        """Send status changes to the web server, at most every CAMERA_STATUS_INTERVAL"""
+        now = time.monotonic()
+        if status == self.last_status or now - self.last_status_sent < config.CAMERA_STATUS_INTERVAL:
+            return
+        self.last_status, self.last_status_sent = status, now
+        if self.notifier is not None:
+            state, motion_count, sensitivity, brightness = status
+            try:
+                self.notifier.put_nowait({"event": "camera_status", "camera_id": self.camera_id, "state": state,
+                                          "motion": motion_count, "sensitivity": sensitivity,
+                                          "brightness": brightness, "sent_at": time.time()})
+            except Exception:
+                pass
+
+    def notify_transcode_status(self, job_info):
+        """Forward per-job transcode progress to the web server"""
+        if job_info["run_time"] is not None:
+            TRANSCODE_SECONDS.observe(job_info["run_time"], camera=self.camera_id, status=job_info["status"])
+        if self.notifier is not None:
+            try:
+                self.notifier.put_nowait({"event": "transcode_status", "camera_id": self.camera_id,
+                                          "sent_at": time.time(), **job_info})
+            except Exception:
+                pass   # Status updates are best effort, never block on them
+
+    def push_metrics(self):
+        """Refresh the sampled gauges and send this process' metrics to the web server"""
+        now = time.monotonic()
+        camera = self.camera_id
+        CAPTURE_FPS.set((self.frames_processed - self.last_metrics_frames) / (now - self.last_metrics_push), camera=camera)
+        FRAMES_PROCESSED.set(self.frames_processed, camera=camera)
+        CAMERA_DROPPED.set(getattr(self.camera, 'dropped', 0), camera=camera)
+        PREROLL_BYTES.set(self.preroll.memory_usage()['bytes'], camera=camera)
+        TRANSCODE_PENDING.set(self.transcoder.pending(), camera=camera)
+        self.last_metrics_push = now
+        self.last_metrics_frames = self.frames_processed
+        if metrics.registry.enabled:
+            try:
+                self.metrics_queue.put_nowait((camera, metrics.registry.snapshot(DETECTOR_METRICS)))
+            except Exception:
+                pass   # Snapshots are cumulative, the next one catches up
+
+    def stop(self):
+        self.running = False
+        self.stop_recording()
+        # The feeder threads are daemons: without this a clip would be left unlinked and unannounced
+        for writer in self.closing_writers:
+            writer.finish(config.ENCODER_FLUSH_TIMEOUT)
+        self.camera.stop()
+
+def detector_service(camera_config, frame_buffer, notification_queue, streaming_enabled_event, settings, core=None,
+                     metrics_queue=None, preview_quality=None, heartbeat=None):
+    """Process entry point: run the detector for one camera, optionally pinned to a CPU core"""
+    print(f"FPS={config.TARGET_FPS}, DELAY={1.0 / config.TARGET_FPS}")
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {core})
+        except OSError as e:
+            print(f"❗ Could not pin detector {camera_config['id']} to core {core}: {e}")
+    worker = DetectorWorker(camera_config, frame_buffer, notification_queue, streaming_enabled_event, settings,
+                            metrics_queue, preview_quality, heartbeat)
+
+    # Cleanup on termination
+    def cleanup(signum, frame):
+        worker.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, cleanup)   # Handle Ctrl+C
+    signal.signal(signal.SIGTERM, cleanup)  # Handle termination
+    worker.run()
+
+def convert_to_web_compatible(input_path, output_path, niceness=0):
     """Converts recorded video to web-compatible `.mp4` format"""
+    # Run at lower CPU priority so live capture keeps up while transcoding
+    nice = ['nice', '-n', str(niceness)] if niceness else []
     try:
         if config.USE_PICAMERA:
-            subprocess.run([
-                'ffmpeg', '-i', input_path,
+            subprocess.run(nice + [
+                'ffmpeg', '-y', '-i', input_path,
                 '-c:v', 'libx264',
                 '-crf', '23',
                 '-r', '20',
@@ -227,8 +530,8 @@ def convert_to_web_compatible(input_path, output_path):
                 output_path
             ], check=True)
         else:
-            subprocess.run([
-                'ffmpeg', '-i', input_path,
+            subprocess.run(nice + [
+                'ffmpeg', '-y', '-i', input_path,
                 '-c:v', 'libx264',
                 '-crf', '23',
                 '-hide_banner', '-loglevel','error',
@@ -237,45 +540,19 @@ def convert_to_web_compatible(input_path, output_path):
                 output_path
             ], check=True)
         print(f"✅ Conversion successful: {output_path}")
-    except subprocess.CalledProcessError as e:
+        return True
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"❌ Conversion failed: {e}")
-
-# Auto-delete function
-def auto_delete_old_clips():
-    print(f"AUTO DELETE STARTED!")
-    while True:
-        now = datetime.now()
-        for filename in os.listdir(config.CLIPS_FOLDER):
-            file_path = os.path.join(config.CLIPS_FOLDER, filename)
-            if os.path.isfile(file_path):
-                # Extract the date from the filename
-                try:                  
-                    date_str = '_'.join(filename.split('_')[1:3]).split('.')[0]
-                    file_date = datetime.strptime(date_str, "%Y-%m-%d_%H-%M-%S")
-                    # Calculate file age
-                    if (now - file_date).days > config.RETENTION_DAYS:
-                        os.remove(file_path)
-                        print(f"🗑️ Deleted old clip: {filename}")
-                except (IndexError, ValueError):
-                    print(f"❗ Invalid filename format: {filename}")
-        
-        # Check for old files every 24 hours
-        time.sleep(24 * 3600)  # 86400 seconds = 1 day
-
-# Start the auto-delete function in a separate thread
-threading.Thread(target=auto_delete_old_clips, daemon=True).start()
-
-# Cleanup on App Termination
-def cleanup(signum, frame):
-    camera.stop()
-    sys.exit(0)
-
-signal.signal(signal.SIGINT, cleanup)   # Handle Ctrl+C
-signal.signal(signal.SIGTERM, cleanup)  # Handle termination
+        return False
 
 if __name__ == "__main__":
-    frame_queue = multiprocessing.Queue(maxsize=10)  # Shared frame queue
+    camera_config = config.CAMERAS[0]
+    frame_buffer = SharedFrameBuffer.for_frames(camera_config.get("width", config.IMAGE_WIDTH),
+                                                camera_config.get("height", config.IMAGE_HEIGHT),
+                                                slot_count=config.FRAME_BUFFER_SLOTS)
     notification_queue = multiprocessing.Queue(maxsize=5)
     streaming_enabled_event = multiprocessing.Event()
-    detector_process = multiprocessing.Process(target=detector_service, args=(frame_queue, notification_queue, streaming_enabled_event))
+    settings = camera_settings(load_state(), camera_config["id"])
+    shared_settings = SharedSettings(settings["isArmed"], settings["motion_sensitivity"])
+    detector_process = multiprocessing.Process(target=detector_service, args=(camera_config, frame_buffer, notification_queue, streaming_enabled_event, shared_settings))
     detector_process.start()
\ No newline at end of file
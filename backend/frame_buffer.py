@@ -0,0 +1,202 @@
+import multiprocessing
+import os
+import select
+import time
+from multiprocessing import shared_memory
+
+# ============================== #
+#   Shared-memory frame ring     #
+# ============================== #
+# Layout of the shared block:
+#   header : int64[HEADER_FIELDS + slot_count * SLOT_FIELDS]
+#            [0] latest written sequence number (0 = nothing written yet)
+#            per slot: sequence, payload length, capture time (ns),
+#                      frame height, width, channels (0 for plain bytes)
+#   slots  : slot_count * slot_size raw bytes
+#
+# A slot's sequence number is set to -1 while the producer writes into it,
+# so a reader can detect that the data it is looking at has been replaced.
+#
+# Next to the block, a non-blocking pipe serves as a doorbell: the producer
+# writes one byte per frame and readers sleep in select() on the other end
+# instead of polling the header (select is cooperative under gevent too). A
+# full pipe is simply not rung; with several readers one may drain the byte
+# meant for another, so waits are cut into DOORBELL_RECHECK slices.
+#
+# The numpy views on the block are made on first use, so the web server can
+# create the rings at start-up without importing numpy.
+HEADER_FIELDS = 1
+SLOT_FIELDS = 6
+WRITING = -1
+DOORBELL_RECHECK = 0.05
+
+
+class SharedFrameBuffer:
+    """Fixed-slot ring buffer in shared memory (one producer, many readers)"""
+
+    def __init__(self, slot_count, slot_size, name=None, create=True):
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        header_bytes = (HEADER_FIELDS + slot_count * SLOT_FIELDS) * 8
+        self._header_bytes = header_bytes
+        self._owner = create
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slot_count * slot_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.bell_reader = self.bell_writer = None
+        if create:   # A new block is zero-filled, "nothing written yet"
+            self.bell_reader, self.bell_writer = multiprocessing.Pipe(duplex=False)
+            os.set_blocking(self.bell_reader.fileno(), False)
+            os.set_blocking(self.bell_writer.fileno(), False)
+
+    @classmethod
+    def for_frames(cls, width, height, channels=3, slot_count=4):
+        """Ring sized for raw uint8 frames of the given resolution"""
+        return cls(slot_count, width * height * channels)
+
+    def _attach(self):
+        import numpy as np
+        self.header = np.ndarray((HEADER_FIELDS + self.slot_count * SLOT_FIELDS,),
+                                 dtype=np.int64, buffer=self.shm.buf)
+        self.slots = np.ndarray((self.slot_count, self.slot_size), dtype=np.uint8,
+                                buffer=self.shm.buf, offset=self._header_bytes)
+
+    def __getattr__(self, name):
+        # Only called while an attribute is missing, afterwards the views are plain attributes
+        if name in ('header', 'slots') and 'shm' in self.__dict__:
+            self._attach()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    # Processes started with "spawn" re-attach to the same block by name
+    def __getstate__(self):
+        return {"name": self.shm.name, "slot_count": self.slot_count,
+                "slot_size": self.slot_size, "bell": (self.bell_reader, self.bell_writer)}
+
+    def __setstate__(self, state):
+        self.slot_count = state["slot_count"]
+        self.slot_size = state["slot_size"]
+        self._header_bytes = (HEADER_FIELDS + self.slot_count * SLOT_FIELDS) * 8
+        self._owner = False
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.bell_reader, self.bell_writer = state["bell"]
+
+    def _slot_base(self, index):
+        return HEADER_FIELDS + index * SLOT_FIELDS
+
+    # ------------------------------ #
+    #            Producer            #
+    # ------------------------------ #
+    def write(self, data, timestamp=None):
+        """Copy a frame (ndarray) or encoded bytes into the next slot, return its sequence"""
+        import numpy as np
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            payload = np.frombuffer(data, dtype=np.uint8)
+            shape = (0, 0, 0)
+        else:
+            frame = np.ascontiguousarray(data, dtype=np.uint8)
+            payload = frame.reshape(-1)
+            shape = frame.shape + (1,) * (3 - frame.ndim)
+        length = payload.size
+        if length > self.slot_size:
+            raise ValueError(f"Payload of {length} bytes does not fit slot of {self.slot_size} bytes")
+
+        seq = int(self.header[0]) + 1
+        index = seq % self.slot_count
+        base = self._slot_base(index)
+        self.header[base] = WRITING
+        self.slots[index, :length] = payload
+        self.header[base + 1] = length
+        self.header[base + 2] = time.time_ns() if timestamp is None else int(timestamp * 1e9)
+        self.header[base + 3:base + 6] = shape
+        self.header[base] = seq
+        self.header[0] = seq
+        if self.bell_writer is not None:
+            try:
+                os.write(self.bell_writer.fileno(), b'\0')
+            except (BlockingIOError, OSError):
+                pass   # Pipe full (nobody listening) or reader gone
+        return seq
+
+    # ------------------------------ #
+    #            Consumer            #
+    # ------------------------------ #
+    @property
+    def latest_seq(self):
+        return int(self.header[0])
+
+    def read(self, seq=None):
+        """Return (seq, view, timestamp) for `seq` (default: latest) without copying.
+
+        The view points straight into shared memory and stays valid until the
+        producer wraps around the ring; use `is_current(seq)` after consuming it
+        to confirm it was not overwritten meanwhile. Returns None if the slot
+        is empty or already reused.
+        """
+        if seq is None:
+            seq = self.latest_seq
+        if seq <= 0:
+            return None
+        index = seq % self.slot_count
+        base = self._slot_base(index)
+        if int(self.header[base]) != seq:
+            return None
+        length = int(self.header[base + 1])
+        timestamp = int(self.header[base + 2]) / 1e9
+        height, width, channels = (int(v) for v in self.header[base + 3:base + 6])
+        view = self.slots[index, :length]
+        if height:
+            view = view.reshape((height, width, channels) if channels > 1 else (height, width))
+        return seq, view, timestamp
+
+    def is_current(self, seq):
+        """True while the slot holding `seq` has not been overwritten"""
+        return int(self.header[self._slot_base(seq % self.slot_count)]) == seq
+
+    def read_copy(self, seq=None):
+        """Like `read` but returns a private copy, retrying if the producer raced us"""
+        for _ in range(3):
+            item = self.read(seq)
+            if item is None:
+                return None
+            got_seq, view, timestamp = item
+            data = view.copy()
+            if self.is_current(got_seq):
+                return got_seq, data, timestamp
+            seq = None
+        return None
+
+    def wait_for_new(self, last_seq, timeout=1.0, poll_interval=0.005):
+        """Wait until a frame newer than `last_seq` is published, return its sequence or None"""
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = self.latest_seq
+            if seq > last_seq:
+                return seq
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self.bell_reader is None:   # Attached by name only, no doorbell
+                time.sleep(poll_interval)
+            elif select.select([self.bell_reader], [], [], min(remaining, DOORBELL_RECHECK))[0]:
+                try:
+                    os.read(self.bell_reader.fileno(), 4096)
+                except BlockingIOError:
+                    pass   # Another reader drained it first
+
+    def close(self):
+        # Drop numpy views first, SharedMemory refuses to close with exported buffers
+        self.header = None
+        self.slots = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass   # A reader still holds a view at shutdown, the mapping goes with the process
+        if self._owner:
+            self.bell_reader.close()
+            self.bell_writer.close()
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
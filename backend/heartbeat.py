@@ -0,0 +1,105 @@
+import multiprocessing
+import time
+
+# ============================== #
+#       Detector heartbeat       #
+# ============================== #
+# A small shared-memory record per camera, written by the detector loop and
+# read by the web server's watchdog (see run_detector_process in app.py):
+#   - when the loop last made progress and when the camera last delivered a frame
+#   - which stage the loop is in and since when, plus the last time each
+#     stage completed, so a hang can be reported as "stuck in capture for 1.4s"
+#   - the clip being recorded and its encoder's PID, so a clip cut short by a
+#     crash or a kill can still be finished and announced
+# Progress is a loop iteration completing (beat), or a progress() call from
+# long work inside the 'process' stage, such as saving a new clip's snapshot
+# and thumbnails. A missing frame is only counted outside that stage and from when
+# the loop last finished processing one, so a long recording start is not
+# mistaken for a dead camera.
+# Timestamps are time.monotonic(), which is system-wide on Linux. Writes are
+# single aligned doubles, no lock on the hot path.
+STAGES = ('startup', 'capture', 'process', 'housekeeping')
+STARTED, READY, LOOP, FRAME, STAGE, ENTERED, ENCODER_PID = range(7)
+PROGRESS = 7   # First of the per-stage "last completed" timestamps
+CLIP_NAME_BYTES = 128
+
+
+class Heartbeat:
+    def __init__(self):
+        self.values = multiprocessing.Array('d', PROGRESS + len(STAGES), lock=False)
+        self.clip_name = multiprocessing.Array('c', CLIP_NAME_BYTES, lock=False)
+
+    # Detector side
+    def enter(self, stage):
+        self.values[STAGE] = STAGES.index(stage)
+        self.values[ENTERED] = time.monotonic()
+
+    def done(self, stage):
+        self.values[PROGRESS + STAGES.index(stage)] = time.monotonic()
+
+    def frame(self):
+        """The camera delivered a frame, the first one marks the detector ready"""
+        now = time.monotonic()
+        self.values[FRAME] = now
+        if not self.values[READY]:
+            self.values[READY] = now
+
+    def beat(self):
+        """One loop iteration finished"""
+        self.values[LOOP] = time.monotonic()
+
+    def progress(self):
+        """Long work inside a stage is still under way"""
+        self.values[LOOP] = time.monotonic()
+
+    def set_clip(self, video_filename, encoder_pid=0):
+        """The clip being written, until it is announced (None when there is none)"""
+        self.clip_name.value = (video_filename or '').encode()[:CLIP_NAME_BYTES - 1]
+        self.values[ENCODER_PID] = encoder_pid or 0
+
+    # Watchdog side
+    def reset(self):
+        """Called before a detector process starts, which then has until its first frame"""
+        now = time.monotonic()
+        for index in range(len(self.values)):
+            self.values[index] = 0.0
+        self.values[STARTED] = self.values[LOOP] = self.values[ENTERED] = now
+        self.values[STAGE] = STAGES.index('startup')
+        self.clip_name.value = b''
+
+    @property
+    def ready(self):
+        return self.values[READY]
+
+    def open_clip(self):
+        """(video filename, encoder PID) of a clip that was never announced, or None"""
+        name = self.clip_name.value.decode()
+        return (name, int(self.values[ENCODER_PID])) if name else None
+
+    def stage(self):
+        return STAGES[int(self.values[STAGE])]
+
+    def stall(self, timeout, startup_timeout):
+        """(stage, reason, last progress) when the detector looks hung, None while it makes progress"""
+        now = time.monotonic()
+        stage = self.stage()
+        if not self.values[READY]:
+            if now - self.values[STARTED] > startup_timeout:
+                return stage, f"no frame {now - self.values[STARTED]:.1f}s after starting", self.values[STARTED]
+            return None
+        if now - self.values[LOOP] > timeout:
+            return stage, f"stuck in {stage} for {now - self.values[ENTERED]:.1f}s", self.values[LOOP]
+        waiting = max(self.values[FRAME], self.values[PROGRESS + STAGES.index('process')])
+        if stage != 'process' and now - waiting > timeout:
+            return 'capture', f"no frame from the camera for {now - waiting:.1f}s", waiting
+        return None
+
+    def last_progress(self):
+        """Newest sign of life, where the outage of a detector that exited is counted from"""
+        return max(self.values[LOOP], self.values[STARTED])
+
+    def snapshot(self):
+        """Seconds since each stage last completed, for the cameras API"""
+        now = time.monotonic()
+        return {stage: round(now - self.values[PROGRESS + index], 3) if self.values[PROGRESS + index] else None
+                for index, stage in enumerate(STAGES)}
@@ -0,0 +1,127 @@
+import os
+import uuid
+from flask import Response, request, send_file
+
+# ============================== #
+#   Byte-range file responses    #
+# ============================== #
+# Single ranges, conditional requests (ETag / Last-Modified / If-Range) and
+# 416 errors are handled by Werkzeug's send_file, which hands the open file to
+# the server's wsgi.file_wrapper so servers with sendfile() support copy it
+# without going through Python. Multi-range requests, which Werkzeug answers
+# with the whole file, are served here as multipart/byteranges.
+#
+# Requested ranges are sorted and merged first, so overlapping ranges cannot
+# make a response larger than the file (500 x "0-" would otherwise send the
+# clip 500 times). A request that still has more than MAX_RANGES ranges, or
+# whose ranges cover the whole file, gets a plain 200 with the whole file.
+CHUNK_SIZE = 256 * 1024
+CACHE_MAX_AGE = 3600
+MAX_RANGES = 16
+
+
+def file_etag(stat):
+    """Strong validator derived from inode, size and modification time"""
+    return f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def parse_ranges(header, size):
+    """Parse 'bytes=a-b,c-,-d' into inclusive (start, end) pairs, None if absent or malformed"""
+    if not header or not header.startswith('bytes='):
+        return None
+    ranges = []
+    for spec in header[len('bytes='):].split(','):
+        spec = spec.strip()
+        if '-' not in spec:
+            return None
+        first, last = spec.split('-', 1)
+        try:
+            if first == '':
+                length = int(last)        # Suffix range: last N bytes
+                if length <= 0:
+                    continue
+                start, end = max(0, size - length), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+        except ValueError:
+            return None
+        if start >= size or end < start:
+            continue
+        ranges.append((start, min(end, size - 1)))
+    return ranges
+
+
+def merge_ranges(ranges):
+    """Sort inclusive (start, end) pairs and merge the overlapping or adjacent ones"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _if_range_matches(etag, stat):
+    """A Range is only honoured if If-Range (when sent) still matches the file"""
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return int(stat.st_mtime) <= if_range.date.timestamp()
+    return True
+
+
+def _multipart_ranges(path, ranges, size, mimetype, boundary):
+    with open(path, 'rb') as file:
+        for start, end in ranges:
+            yield (f"\r\n--{boundary}\r\n"
+                   f"Content-Type: {mimetype}\r\n"
+                   f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode()
+            file.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def _send_range(path, mimetype, stat, etag, byte_range, as_attachment, download_name, max_age):
+    """send_file answering `byte_range` (None: the whole file) instead of the request's Range header"""
+    environ = dict(request.environ)
+    environ.pop('HTTP_RANGE', None)
+    if byte_range is not None:
+        environ['HTTP_RANGE'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+    response = send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                         download_name=download_name or os.path.basename(path),
+                         conditional=False, etag=etag, max_age=max_age)
+    return response.make_conditional(environ, accept_ranges=True, complete_length=stat.st_size)
+
+
+def send_file_ranges(path, mimetype, as_attachment=False, download_name=None, max_age=CACHE_MAX_AGE):
+    """send_file with strong ETags and multi-range (multipart/byteranges) support"""
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    ranges = parse_ranges(request.headers.get('Range'), stat.st_size)
+    if ranges:   # None (no or malformed header) and [] (nothing satisfiable) are left to Werkzeug
+        ranges = merge_ranges(ranges)
+        if len(ranges) > MAX_RANGES or ranges == [(0, stat.st_size - 1)]:
+            return _send_range(path, mimetype, stat, etag, None, as_attachment, download_name, max_age)
+        if len(ranges) == 1:
+            return _send_range(path, mimetype, stat, etag, ranges[0], as_attachment, download_name, max_age)
+        if etag not in request.if_none_match and _if_range_matches(etag, stat):
+            boundary = uuid.uuid4().hex
+            response = Response(_multipart_ranges(path, ranges, stat.st_size, mimetype, boundary),
+                                status=206, mimetype=f'multipart/byteranges; boundary={boundary}',
+                                direct_passthrough=True)
+            response.set_etag(etag)
+            response.last_modified = stat.st_mtime
+            response.headers['Accept-Ranges'] = 'bytes'
+            return response
+    return send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                     download_name=download_name or os.path.basename(path),
+                     conditional=True, etag=etag, max_age=max_age)
@@ -0,0 +1,199 @@
+import struct
+import subprocess
+import threading
+import time
+import config
+from recorder import h264_encoder_args
+from stream_hub import Subscriber, DROP_OLDEST
+
+# ============================== #
+#       H.264 live streaming     #
+# ============================== #
+# An alternative to MJPEG for remote viewing. One ffmpeg/libx264 process per
+# camera, started by the first viewer and stopped LIVE_H264_IDLE_SECONDS after
+# the last one leaves, encodes the raw frames the detector publishes for the
+# live view into fragmented MP4 (same encoder arguments as recording, see
+# recorder.h264_encoder_args). Every fragment is one GOP and starts with a
+# keyframe, so the stream is split on box boundaries and the same bytes go to
+# every viewer: the init segment (ftyp+moov) together with the first fragment,
+# then fragment after fragment. A slow viewer skips whole fragments, which
+# Media Source Extensions in 'sequence' mode play through.
+INIT_BOXES = (b'ftyp', b'moov')
+
+
+def _read_exact(stream, size):
+    chunks = []
+    while size > 0:
+        chunk = stream.read(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_boxes(stream):
+    """Yield (type, bytes) for every top-level MP4 box read from a pipe"""
+    while True:
+        header = _read_exact(stream, 8)
+        if header is None:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        if size == 1:   # 64-bit size follows
+            large = _read_exact(stream, 8)
+            if large is None:
+                return
+            header += large
+            size = struct.unpack('>Q', large)[0]
+        elif size == 0:   # Box runs to the end of the stream
+            yield box_type, header + stream.read()
+            return
+        body = _read_exact(stream, size - len(header))
+        if body is None:
+            return
+        yield box_type, header + body
+
+
+class H264LiveStream:
+    """Fragmented MP4 live stream of one camera, shared by all its viewers"""
+
+    def __init__(self, hub, fps=None, idle_seconds=None):
+        self.hub = hub
+        self.frame_buffer = hub.frame_buffer
+        self.fps = fps or config.LIVE_H264_FPS
+        self.idle_seconds = config.LIVE_H264_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.init_segment = None
+        self.last_viewer_time = time.monotonic()
+        self.fragments = 0
+        self.bytes = 0
+        self.frames = 0
+        self.encoder_starts = 0
+
+    def subscribe(self):
+        sub = Subscriber(DROP_OLDEST, config.LIVE_H264_CLIENT_DEPTH)
+        with self.lock:
+            self.subscribers.add(sub)
+            if self.thread is None or not self.thread.is_alive():
+                self.init_segment = None
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self.lock:
+            self.subscribers.discard(sub)
+            self.last_viewer_time = time.monotonic()
+
+    def viewer_count(self):
+        with self.lock:
+            return len(self.subscribers)
+
+    def stats(self):
+        with self.lock:
+            clients = [sub.stats() for sub in self.subscribers]
+        return {"running": self.thread is not None and self.thread.is_alive(), "fps": self.fps,
+                "encoder_starts": self.encoder_starts, "frames": self.frames, "fragments": self.fragments,
+                "bytes": self.bytes, "clients": clients}
+
+    def _idle(self):
+        with self.lock:
+            return not self.subscribers and time.monotonic() - self.last_viewer_time > self.idle_seconds
+
+    def _first_frame(self):
+        last_seq = self.frame_buffer.latest_seq
+        while not self._idle():
+            seq = self.frame_buffer.wait_for_new(last_seq, timeout=1.0)
+            item = self.frame_buffer.read_copy(seq) if seq is not None else None
+            if item is not None and item[1].ndim == 3:
+                return item[1]
+        return None
+
+    def _run(self):
+        self.hub.hold()   # Keep the detector publishing frames while we encode
+        proc = None
+        try:
+            frame = self._first_frame()
+            if frame is None:
+                return
+            height, width = frame.shape[:2]
+            gop = max(1, int(round(self.fps * config.LIVE_H264_GOP_SECONDS)))
+            proc = subprocess.Popen(
+                h264_encoder_args((width, height), self.fps, config.LIVE_H264_PRESET, config.LIVE_H264_CRF, gop)
+                + ['-tune', 'zerolatency', '-profile:v', 'baseline',
+                   '-maxrate', config.LIVE_H264_MAXRATE, '-bufsize', config.LIVE_H264_MAXRATE,
+                   '-f', 'mp4', 'pipe:1'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.encoder_starts += 1
+            print(f"📡 H.264 live encoder started: {width}x{height} @ {self.fps} fps")
+            reader = threading.Thread(target=self._read, args=(proc,), daemon=True)
+            reader.start()
+
+            # Constant frame rate for the encoder: repeat the last frame when the
+            # detector publishes slower, skip frames when it publishes faster
+            interval = 1.0 / self.fps
+            next_deadline = time.monotonic()
+            while not self._idle() and proc.poll() is None:
+                item = self.frame_buffer.read_copy()
+                if item is not None and item[1].shape == frame.shape:
+                    frame = item[1]
+                proc.stdin.write(frame.tobytes())
+                self.frames += 1
+                next_deadline += interval
+                delay = next_deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_deadline = time.monotonic()
+        except (BrokenPipeError, OSError) as e:
+            print(f"❌ H.264 live encoder failed: {e}")
+        finally:
+            if proc is not None:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+                try:
+                    proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                print("📡 H.264 live encoder stopped")
+            self.hub.release()
+            with self.lock:
+                for sub in self.subscribers:
+                    sub.close()   # Viewers reconnect and get a fresh init segment
+
+    def _read(self, proc):
+        init_parts, fragment = [], []
+        for box_type, data in read_boxes(proc.stdout):
+            if box_type in INIT_BOXES:
+                init_parts.append(data)
+                if box_type == b'moov':
+                    self.init_segment = b''.join(init_parts)
+            elif box_type == b'moof':
+                fragment = [data]
+            elif box_type == b'mdat':
+                fragment.append(data)
+                self._broadcast(b''.join(fragment))
+                fragment = []
+            else:
+                fragment.append(data)
+
+    def _broadcast(self, fragment):
+        if self.init_segment is None:
+            return
+        self.fragments += 1
+        self.bytes += len(fragment)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            if sub.delivered == 0:
+                # The init segment travels with the first fragment and must not be
+                # dropped, so nothing else is queued until the viewer has taken it
+                if not sub.frames:
+                    sub.offer(self.init_segment + fragment)
+                continue
+            sub.offer(fragment)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# Load test of a running server: how many live viewers and API clients one
+# device sustains. For each step of --viewers, that many MJPEG viewers stay
+# connected while --api-clients poll the JSON API (and --sockets Socket.IO
+# clients stay connected) for --duration seconds. Reports per-viewer frame
+# rate, stream bandwidth, API throughput and latency percentiles, errors, and
+# the server's CPU and memory when --pid is given. Run it from another machine
+# so the load generator does not compete with the server for the same cores;
+# on the device itself, start it with `nice -n 19` and pass --pid.
+#
+# Usage: python3 loadtest.py [--url http://DEVICE:5000] [--viewers 1,10,50,100]
+#                            [--tier medium] [--api-clients 4] [--sockets 0]
+#                            [--duration 15] [--pid SERVER_PID] [--output result.json]
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+
+PERCENTILES = (50, 95, 99)
+API_PATHS = ('/api/check_session', '/api/cameras', '/api/get_settings', '/api/clips?limit=20')
+BOUNDARY = b'--frame\r\n'
+
+
+def percentiles(values, scale=1.0):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {f"p{p}": round(scale * values[min(len(values) - 1, len(values) * p // 100)], 2) for p in PERCENTILES}
+
+
+class ProcessSampler:
+    """CPU and resident memory of the server process, from /proc"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        self.start_cpu = self.start_time = None
+
+    def _cpu_seconds(self):
+        with open(f'/proc/{self.pid}/stat') as file:
+            fields = file.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks   # utime + stime
+
+    def _rss_mb(self):
+        with open(f'/proc/{self.pid}/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+        return None
+
+    def start(self):
+        self.start_cpu, self.start_time = self._cpu_seconds(), time.monotonic()
+
+    def stop(self):
+        elapsed = time.monotonic() - self.start_time
+        return {"server_cpu_percent": round(100 * (self._cpu_seconds() - self.start_cpu) / elapsed, 1),
+                "server_rss_mb": round(self._rss_mb(), 1)}
+
+
+class Viewer(threading.Thread):
+    """One MJPEG client counting the frames it receives"""
+
+    def __init__(self, url, stop_event):
+        super().__init__(daemon=True)
+        self.url = url
+        self.stop_event = stop_event
+        self.frames = 0
+        self.bytes = 0
+        self.error = None
+        self.connect_seconds = None
+
+    def run(self):
+        parsed = urllib.parse.urlsplit(self.url)
+        started = time.monotonic()
+        try:
+            connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=10)
+            connection.request('GET', parsed.path + ('?' + parsed.query if parsed.query else ''))
+            response = connection.getresponse()
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            tail = b''
+            while not self.stop_event.is_set():
+                chunk = response.read1(65536)
+                if not chunk:
+                    raise RuntimeError("Stream closed by server")
+                if self.connect_seconds is None:
+                    self.connect_seconds = time.monotonic() - started
+                data = tail + chunk
+                self.frames += data.count(BOUNDARY)
+                self.bytes += len(chunk)
+                tail = data[-(len(BOUNDARY) - 1):]   # A boundary split across two reads
+            connection.close()
+        except Exception as e:
+            if not self.stop_event.is_set():
+                self.error = str(e)
+
+
+class ApiClient(threading.Thread):
+    """Polls the JSON API back to back over one keep-alive connection"""
+
+    def __init__(self, base_url, stop_event):
+        super().__init__(daemon=True)
+        self.base_url = urllib.parse.urlsplit(base_url)
+        self.stop_event = stop_event
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.base_url.hostname, self.base_url.port or 80, timeout=10)
+        index = 0
+        while not self.stop_event.is_set():
+            path = API_PATHS[index % len(API_PATHS)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 500:
+                    self.errors += 1
+                else:
+                    self.latencies.append(time.perf_counter() - started)
+            except Exception:
+                self.errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(self.base_url.hostname, self.base_url.port or 80, timeout=10)
+
+
+def connect_sockets(base_url, count):
+    """Socket.IO clients that stay connected during a step, returns (clients, failures)"""
+    try:
+        import socketio
+        logging.getLogger('engineio.client').setLevel(logging.CRITICAL)   # Transport notices on every connect
+    except ImportError:
+        print("  python-socketio client not installed, skipping --sockets")
+        return [], 0
+    clients, failures = [], 0
+    for _ in range(count):
+        client = socketio.Client(reconnection=False)
+        try:
+            client.connect(base_url, wait_timeout=10)
+            clients.append(client)
+        except Exception:
+            failures += 1
+    return clients, failures
+
+
+def run_step(args, viewers_count):
+    stop_event = threading.Event()
+    stream_url = f"{args.url}/api/video_stream?tier={args.tier}"
+    sockets, socket_failures = connect_sockets(args.url, args.sockets)
+    viewers = [Viewer(stream_url, stop_event) for _ in range(viewers_count)]
+    api_clients = [ApiClient(args.url, stop_event) for _ in range(args.api_clients)]
+    for viewer in viewers:
+        viewer.start()
+    time.sleep(args.warmup)   # Let every viewer connect before measuring
+
+    sampler = ProcessSampler(args.pid) if args.pid else None
+    if sampler:
+        sampler.start()
+    start_frames = [viewer.frames for viewer in viewers]
+    start_bytes = sum(viewer.bytes for viewer in viewers)
+    started = time.monotonic()
+    for client in api_clients:
+        client.start()
+    time.sleep(args.duration)
+    elapsed = time.monotonic() - started
+    fps = [(viewer.frames - frames) / elapsed for viewer, frames in zip(viewers, start_frames)]
+    stream_bytes = sum(viewer.bytes for viewer in viewers) - start_bytes
+    stop_event.set()
+    for client in sockets:
+        client.disconnect()
+
+    latencies = [latency for client in api_clients for latency in client.latencies]
+    result = {
+        "viewers": viewers_count,
+        "viewer_errors": sum(1 for viewer in viewers if viewer.error),
+        "viewer_fps_min": round(min(fps), 2) if fps else None,
+        "viewer_fps": percentiles(fps),
+        "connect_ms": percentiles([v.connect_seconds for v in viewers if v.connect_seconds is not None], 1000),
+        "stream_mbps": round(8 * stream_bytes / elapsed / 1e6, 2),
+        "api_requests_per_second": round(len(latencies) / elapsed, 1),
+        "api_errors": sum(client.errors for client in api_clients),
+        "api_ms": percentiles(latencies, 1000),
+        "sockets": len(sockets),
+        "socket_failures": socket_failures,
+    }
+    if sampler:
+        result.update(sampler.stop())
+    errors = [viewer.error for viewer in viewers if viewer.error]
+    if errors:
+        result["first_viewer_error"] = errors[0]
+    return result
+
+
+def sustained(result, baseline_fps, args):
+    """A step passes when nobody errored, viewers keep most of the frame rate and the API stays responsive"""
+    return (not result["viewer_errors"] and not result["api_errors"] and not result["socket_failures"]
+            and (result["viewer_fps_min"] or 0) >= args.min_fps_ratio * baseline_fps
+            and result["api_ms"].get("p95", 0) <= args.max_api_ms)
+
+
+def print_row(result, ok):
+    api = result["api_ms"]
+    server = (f"{result['server_cpu_percent']:6.1f}% {result['server_rss_mb']:7.1f} MB"
+              if "server_cpu_percent" in result else "")
+    print(f"  {result['viewers']:>7} {result['viewer_fps_min']:>8.1f} {result['viewer_fps'].get('p50', 0):>8.1f} "
+          f"{result['stream_mbps']:>8.1f} {result['api_requests_per_second']:>8.1f} {api.get('p50', 0):>7.1f} "
+          f"{api.get('p95', 0):>7.1f} {result['viewer_errors'] + result['api_errors']:>6}  {server}  "
+          f"{'ok' if ok else 'DEGRADED'}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent viewer and API load test of a running server")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--viewers', default='1,10,25,50,100', help="Comma separated viewer counts, one step each")
+    parser.add_argument('--tier', default='medium', help="Live view tier requested by every viewer")
+    parser.add_argument('--api-clients', type=int, default=4, help="Clients polling the JSON API during each step")
+    parser.add_argument('--sockets', type=int, default=0, help="Socket.IO connections held during each step")
+    parser.add_argument('--duration', type=float, default=15.0, help="Measured seconds per step")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Seconds for viewers to connect before measuring")
+    parser.add_argument('--pid', type=int, help="Server process to sample CPU and memory of (same machine only)")
+    parser.add_argument('--min-fps-ratio', type=float, default=0.8,
+                        help="Slowest viewer must keep this share of the single-viewer frame rate")
+    parser.add_argument('--max-api-ms', type=float, default=250.0, help="API p95 latency limit")
+    parser.add_argument('--output', help="Write the results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.url = args.url.rstrip('/')
+    steps = [int(count) for count in args.viewers.split(',')]
+    print(f"Load testing {args.url} (tier {args.tier}, {args.api_clients} API clients, {args.sockets} sockets, "
+          f"{args.duration:.0f}s per step)")
+    print(f"  {'viewers':>7} {'fps min':>8} {'fps p50':>8} {'Mbps':>8} {'API/s':>8} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'errors':>6}  {'server CPU / RSS' if args.pid else ''}")
+    results, baseline_fps, capacity = [], None, 0
+    for count in steps:
+        result = run_step(args, count)
+        if baseline_fps is None:
+            baseline_fps = result["viewer_fps"].get("p50", 0)
+        ok = sustained(result, baseline_fps, args)
+        result["sustained"] = ok
+        if ok:
+            capacity = max(capacity, count)
+        results.append(result)
+        print_row(result, ok)
+        if "first_viewer_error" in result:
+            print(f"  first viewer error: {result['first_viewer_error']}")
+        time.sleep(1)   # Let the server drop the previous step's connections
+    print(f"Sustained up to {capacity} viewers with {args.api_clients} API clients")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({"args": vars(args), "capacity": capacity, "steps": results}, file, indent=2)
+        print(f"Saved {args.output}")
+    os._exit(0)   # Viewer threads may still be blocked in a read
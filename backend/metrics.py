@@ -0,0 +1,228 @@
+import bisect
+import threading
+import config
+from cooperative import run_blocking
+
+# ============================== #
+#      Prometheus-style metrics  #
+# ============================== #
+# Every process keeps its own registry. Detector processes ship a snapshot of
+# the metrics they own (see DETECTOR_METRICS in detector_service.py) to the web
+# server every METRICS_PUSH_INTERVAL seconds over a queue (cumulative values, so
+# a lost snapshot loses nothing); the web server merges the latest snapshot of
+# each camera with its own registry on GET /metrics. A forked detector inherits
+# a copy of the web server's registry, so only the owned metrics are shipped and
+# a remote series never replaces a local one.
+#
+# With METRICS_ENABLED off, `labels()` hands out a shared no-op child, so the
+# timing hooks in the frame loop cost a method call and nothing else.
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _NullChild:
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+NULL_CHILD = _NullChild()
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self.value
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return (list(self.counts), self.sum, self.count)
+
+
+class Metric:
+    def __init__(self, registry, kind, name, help, buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.children = {}
+
+    def labels(self, **labels):
+        """The series for a label set, bind it once outside hot loops"""
+        if not self.registry.enabled:
+            return NULL_CHILD
+        key = tuple(sorted((name, str(value)) for name, value in labels.items()))
+        child = self.children.get(key)
+        if child is None:
+            child = self.children.setdefault(key, _Histogram(self.buckets) if self.kind == HISTOGRAM else _Value())
+        return child
+
+    def inc(self, amount=1, **labels):
+        self.labels(**labels).inc(amount)
+
+    def set(self, value, **labels):
+        self.labels(**labels).set(value)
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+
+class Registry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _metric(self, kind, name, help, buckets=DEFAULT_BUCKETS):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Metric(self, kind, name, help, buckets)
+            return metric
+
+    def counter(self, name, help):
+        return self._metric(COUNTER, name, help)
+
+    def gauge(self, name, help):
+        return self._metric(GAUGE, name, help)
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self._metric(HISTOGRAM, name, help, buckets)
+
+    def snapshot(self, names=None):
+        """Picklable copy of every series, or of the metrics in `names`: {name: (kind, help, buckets, {labels: value})}"""
+        with self.lock:
+            metrics = [metric for metric in self.metrics.values() if names is None or metric.name in names]
+        return {metric.name: (metric.kind, metric.help, metric.buckets,
+                              {key: child.snapshot() for key, child in list(metric.children.items())})
+                for metric in metrics}
+
+
+registry = Registry(config.METRICS_ENABLED)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_bound(bound):
+    return f"{bound:g}"
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _add(kind, a, b):
+    if kind == HISTOGRAM:
+        return ([x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2])
+    return b if kind == GAUGE else a + b
+
+
+def merge_snapshots(local, remotes=()):
+    """The local snapshot plus the remote ones: a local series always wins, series the local
+    process does not have are added up across remotes (gauges keep the latest)"""
+    merged = {name: (kind, help, buckets, dict(series)) for name, (kind, help, buckets, series) in local.items()}
+    owned = {name: set(series) for name, (_, _, _, series) in local.items()}
+    for snapshot in remotes:
+        for name, (kind, help, buckets, series) in snapshot.items():
+            if name not in merged:
+                merged[name] = (kind, help, buckets, {})
+            target = merged[name][3]
+            for key, value in series.items():
+                if key in owned.get(name, ()):
+                    continue
+                target[key] = _add(kind, target[key], value) if key in target else value
+    return merged
+
+
+def render(snapshot):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for name in sorted(snapshot):
+        kind, help, buckets, series = snapshot[name]
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key in sorted(series):
+            value = series[key]
+            if kind == HISTOGRAM:
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_bound(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+            else:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsCollector:
+    """Web-server side: latest snapshot of every detector process merged with the local registry"""
+
+    def __init__(self, source, local=registry):
+        self.source = source
+        self.local = local
+        self.remote = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            source_id, snapshot = run_blocking(self.source.get)
+            with self.lock:
+                self.remote[source_id] = snapshot
+
+    def render(self):
+        with self.lock:
+            remote = list(self.remote.values())
+        return render(merge_snapshots(self.local.snapshot(), remote))
@@ -0,0 +1,36 @@
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(50), unique=True, nullable=False)
+    password = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(100), nullable=False)
+
+class Clip(db.Model):
+    """One recorded clip, indexed by start time (see clip_catalog.py)"""
+    __tablename__ = "clips"
+    id = db.Column(db.Integer, primary_key=True)
+    file_path = db.Column(db.String(200), unique=True, nullable=False)   # Video filename in CLIPS_FOLDER
+    date = db.Column(db.String(50), nullable=False)
+    time = db.Column(db.String(50), nullable=False)
+    image_filename = db.Column(db.String(200), nullable=False)
+    camera_id = db.Column(db.String(50), nullable=False, index=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    motion_score = db.Column(db.Float, nullable=False, default=0.0)   # Mean motion score (see motion_timeline.py)
+
+    # Cursor pagination walks (started_at, id) or (motion_score, id)
+    __table_args__ = (db.Index("ix_clips_started_at_id", "started_at", "id"),
+                      db.Index("ix_clips_motion_score_id", "motion_score", "id"))
+
+class LoginAttempt(db.Model):
+    __tablename__ = "login_attempts"
+    id = db.Column(db.Integer, primary_key=True)
+    ip_address = db.Column(db.String(45), unique=True, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    blocked_until = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<LoginAttempt {self.ip_address} {self.attempts} {self.blocked_until}>"
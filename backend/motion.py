@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+import config
+
+# ============================== #
+#         Motion engines         #
+# ============================== #
+# All engines work on a downscaled grayscale copy of the frame. Contour area
+# thresholds are given for a 640x480 reference frame and scaled to the
+# processing resolution, so sensitivity does not change with the camera.
+REFERENCE_AREA = 640 * 480
+
+
+class MotionEngine(ABC):
+    """Base class: downscaling, blur, region-of-interest mask and contour counting"""
+
+    def __init__(self, process_width=320, min_area=500, roi=None):
+        self.process_width = process_width
+        self.min_area = min_area
+        self.roi = roi or []   # Polygons in normalized (0..1) coordinates
+        self._mask = None
+        self._mask_shape = None
+        self._scaled_area = min_area
+        self._blur = (21, 21)
+        # Details of the last detection, recorded in the clip's motion timeline (see motion_timeline.py)
+        self.regions = []   # Bounding boxes (x, y, w, h) of the moving regions, normalized to 0..1
+        self.score = 0.0    # Share of the frame covered by moving regions
+
+    def _prepare(self, frame):
+        """Downscaled, blurred grayscale frame plus its brightness"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        height, width = gray.shape
+        if self.process_width and width > self.process_width:
+            scaled_height = int(round(height * self.process_width / width))
+            gray = cv2.resize(gray, (self.process_width, scaled_height), interpolation=cv2.INTER_AREA)
+        if gray.shape != self._mask_shape:
+            self._configure(gray.shape)
+        gray = cv2.GaussianBlur(gray, self._blur, 0)
+        return gray, int(round(np.mean(gray)))
+
+    def _configure(self, shape):
+        """Recompute the blur kernel, area threshold and ROI mask for a new processing size"""
+        height, width = shape
+        self._mask_shape = shape
+        self._scaled_area = self.min_area * (width * height) / REFERENCE_AREA
+        # Same blur radius relative to the image as 21x21 at 640 px wide, always odd
+        k = max(3, int(round(21 * width / 640)) | 1)
+        self._blur = (k, k)
+        self._mask = None
+        if self.roi:
+            self._mask = np.zeros(shape, dtype=np.uint8)
+            for polygon in self.roi:
+                points = np.array([[x * width, y * height] for x, y in polygon], dtype=np.int32)
+                cv2.fillPoly(self._mask, [points], 255)
+
+    def _count(self, thresh):
+        if self._mask is not None:
+            thresh = cv2.bitwise_and(thresh, self._mask)
+        thresh = cv2.dilate(thresh, None, iterations=2)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        height, width = thresh.shape
+        self.regions = []
+        moving_area = 0.0
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area >= self._scaled_area:
+                x, y, w, h = cv2.boundingRect(contour)
+                self.regions.append((x / width, y / height, w / width, h / height))
+                moving_area += area
+        self.score = min(1.0, moving_area / (width * height))
+        return len(self.regions)
+
+    @abstractmethod
+    def foreground(self, gray):
+        """Binary mask (0/255) of the moving pixels in a prepared grayscale frame"""
+
+    def detect(self, frame):
+        """Return (number of moving regions, brightness) for a new frame"""
+        gray, brightness = self._prepare(frame)
+        return self._count(self.foreground(gray)), brightness
+
+
+class FrameDiffMotion(MotionEngine):
+    """Difference against the previous sampled frame (the original detector)"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prev = None
+
+    def foreground(self, gray):
+        if self.prev is None or self.prev.shape != gray.shape:
+            self.prev = gray
+        frame_delta = cv2.absdiff(self.prev, gray)
+        self.prev = gray
+        _, thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
+        return thresh
+
+
+class BackgroundSubtractorMotion(MotionEngine):
+    """Foreground from a learned background model: 'mog2', 'knn' or 'running_avg'"""
+
+    def __init__(self, method='mog2', learning_rate=0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.method = method
+        self.learning_rate = learning_rate
+        self.average = None
+        if method == 'mog2':
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+        elif method == 'knn':
+            self.subtractor = cv2.createBackgroundSubtractorKNN(history=200, detectShadows=False)
+        elif method == 'running_avg':
+            self.subtractor = None
+        else:
+            raise ValueError(f"Unknown background subtractor: {method}")
+
+    def foreground(self, gray):
+        if self.subtractor is not None:
+            return self.subtractor.apply(gray, learningRate=self.learning_rate)
+        if self.average is None or self.average.shape != gray.shape:
+            self.average = gray.astype(np.float32)
+        cv2.accumulateWeighted(gray, self.average, self.learning_rate)
+        frame_delta = cv2.absdiff(gray, cv2.convertScaleAbs(self.average))
+        _, thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)
+        return thresh
+
+
+def create_motion_engine(mode=None, process_width=None, min_area=None, roi=None):
+    """Build the engine selected in config.py (arguments override config)"""
+    mode = mode or config.MOTION_MODE
+    kwargs = {
+        "process_width": config.MOTION_PROCESS_WIDTH if process_width is None else process_width,
+        "min_area": config.MOTION_MIN_AREA if min_area is None else min_area,
+        "roi": config.MOTION_ROI if roi is None else roi,
+    }
+    if mode == 'diff':
+        return FrameDiffMotion(**kwargs)
+    return BackgroundSubtractorMotion(method=mode, **kwargs)
@@ -0,0 +1,129 @@
+import os
+import config
+
+# ============================== #
+#      Per-clip motion timeline  #
+# ============================== #
+# While a clip records, every motion check (see DetectorWorker.process_frame)
+# adds a sample: its position in the video, the motion score (share of the
+# frame that moved), brightness and the moving regions' bounding boxes. When
+# the clip closes the samples are saved next to it as a small uncompressed
+# .npz (a few KB per minute), together with a summary that the clip index
+# keeps for sorting by motion. The UI can then jump to the peak-motion moment
+# without decoding any video.
+#
+# Boxes are stored as uint16 fractions of the frame (x, y, w, h) / 65535, all
+# samples' boxes in one array; `box_counts` says how many belong to each sample.
+# `gaps` lists (video time, seconds) where footage is missing because a paused
+# clip resumed after its buffer had dropped frames (see apply_recording_action).
+BOX_SCALE = 65535
+SUMMARY_KEYS = ("samples", "peak_score", "peak_time", "mean_score", "motion_seconds")
+
+
+def timeline_filename_for(video_filename):
+    """Sidecar filename belonging to a clip"""
+    return video_filename.replace('.mp4', '.npz')
+
+
+def timeline_path_for(video_filename):
+    return os.path.join(config.TIMELINES_FOLDER, timeline_filename_for(video_filename))
+
+
+class MotionTimeline:
+    """Motion samples of one clip"""
+
+    def __init__(self):
+        self.times = []        # Seconds into the video
+        self.scores = []
+        self.brightness = []
+        self.box_counts = []
+        self.boxes = []
+        self.gaps = []         # (seconds into the video, seconds of footage missing there)
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, video_time, score, brightness, regions):
+        self.times.append(video_time)
+        self.scores.append(score)
+        self.brightness.append(brightness)
+        self.box_counts.append(len(regions))
+        self.boxes.extend(regions)
+
+    def add_gap(self, video_time, seconds):
+        self.gaps.append((video_time, seconds))
+
+    def summary(self):
+        """Aggregates computed once at clip close: peak and mean score, seconds with any motion"""
+        import numpy as np
+        if not self.times:
+            return {"samples": 0, "peak_score": 0.0, "peak_time": 0.0, "mean_score": 0.0, "motion_seconds": 0.0}
+        scores = np.asarray(self.scores, dtype=np.float32)
+        peak = int(np.argmax(scores))
+        interval = (self.times[-1] - self.times[0]) / (len(self.times) - 1) if len(self.times) > 1 else 0.0
+        return {"samples": len(self.times), "peak_score": round(float(scores[peak]), 4),
+                "peak_time": round(float(self.times[peak]), 2), "mean_score": round(float(scores.mean()), 4),
+                "motion_seconds": round(float(np.count_nonzero(self.box_counts)) * interval, 1)}
+
+    def save(self, video_filename):
+        """Write the sidecar, atomically so a reader never sees half a file"""
+        import numpy as np
+        os.makedirs(config.TIMELINES_FOLDER, exist_ok=True)
+        path = timeline_path_for(video_filename)
+        summary = self.summary()
+        boxes = np.round(np.clip(np.asarray(self.boxes, dtype=np.float32).reshape(-1, 4), 0, 1) * BOX_SCALE)
+        with open(path + '.tmp', 'wb') as file:
+            np.savez(file,
+                     time=np.asarray(self.times, dtype=np.float32),
+                     score=np.asarray(self.scores, dtype=np.float32),
+                     brightness=np.clip(self.brightness, 0, 255).astype(np.uint8),
+                     box_counts=np.asarray(self.box_counts, dtype=np.uint16),
+                     boxes=boxes.astype(np.uint16),
+                     gaps=np.asarray(self.gaps, dtype=np.float32).reshape(-1, 2),
+                     summary=np.asarray([summary[key] for key in SUMMARY_KEYS], dtype=np.float32))
+        os.replace(path + '.tmp', path)
+        return summary
+
+
+def _load(video_filename):
+    import numpy as np   # Read by the web server, which does not load numpy at start-up
+    try:
+        return np.load(timeline_path_for(video_filename))
+    except (OSError, ValueError):
+        return None
+
+
+def _summary(data):
+    summary = {key: round(value, 4) for key, value in zip(SUMMARY_KEYS, data['summary'].tolist())}
+    summary["samples"] = int(summary["samples"])
+    return summary
+
+
+def read_summary(video_filename):
+    """The clip's timeline summary, or None without a (readable) sidecar"""
+    data = _load(video_filename)
+    if data is None:
+        return None
+    with data:
+        return _summary(data)
+
+
+def load_timeline(video_filename):
+    """The whole timeline as JSON-ready lists, or None without a sidecar"""
+    data = _load(video_filename)
+    if data is None:
+        return None
+    with data:
+        import numpy as np
+        counts = data['box_counts']
+        boxes = (data['boxes'] / BOX_SCALE).round(4).tolist()
+        offsets = [0] + np.cumsum(counts, dtype=np.int64).tolist()
+        return {
+            "summary": _summary(data),
+            "time": data['time'].astype(np.float64).round(2).tolist(),
+            "score": data['score'].astype(np.float64).round(4).tolist(),
+            "brightness": data['brightness'].tolist(),
+            "boxes": [boxes[offsets[i]:offsets[i + 1]] for i in range(len(counts))],
+            "gaps": data['gaps'].astype(np.float64).round(2).tolist() if 'gaps' in data else [],
+        }
+
@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from cooperative import run_blocking
+
+# ============================== #
+#   Detector → Socket.IO bridge  #
+# ============================== #
+# One thread blocks on the multiprocessing queue, so an event is emitted as
+# soon as a detector puts it. Everything already queued behind it (plus what
+# arrives within the optional `batch_window`) is handled as one batch: the batch hook runs
+# once (e.g. one database commit for several clips) and repeated progress
+# updates for the same transcode job collapse into the newest one.
+#
+# Every other emitted event gets a sequence number and is kept in a bounded replay
+# buffer. A reconnecting client sends back the last (boot, seq) it saw and
+# receives what it missed, or a 'resync' when the buffer no longer reaches
+# back that far or the server restarted in between.
+#
+# Status events (VOLATILE_EVENTS) only matter while fresh: they collapse like
+# transcode progress, are emitted without a sequence number and are never
+# replayed. The newest one per camera is remembered instead and sent to each
+# client as it connects (see `latest_volatile`).
+#
+# Waiting on the queue goes through `run_blocking`, so under gevent it parks a
+# native pool thread rather than the event loop.
+STOP = None
+VOLATILE_EVENTS = ('camera_status',)
+# Events where only the newest per key matters within a batch
+COALESCE_KEYS = {
+    'transcode_status': lambda message: (message.get('camera_id'), message.get('id')),
+    'camera_status': lambda message: message.get('camera_id'),
+}
+
+
+class NotificationBridge:
+    def __init__(self, source, emit, on_batch=None, batch_window=0.0, batch_max=100,
+                 replay_size=200, latency_samples=1000, latency_metric=None):
+        self.source = source
+        self.emit = emit
+        self.on_batch = on_batch
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.boot = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.replay_buffer = deque(maxlen=replay_size)
+        self.replay_lock = threading.Lock()
+        self.volatile = {}   # (event, camera id) -> newest payload
+        self.latencies = deque(maxlen=latency_samples)
+        self.latency_metric = latency_metric
+        self.delivered = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.source.put(STOP)
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def _collect(self, first):
+        """The first event plus whatever follows within the batch window"""
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.monotonic()
+            try:
+                message = run_blocking(self.source.get, timeout=remaining) if remaining > 0 else self.source.get_nowait()
+            except queue.Empty:
+                break
+            if message is STOP:
+                self.source.put(STOP)   # Finish this batch, stop on the next loop
+                break
+            batch.append(message)
+        return batch
+
+    def _coalesce(self, batch):
+        """Keep only the newest status event per key (see COALESCE_KEYS), preserving order otherwise"""
+        def key(message):
+            event = message.get('event')
+            return (event, COALESCE_KEYS[event](message)) if event in COALESCE_KEYS else None
+        newest = {}
+        for index, message in enumerate(batch):
+            if key(message) is not None:
+                newest[key(message)] = index
+        kept = [message for index, message in enumerate(batch)
+                if key(message) is None or newest[key(message)] == index]
+        self.coalesced += len(batch) - len(kept)
+        return kept
+
+    def _run(self):
+        print("Notification thread started!")
+        while True:
+            first = run_blocking(self.source.get)
+            if first is STOP:
+                return
+            batch = self._coalesce(self._collect(first))
+            for message in batch:
+                message.setdefault('event', 'new_clip')
+            if self.on_batch is not None:
+                try:
+                    self.on_batch(batch)
+                except Exception as e:
+                    print(f"⚠️ Notification batch hook failed: {e}")
+            for message in batch:
+                # One bad event (unserializable payload, a client gone mid-send) must not end the only bridge thread
+                event = message['event']
+                try:
+                    self._publish(message)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ Failed to emit {event}: {e}")
+            self.batches += 1
+
+    def publish(self, event, payload):
+        """Emit an event raised in the web server itself, sequenced like detector events"""
+        self._publish(dict(payload, event=event))
+
+    def _publish(self, message):
+        event = message.pop('event')
+        sent_at = message.pop('sent_at', None)
+        with self.replay_lock:
+            if event in VOLATILE_EVENTS:
+                self.volatile[(event, message.get('camera_id'))] = message
+            else:
+                self.seq += 1
+                message['seq'] = self.seq
+                message['boot'] = self.boot
+                self.replay_buffer.append((self.seq, event, message))
+        self.emit(event, message)
+        self.delivered += 1
+        if sent_at is not None:
+            latency = time.time() - sent_at
+            self.latencies.append(latency)
+            if self.latency_metric is not None:
+                self.latency_metric.observe(latency)
+
+    def replay(self, boot, since):
+        """Events after `since` as (event, payload) pairs, or None if the client must resync"""
+        with self.replay_lock:
+            if boot != self.boot:
+                return None
+            if self.replay_buffer and self.replay_buffer[0][0] > since + 1:
+                return None
+            return [(event, payload) for seq, event, payload in self.replay_buffer if seq > since]
+
+    def latest_volatile(self):
+        """Newest status event per camera as (event, payload) pairs, for a client that just connected"""
+        with self.replay_lock:
+            return [(event, payload) for (event, _), payload in self.volatile.items()]
+
+    def stats(self):
+        samples = sorted(self.latencies)
+        def percentile(p):
+            return round(1000 * samples[min(len(samples) - 1, int(p * len(samples)))], 2) if samples else None
+        return {
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "seq": self.seq,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99),
+                           "max": round(1000 * samples[-1], 2) if samples else None},
+        }
@@ -0,0 +1,135 @@
+import cv2
+import numpy as np
+
+# ============================== #
+#       Cached text overlay      #
+# ============================== #
+# The on-screen text (timestamp, status, brightness) changes at most a few
+# times per second but used to be drawn with cv2.putText on every frame. Each
+# layer is now rasterized only when its text changes, into an antialiased
+# sprite kept as a premultiplied BGR patch plus its inverse alpha, and every
+# frame just blends that patch in: dst = dst * (255 - a) / 255 + premultiplied.
+# Both steps are single SIMD OpenCV calls on a small region of the frame.
+# Rasterizing assembles cached glyphs, antialiased putText itself is slow.
+#
+# Which layers a given output gets is decided by the caller (see the
+# OVERLAY_* policies in config.py), so a frame can be recorded with the
+# timestamp only and receive the status lines right before it is published.
+TIMESTAMP = 'timestamp'
+STATUS = 'status'
+LAYERS = (TIMESTAMP, STATUS)   # Drawing order
+POLICIES = {'none': (), 'timestamp': (TIMESTAMP,), 'full': LAYERS}
+
+
+def layers_for(policy):
+    """Layers an output gets under an OVERLAY_* policy"""
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown overlay policy '{policy}', use one of {', '.join(POLICIES)}")
+    return POLICIES[policy]
+
+
+class GlyphCache:
+    """Antialiased alpha mask of each character, drawn once; lines are assembled from them"""
+
+    def __init__(self, font, scale, thickness):
+        self.style = (font, scale, thickness)
+        self.thickness = thickness
+        # Glyphs can reach past getTextSize's box, so draw with a margin (trimmed once a sprite is built)
+        self.margin = 2 * thickness + 2
+        (_, height), baseline = cv2.getTextSize('Ag|', font, scale, thickness)
+        self.ascent = height + self.margin
+        self.height = self.ascent + baseline + self.margin
+        self.glyphs = {}
+
+    def glyph(self, char):
+        """(alpha, advance) of one character, Hershey fonts have no kerning"""
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            font, scale, thickness = self.style
+            (width, _), _ = cv2.getTextSize(char, font, scale, thickness)
+            alpha = np.zeros((self.height, width + 2 * self.margin), np.uint8)
+            cv2.putText(alpha, char, (self.margin, self.ascent), font, scale, 255, thickness, cv2.LINE_AA)
+            glyph = self.glyphs[char] = (alpha, width - thickness)
+        return glyph
+
+    def render(self, lines, line_height):
+        """Alpha mask of the lines plus its offset from the first baseline, trimmed to what was drawn"""
+        width = max(sum(self.glyph(char)[1] for char in line) for line in lines) + self.thickness
+        canvas = np.zeros((self.height + line_height * (len(lines) - 1), width + 2 * self.margin), np.uint8)
+        for index, line in enumerate(lines):
+            top, pen = index * line_height, 0
+            for char in line:
+                alpha, advance = self.glyph(char)
+                region = canvas[top:top + alpha.shape[0], pen:pen + alpha.shape[1]]
+                cv2.max(region, alpha, dst=region)
+                pen += advance
+        left, top, width, height = cv2.boundingRect(canvas)
+        return canvas[top:top + height, left:left + width], left - self.margin, top - self.ascent
+
+
+class TextSprite:
+    """Lines of text rasterized once, blended into frames at a fixed position"""
+
+    def __init__(self, glyphs, lines, origin, line_height, color):
+        x, y = origin   # Baseline of the first line, as for cv2.putText
+        self.alpha, left, top = glyphs.render(lines, line_height)
+        self.left, self.top = x + left, y + top
+        self.color = color
+        self.shape = None
+
+    def _fit(self, frame_shape):
+        """Premultiplied patch and inverse alpha, cropped to the part inside the frame"""
+        frame_height, frame_width = frame_shape[:2]
+        top, left = max(self.top, 0), max(self.left, 0)
+        alpha = self.alpha[top - self.top:max(frame_height - self.top, 0),
+                           left - self.left:max(frame_width - self.left, 0)]
+        self.region = (slice(top, top + alpha.shape[0]), slice(left, left + alpha.shape[1]))
+        self.shape = frame_shape
+        if alpha.size == 0:
+            self.inverse = alpha   # Entirely outside the frame
+            return
+        self.premultiplied = cv2.merge([cv2.convertScaleAbs(alpha, alpha=value / 255) for value in self.color])
+        self.inverse = cv2.merge([cv2.bitwise_not(alpha)] * 3)
+        self.scratch = np.empty_like(self.inverse)
+
+    def blend(self, frame):
+        if frame.shape != self.shape:
+            self._fit(frame.shape)
+        if self.inverse.size == 0:
+            return
+        region = frame[self.region]
+        cv2.multiply(region, self.inverse, dst=self.scratch, scale=1 / 255)
+        cv2.add(self.scratch, self.premultiplied, dst=region)
+
+
+class OverlayCompositor:
+    """Named text layers, each re-rasterized only when its text changes"""
+
+    def __init__(self, positions, line_height=30, font=cv2.FONT_HERSHEY_SIMPLEX, scale=1, color=(0, 255, 0),
+                 thickness=2):
+        self.positions = positions   # Layer -> baseline of its first line
+        self.glyphs = GlyphCache(font, scale, thickness)
+        self.line_height = line_height
+        self.color = color
+        self.text = {}
+        self.sprites = {}
+        self.rasterized = 0
+
+    def set_text(self, layer, *lines):
+        """Change a layer's text, the sprite is rebuilt lazily on its next draw"""
+        if self.text.get(layer) != lines:
+            self.text[layer] = lines
+            self.sprites.pop(layer, None)
+
+    def draw(self, frame, layers):
+        """Blend the given layers (in LAYERS order) into the frame in place"""
+        for layer in layers:
+            lines = self.text.get(layer)
+            if not lines:
+                continue
+            sprite = self.sprites.get(layer)
+            if sprite is None:
+                sprite = self.sprites[layer] = TextSprite(self.glyphs, lines, self.positions[layer], self.line_height,
+                                                          self.color)
+                self.rasterized += 1
+            sprite.blend(frame)
@@ -0,0 +1,61 @@
+import time
+from collections import deque
+
+# ============================== #
+#        Pre-event buffer        #
+# ============================== #
+
+
+class PreRollBuffer:
+    """Last N seconds of JPEG-encoded frames, bounded by age and total bytes
+
+    Frames are kept compressed so the memory cost is predictable (roughly
+    30-60 KB per 640x480 frame instead of 900 KB raw). When a recording
+    starts, `drain()` hands the packets to the recorder in capture order.
+    """
+
+    def __init__(self, seconds, max_bytes):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.packets = deque()   # (timestamp, jpeg bytes)
+        self.nbytes = 0
+        self.evicted = 0
+
+    def push(self, jpeg, timestamp=None):
+        if self.seconds <= 0:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        data = bytes(jpeg)
+        self.packets.append((timestamp, data))
+        self.nbytes += len(data)
+        self._evict(timestamp)
+
+    def _evict(self, now):
+        while self.packets and (now - self.packets[0][0] > self.seconds or self.nbytes > self.max_bytes):
+            _, data = self.packets.popleft()
+            self.nbytes -= len(data)
+            self.evicted += 1
+
+    def drain(self):
+        """Return buffered (timestamp, jpeg) packets oldest first and empty the buffer"""
+        packets = list(self.packets)
+        self.packets.clear()
+        self.nbytes = 0
+        return packets
+
+    def clear(self):
+        self.packets.clear()
+        self.nbytes = 0
+
+    def set_limits(self, seconds, max_bytes):
+        """Change the window, e.g. to cover the merge window while a clip is paused"""
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        if self.packets:
+            self._evict(self.packets[-1][0])
+
+    def memory_usage(self):
+        """Bytes of encoded frames currently held, plus frame count and time span"""
+        span = self.packets[-1][0] - self.packets[0][0] if len(self.packets) > 1 else 0.0
+        return {"bytes": self.nbytes, "frames": len(self.packets), "seconds": span,
+                "max_bytes": self.max_bytes, "evicted": self.evicted}
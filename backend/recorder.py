@@ -0,0 +1,269 @@
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import config
+
+# ============================== #
+#        Recording backends      #
+# ============================== #
+# 'ffmpeg' : frames are piped once into an ffmpeg/libx264 encoder which writes a
+#            fragmented MP4 straight into STREAM_FOLDER, ready for the browser.
+#            CLIPS_FOLDER gets a hard link to the same file for downloads.
+# 'opencv' : the original two-pass path, cv2.VideoWriter into CLIPS_FOLDER
+#            followed by a background ffmpeg conversion into STREAM_FOLDER.
+#
+# Both accept `preroll`, JPEG packets captured before the trigger (see
+# preroll.py), and `write_preroll` for the packets buffered while a clip was
+# paused (see recording_state.py). Frames and packets go through a bounded
+# queue to a writer thread, which decodes the packets there, so a resumed
+# clip's pause buffer or a long pre-roll never stalls the capture loop. A full
+# queue drops frames (counted in `dropped`) rather than blocking.
+#
+# `stop` never blocks the capture loop for long and `on_ready(path)` follows
+# once the file is complete; `finish` waits for that, for a detector that is
+# shutting down.
+
+
+def h264_encoder_args(frame_size, fps, preset, crf, gop):
+    """ffmpeg command (minus the output) shared by recording and the H.264 live view:
+    raw BGR frames on stdin, libx264, fragmented MP4"""
+    width, height = frame_size
+    return [
+        'ffmpeg', '-y',
+        '-hide_banner', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+        '-s', f'{width}x{height}', '-r', str(fps),
+        '-i', 'pipe:0',
+        '-c:v', 'libx264',
+        '-preset', preset,
+        '-crf', str(crf),
+        '-pix_fmt', 'yuv420p',
+        '-g', str(gop),
+        # Fragmented MP4 plays in the browser while written and survives a crash
+        '-movflags', '+frag_keyframe+empty_moov+default_base_moof',
+    ]
+
+
+def decode_preroll(packets, frame_size):
+    """Decode pre-roll JPEG packets, skipping any that do not match the clip size"""
+    import cv2
+    import numpy as np
+    for _, jpeg in packets:
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is not None and (frame.shape[1], frame.shape[0]) == tuple(frame_size):
+            yield frame
+
+
+class QueuedRecorder:
+    """Frames are handed to a writer thread, subclasses write and close the actual file"""
+
+    def __init__(self, video_path, frame_size, preroll=()):
+        self.video_path = video_path
+        self.frame_size = frame_size
+        self.preroll = preroll
+        self.dropped = 0
+        self.frames = queue.Queue(maxsize=config.RECORDER_QUEUE_FRAMES)
+        self.on_ready = None
+        self.thread = threading.Thread(target=self._feed, daemon=True)
+
+    def write(self, frame, block=False):
+        try:
+            # A copy: the caller draws the live view's overlay on the same frame afterwards
+            self.frames.put(self._pack(frame), block=block)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_preroll(self, packets):
+        """Queue pre-roll packets, decoded by the writer thread like the initial pre-roll"""
+        try:
+            self.frames.put(list(packets), block=False)
+        except queue.Full:
+            self.dropped += len(packets)
+
+    def stop(self, on_ready):
+        """Finish the file in the background and call `on_ready(path)` once it is complete"""
+        self.on_ready = on_ready
+        try:
+            self.frames.put(None, timeout=config.RECORDER_STOP_TIMEOUT)
+        except queue.Full:
+            print(f"⚠️ Encoder stuck, ending the clip early: {self.video_path}")
+            self._abort()
+
+    @property
+    def flushing(self):
+        return self.thread.is_alive()
+
+    def finish(self, timeout):
+        """Wait for a stopped clip to be complete and handed on, cutting it short after `timeout`"""
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            print(f"⚠️ Encoder still flushing after {timeout}s, ending the clip early: {self.video_path}")
+            self._abort()
+            self.thread.join(timeout)
+
+    def _feed(self):
+        path = None
+        try:
+            for frame in decode_preroll(self.preroll, self.frame_size):
+                self._write(frame)
+            self.preroll = None
+            while True:
+                data = self.frames.get()
+                if data is None:
+                    break
+                if isinstance(data, list):
+                    for frame in decode_preroll(data, self.frame_size):
+                        self._write(frame)
+                    continue
+                self._write(data)
+        except (BrokenPipeError, OSError) as e:
+            print(f"❌ Encoder closed early: {e}")
+        finally:
+            path = self._close()
+        if self.dropped:
+            print(f"⚠️ Encoder dropped {self.dropped} frames: {self.video_path}")
+        if path is not None and self.on_ready is not None:
+            self.on_ready(path)
+
+    def _drop_queued(self):
+        while True:
+            try:
+                self.frames.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                return
+
+
+class OpenCVRecorder(QueuedRecorder):
+    """cv2.VideoWriter into CLIPS_FOLDER, converted for the web afterwards"""
+    needs_transcode = True   # `on_ready` gets the CLIPS_FOLDER file, for the transcoder
+    encoder_pid = 0   # Written in-process, nothing to recover if the detector dies
+
+    def __init__(self, video_path, frame_size, fps, preroll=()):
+        import cv2
+        super().__init__(video_path, frame_size, preroll)
+        fourcc = cv2.VideoWriter_fourcc(*'avc1')
+        self.writer = cv2.VideoWriter(video_path, fourcc, fps, frame_size)
+        self.thread.start()
+
+    def _pack(self, frame):
+        return frame.copy()
+
+    def _write(self, frame):
+        self.writer.write(frame)
+
+    def _close(self):
+        self.writer.release()
+        if not os.path.exists(self.video_path) or os.path.getsize(self.video_path) == 0:
+            print(f"❌ VideoWriter wrote nothing: {self.video_path}")
+            return None
+        return self.video_path
+
+    def _abort(self):
+        # An in-process writer cannot be killed: drop what is queued so the clip ends now
+        self._drop_queued()
+        self.frames.put(None, block=False)
+
+
+class FFmpegRecorder(QueuedRecorder):
+    """Single-pass encoder: raw frames piped into ffmpeg, output is web-ready"""
+    needs_transcode = False
+
+    def __init__(self, video_path, frame_size, fps, preroll=()):
+        super().__init__(video_path, frame_size, preroll)
+        self.stream_path = os.path.join(config.STREAM_FOLDER, os.path.basename(video_path))
+        # One keyframe per second keeps fragments short
+        self.proc = subprocess.Popen(
+            h264_encoder_args(frame_size, fps, config.FFMPEG_PRESET, config.FFMPEG_CRF, gop=int(fps))
+            + [self.stream_path], stdin=subprocess.PIPE)
+        self.encoder_pid = self.proc.pid   # Outlives a crashed detector (see recover_clip)
+        self.thread.start()
+
+    def _pack(self, frame):
+        return frame.tobytes()
+
+    def _write(self, data):
+        self.proc.stdin.write(data)
+
+    def _close(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        returncode = self.proc.wait()
+        if not os.path.exists(self.stream_path) or os.path.getsize(self.stream_path) == 0:
+            print(f"❌ ffmpeg exited with code {returncode} without writing {self.stream_path}")
+            return None
+        if returncode != 0:
+            # Like a recovered clip, the fragmented MP4 plays up to its last complete fragment
+            print(f"⚠️ ffmpeg exited with code {returncode}, keeping the clip up to its last fragment: "
+                  f"{self.stream_path}")
+        else:
+            print(f"✅ Recording ready: {self.stream_path}")
+        link_clip(self.stream_path, self.video_path)
+        return self.stream_path
+
+    def _abort(self):
+        # The writer thread sees the pipe break and the clip ends at its last fragment
+        self.proc.kill()
+
+
+def link_clip(src, dst):
+    """Expose the encoded file in CLIPS_FOLDER too, without using extra disk space"""
+    try:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _encoder_running(pid):
+    """Whether `pid` is still a live ffmpeg (not exited, not a zombie, not a reused PID)"""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            name, state = stat.read().rsplit(')', 1)
+    except OSError:
+        return False
+    return name.endswith('(ffmpeg') and state.split()[0] != 'Z'
+
+
+def recover_clip(video_filename, encoder_pid=0, timeout=5.0):
+    """Finish a clip whose detector died while recording: the encoder flushes once its stdin closes
+    (killed after `timeout`) and the fragmented MP4 is playable up to its last fragment. Returns the
+    STREAM_FOLDER path, or None if nothing usable was written ('opencv' clips cannot be recovered)"""
+    if encoder_pid:
+        deadline = time.monotonic() + timeout
+        while _encoder_running(encoder_pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if _encoder_running(encoder_pid):
+            print(f"⚠️ Encoder {encoder_pid} still running after {timeout}s, killing it")
+            try:
+                os.kill(encoder_pid, signal.SIGKILL)
+            except OSError:
+                pass
+    stream_path = os.path.join(config.STREAM_FOLDER, video_filename)
+    if not encoder_pid or not os.path.exists(stream_path) or os.path.getsize(stream_path) == 0:
+        return None
+    link_clip(stream_path, os.path.join(config.CLIPS_FOLDER, video_filename))
+    return stream_path
+
+
+def ffmpeg_available():
+    return shutil.which('ffmpeg') is not None
+
+
+def create_recorder(video_path, frame_size, fps, preroll=()):
+    """Open a recorder using config.RECORDING_BACKEND, falling back to the two-pass path"""
+    if config.RECORDING_BACKEND == 'ffmpeg':
+        if ffmpeg_available():
+            try:
+                return FFmpegRecorder(video_path, frame_size, fps, preroll)
+            except OSError as e:
+                print(f"❌ Failed to start ffmpeg encoder: {e}")
+        print("⚠️ ffmpeg recorder unavailable, falling back to OpenCV + transcode")
+    return OpenCVRecorder(video_path, frame_size, fps, preroll)
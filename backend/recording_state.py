@@ -0,0 +1,82 @@
+import time
+
+# ============================== #
+#     Recording state machine    #
+# ============================== #
+# Decides when a clip opens, grows, pauses and closes, so a long event is one
+# clip (one snapshot, one encode, one notification) instead of a string of
+# fixed-length ones:
+#   idle      --motion-->                 recording  (START)
+#   recording --motion-->                 recording  (the post-roll restarts)
+#   recording --post_roll without motion--> cooldown (PAUSE, writer stays open)
+#   cooldown  --motion-->                 recording  (RESUME, same clip)
+#   cooldown  --merge_window elapsed-->   idle       (STOP)
+# A clip that reaches `max_length` is closed and, if the scene is still moving,
+# a new one starts right away (SPLIT). Disarming closes any open clip.
+#
+# The machine only looks at the clock it is given, so it can be driven by a
+# fake clock (see bench_recording.py); it never touches the writer itself.
+IDLE = 'idle'
+RECORDING = 'recording'
+COOLDOWN = 'cooldown'
+
+START = 'start'     # Open a new clip
+PAUSE = 'pause'     # Stop writing frames (they are buffered for a resume), keep the clip open
+RESUME = 'resume'   # Write frames into the open clip again
+SPLIT = 'split'     # Close the clip and open the next one
+STOP = 'stop'       # Close the clip
+
+
+class RecordingStateMachine:
+    def __init__(self, post_roll, max_length, merge_window, clock=time.monotonic):
+        self.post_roll = post_roll          # Seconds recorded after the last motion
+        self.max_length = max_length        # Seconds after which a clip is split
+        self.merge_window = merge_window    # Seconds a paused clip waits for more motion
+        self.clock = clock
+        self.state = IDLE
+        self.clip_started = None
+        self.last_motion = None
+        self.paused_at = None
+        self.counts = {START: 0, PAUSE: 0, RESUME: 0, SPLIT: 0, STOP: 0}
+
+    def update(self, motion, armed=True):
+        """Advance on one frame, return the action the recorder must take or None"""
+        now = self.clock()
+        if not armed:
+            return self._to(IDLE, STOP) if self.state != IDLE else None
+        if motion:
+            self.last_motion = now
+
+        if self.state == IDLE:
+            if motion:
+                self.clip_started = now
+                return self._to(RECORDING, START)
+        elif self.state == RECORDING:
+            if now - self.last_motion >= self.post_roll:
+                if self.merge_window > 0:
+                    self.paused_at = now
+                    return self._to(COOLDOWN, PAUSE)
+                return self._to(IDLE, STOP)
+            if now - self.clip_started >= self.max_length:
+                self.clip_started = now
+                return self._to(RECORDING, SPLIT)
+        elif self.state == COOLDOWN:
+            if motion:
+                if now - self.clip_started >= self.max_length:
+                    self.clip_started = now
+                    return self._to(RECORDING, SPLIT)
+                return self._to(RECORDING, RESUME)
+            if now - self.paused_at >= self.merge_window:
+                return self._to(IDLE, STOP)
+        return None
+
+    def _to(self, state, action):
+        self.state = state
+        if state == IDLE:
+            self.clip_started = self.paused_at = None
+        self.counts[action] += 1
+        return action
+
+    def clip_seconds(self):
+        """Wall time since the open clip started, pauses included"""
+        return self.clock() - self.clip_started if self.clip_started is not None else 0.0
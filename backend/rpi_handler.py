@@ -1,3 +1,5 @@
+import config
+
 # Try importing RPi.GPIO safely
 try:
     import RPi.GPIO as GPIO
@@ -7,6 +9,7 @@ except ImportError:
 
 class RpiHandler:
     def __init__(self):
+        self.fan_duty = config.FAN_MIN_DUTY
         if RPI_GPIO_AVAIL:
             self.fan_pin = 12
             GPIO.setwarnings(False)			#disable warnings
@@ -14,4 +17,10 @@ class RpiHandler:
             GPIO.setup(self.fan_pin,GPIO.OUT)
             self.pi_pwm = GPIO.PWM(self.fan_pin,80)		#create PWM instance with frequency
             self.pi_pwm.start(0)				#start PWM of required Duty Cycle 
-            self.pi_pwm.ChangeDutyCycle(40)
\ No newline at end of file
+            self.pi_pwm.ChangeDutyCycle(self.fan_duty)
+
+    def set_fan_duty(self, duty):
+        """Fan PWM duty cycle in percent"""
+        self.fan_duty = duty
+        if RPI_GPIO_AVAIL:
+            self.pi_pwm.ChangeDutyCycle(duty)
\ No newline at end of file
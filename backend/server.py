@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# Production server: the same app as `python3 app.py`, served by gevent instead
+# of Flask's development server. Every HTTP request, MJPEG/H.264 viewer and
+# Socket.IO connection is a greenlet rather than an OS thread, so hundreds of
+# idle viewers cost memory, not context switches.
+#
+# The standard library is monkey-patched before anything else is imported.
+# Detector processes run on plain threads, not inherited greenlets: they are
+# started with "spawn", once the web server's imports are done, so on a single
+# core their OpenCV/numpy imports overlap the database set-up rather than the
+# import of Flask (the web server itself never loads OpenCV until someone
+# watches). Replacements for failed detectors are forked from a "forkserver"
+# that has imported the detector modules, started once every camera is up (see
+# prepare_restarts in app.py), so a restart costs a fork instead of a fresh
+# interpreter. Everything here stays under the main guard because spawned
+# children re-import this file.
+#
+# Usage: python3 server.py
+
+if __name__ == "__main__":
+    from gevent import monkey
+    monkey.patch_all()
+
+    import multiprocessing
+    multiprocessing.set_start_method('spawn')
+    restart_context = None
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        import detector_service
+        multiprocessing.set_forkserver_preload(['detector_service'] + detector_service.PIPELINE_MODULES)
+        restart_context = multiprocessing.get_context('forkserver')
+
+    import gevent
+    import config
+    gevent.get_hub().threadpool.maxsize = config.SERVER_NATIVE_THREADS
+
+    import app
+    app.run_server(restart_context)
@@ -0,0 +1,32 @@
+import multiprocessing
+
+# ============================== #
+#   Shared settings channel      #
+# ============================== #
+# One small shared-memory record per camera: [version, isArmed, motion_sensitivity].
+# The web server bumps the version on every change, the detector compares it
+# once per frame and only re-reads the values when it moved. No file I/O on
+# either side of the hot path.
+VERSION, ARMED, SENSITIVITY = range(3)
+
+
+class SharedSettings:
+    """Versioned detector settings written by the web server, read by a detector process"""
+
+    def __init__(self, isArmed=False, motion_sensitivity=3):
+        self.values = multiprocessing.Array('q', [1, int(bool(isArmed)), int(motion_sensitivity)])
+
+    def update(self, isArmed, motion_sensitivity):
+        with self.values.get_lock():
+            self.values[ARMED] = int(bool(isArmed))
+            self.values[SENSITIVITY] = int(motion_sensitivity)
+            self.values[VERSION] += 1
+
+    @property
+    def version(self):
+        return self.values[VERSION]
+
+    def read(self):
+        """Return (version, isArmed, motion_sensitivity) as one consistent snapshot"""
+        with self.values.get_lock():
+            return self.values[VERSION], bool(self.values[ARMED]), self.values[SENSITIVITY]
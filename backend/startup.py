@@ -0,0 +1,41 @@
+import os
+import time
+
+# ============================== #
+#         Startup timing         #
+# ============================== #
+# Milestones of a cold start in seconds since the process was created, not
+# since this module was imported, so interpreter start-up and imports count
+# too. run_server marks the server's milestones, the detector watchdog each
+# camera's first frame (from its heartbeat), and the report is printed once
+# every camera is up. The marks are also exported on /metrics.
+
+
+def process_started():
+    """time.monotonic() at which this process was created (Linux), or now if unknown"""
+    try:
+        with open('/proc/self/stat') as stat:
+            start_ticks = int(stat.read().rsplit(')', 1)[1].split()[19])
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf('SC_CLK_TCK')
+        return time.monotonic() - max(age, 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic()
+
+
+class StartupTimer:
+    def __init__(self):
+        self.origin = process_started()
+        self.marks = {}   # Milestone -> seconds since the process was created, in the order reached
+
+    def mark(self, milestone, at=None):
+        """Record a milestone the first time it is reached (`at` is a time.monotonic() value), True if new"""
+        if milestone in self.marks:
+            return False
+        self.marks[milestone] = round((time.monotonic() if at is None else at) - self.origin, 3)
+        return True
+
+    def report(self):
+        return ', '.join(f"{milestone} {seconds:.2f}s" for milestone, seconds in self.marks.items())
+
+
+timer = StartupTimer()
@@ -1,5 +1,4 @@
-import cv2
-import multiprocessing
+import threading
 import time
 import json
 import os
@@ -8,27 +7,96 @@ STATE_FILE = "system_state.json"
 
 def load_state():
     if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, 'r') as file:
-            return json.load(file)
+        try:
+            with open(STATE_FILE, 'r') as file:
+                return json.load(file)
+        except ValueError:
+            print(f"❗ Corrupt {STATE_FILE}, using defaults")
     return {"isArmed": False, "motion_sensitivity": 3}  # Default values
 
 def save_state(state):
-    with open(STATE_FILE, 'w') as file:
+    """Write the state atomically: readers see either the old or the new file, never half of it"""
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w') as file:
         json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, STATE_FILE)
+
+def camera_settings(state, camera_id=None):
+    """System-wide settings with the per-camera overrides of `camera_id` applied"""
+    settings = {"isArmed": state.get("isArmed", False), "motion_sensitivity": state.get("motion_sensitivity", 3)}
+    if camera_id is not None:
+        settings.update(state.get("cameras", {}).get(camera_id, {}))
+    return settings
 
 # Global state variable (loaded from file)
 state = load_state()
+state_lock = threading.Lock()
+listeners = []   # Called with the new state after every change (e.g. to push it to detectors)
+
+# Persistence runs on its own thread so request handlers never wait for the SD card
+_dirty = threading.Event()
+_save_lock = threading.Lock()   # One writer at a time, the persist thread or flush()
+_persist_thread = None
+
+def _save_pending():
+    """Write the state if it changed since the last save"""
+    with _save_lock:
+        if not _dirty.is_set():
+            return
+        _dirty.clear()
+        with state_lock:
+            snapshot = json.loads(json.dumps(state))
+        try:
+            save_state(snapshot)
+        except OSError as e:
+            print(f"❌ Failed to save {STATE_FILE}: {e}")
+
+def _persist_loop():
+    while True:
+        _dirty.wait()
+        _save_pending()
+
+def flush():
+    """Write a pending change now, the persist thread is a daemon and dies with the server"""
+    _save_pending()
+
+def _schedule_save():
+    global _persist_thread
+    if _persist_thread is None:
+        _persist_thread = threading.Thread(target=_persist_loop, daemon=True)
+        _persist_thread.start()
+    _dirty.set()
+
+def add_listener(callback):
+    listeners.append(callback)
+
+def _get(key, camera_id=None):
+    with state_lock:
+        return camera_settings(state, camera_id)[key]
+
+def _set(key, value, camera_id=None):
+    with state_lock:
+        if camera_id is None:
+            # System-wide change applies to every camera
+            state[key] = value
+            for overrides in state.get("cameras", {}).values():
+                overrides.pop(key, None)
+        else:
+            state.setdefault("cameras", {}).setdefault(camera_id, {})[key] = value
+        for callback in listeners:
+            callback(state)
+    _schedule_save()
 
-def get_armed_status():
-    return state["isArmed"]
+def get_armed_status(camera_id=None):
+    return _get("isArmed", camera_id)
 
-def set_armed_status(value):
-    state["isArmed"] = value
-    save_state(state)
+def set_armed_status(value, camera_id=None):
+    _set("isArmed", value, camera_id)
 
-def get_motion_sensitivity():
-    return state["motion_sensitivity"]
+def get_motion_sensitivity(camera_id=None):
+    return _get("motion_sensitivity", camera_id)
 
-def set_motion_sensitivity(value):
-    state["motion_sensitivity"] = value
-    save_state(state)
+def set_motion_sensitivity(value, camera_id=None):
+    _set("motion_sensitivity", value, camera_id)
@@ -0,0 +1,161 @@
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+import config
+import metrics
+import thumbnails
+from clip_files import image_filename_for
+from motion_timeline import timeline_path_for
+from models import db, Clip
+
+# ============================== #
+#     Storage quota & retention  #
+# ============================== #
+# Recordings are deleted oldest first, straight from the clip index (no
+# directory scans), and each clip goes with its stream copy, snapshot and
+# thumbnails (and motion timeline). Two limits apply:
+#   - age: clips older than RETENTION_DAYS
+#   - space: once the disk holding CLIPS_FOLDER is fuller than the high
+#     watermark, clips are deleted until it is below the low watermark
+# Checks are triggered by writes (a recording starting or finishing) and run
+# on a worker thread; a slow sweep covers retention while nothing records.
+DELETE_BATCH = 50
+
+STORAGE_USED = metrics.registry.gauge('surveillance_storage_used_ratio', "Used share of the recordings disk")
+CLIPS_DELETED = metrics.registry.counter('surveillance_storage_clips_deleted_total',
+                                         "Clips deleted by the storage manager, by reason")
+BYTES_FREED = metrics.registry.counter('surveillance_storage_freed_bytes_total',
+                                       "Bytes freed by the storage manager, by reason")
+
+
+def _remove(path):
+    """Delete a file, return the bytes this frees or None if it did not exist
+
+    The clip in CLIPS_FOLDER and its stream copy are usually hard links to the
+    same data (see recorder.link_clip), which is only freed with the last link.
+    """
+    try:
+        stat = os.stat(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size if stat.st_nlink == 1 else 0
+
+
+def delete_clip_files(video_filename):
+    """Delete a clip, its stream copy, snapshot, motion timeline and thumbnails; return bytes freed or None if none existed"""
+    image_filename = image_filename_for(video_filename)
+    sizes = [_remove(os.path.join(config.CLIPS_FOLDER, video_filename)),
+             _remove(os.path.join(config.STREAM_FOLDER, video_filename)),
+             _remove(os.path.join(config.IMAGES_FOLDER, image_filename)),
+             _remove(timeline_path_for(video_filename))]
+    freed = thumbnails.remove_thumbnails(image_filename)
+    if all(size is None for size in sizes):
+        return None
+    return freed + sum(size for size in sizes if size is not None)
+
+
+class StorageManager:
+    """Keeps recordings within the disk watermarks and the retention period"""
+
+    def __init__(self, app, high=None, low=None, retention_days=None, sweep_interval=None, on_delete=None):
+        self.app = app
+        self.high = config.STORAGE_HIGH_WATERMARK if high is None else high
+        self.low = config.STORAGE_LOW_WATERMARK if low is None else low
+        self.retention_days = config.RETENTION_DAYS if retention_days is None else retention_days
+        self.sweep_interval = config.STORAGE_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self.on_delete = on_delete   # Called with the deleted clips' filenames and the reason
+        self.wake = threading.Event()
+        self.thread = None
+        self.checks = 0
+        self.deleted = {"expired": 0, "quota": 0}
+        self.freed = 0
+        self.last_check = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.notify_write()   # Check once at startup
+        return self
+
+    def notify_write(self):
+        """Something was (or is about to be) recorded, check the limits soon"""
+        self.wake.set()
+
+    def _run(self):
+        print("Storage manager started!")
+        while True:
+            self.wake.wait(self.sweep_interval)
+            self.wake.clear()
+            try:
+                with self.app.app_context():
+                    self.enforce()
+            except Exception as e:
+                print(f"❌ Storage check failed: {e}")
+
+    def disk_usage(self):
+        return shutil.disk_usage(config.CLIPS_FOLDER)
+
+    def enforce(self):
+        """Apply the retention period, then the watermarks"""
+        self.checks += 1
+        self.last_check = time.time()
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        while True:
+            clips = self._oldest(Clip.started_at < cutoff)
+            if not clips:
+                break
+            self._delete(clips, "expired")
+
+        disk = self.disk_usage()
+        STORAGE_USED.set(disk.used / disk.total)
+        if disk.used <= self.high * disk.total:
+            return
+        to_free = disk.used - self.low * disk.total
+        print(f"💾 Disk {disk.used / disk.total:.0%} full, freeing {to_free / 1024 ** 2:.0f} MB of old clips")
+        # The disk is measured again after every batch rather than trusting the
+        # sizes of deleted files (open files, filesystem blocks, other writers)
+        while to_free > 0:
+            clips = self._oldest()
+            if not clips:
+                print("⚠️ Disk above the low watermark with no clips left to delete")
+                break
+            self._delete(clips, "quota", to_free)
+            disk = self.disk_usage()
+            STORAGE_USED.set(disk.used / disk.total)
+            to_free = disk.used - self.low * disk.total
+
+    def _oldest(self, *filters):
+        return (Clip.query.filter(*filters).order_by(Clip.started_at.asc(), Clip.id.asc())
+                .limit(DELETE_BATCH).all())
+
+    def _delete(self, clips, reason, budget=None):
+        """Delete clips in order until `budget` bytes are freed (all of them without a budget)"""
+        freed = 0
+        deleted = []
+        for clip in clips:
+            if budget is not None and freed >= budget:
+                break
+            freed += delete_clip_files(clip.file_path) or 0
+            deleted.append(clip.file_path)
+            db.session.delete(clip)
+        db.session.commit()
+        self.deleted[reason] += len(deleted)
+        self.freed += freed
+        CLIPS_DELETED.inc(len(deleted), reason=reason)
+        BYTES_FREED.inc(freed, reason=reason)
+        print(f"🗑️ Deleted {len(deleted)} {reason} clip(s), {freed / 1024 ** 2:.1f} MB, oldest {deleted[0]}")
+        if self.on_delete is not None:
+            self.on_delete(deleted, reason)
+        return freed
+
+    def stats(self):
+        disk = self.disk_usage()
+        oldest = Clip.query.order_by(Clip.started_at.asc()).first()
+        return {"used_bytes": disk.used, "total_bytes": disk.total, "used_ratio": round(disk.used / disk.total, 4),
+                "high_watermark": self.high, "low_watermark": self.low, "retention_days": self.retention_days,
+                "clips": Clip.query.count(), "oldest_clip": oldest.file_path if oldest else None,
+                "checks": self.checks, "deleted": dict(self.deleted), "freed_bytes": self.freed,
+                "last_check": self.last_check}
@@ -0,0 +1,280 @@
+import importlib
+import threading
+import time
+from collections import deque, namedtuple
+import config
+from cooperative import run_blocking
+
+# ============================== #
+#      Live stream broadcast     #
+# ============================== #
+# The detector publishes every live frame (raw pixels, overlays drawn) in a
+# SharedFrameBuffer. A single pump thread in the web server picks each new
+# frame up and encodes it once per active quality tier (width, JPEG quality,
+# max FPS); all viewers on a tier receive the same bytes object, so encode
+# cost grows with the number of distinct tiers, not with the number of viewers.
+
+DROP_OLDEST = 'drop_oldest'   # Keep the newest frames, discard what the client has not sent yet
+LATEST_ONLY = 'latest_only'   # Only ever hold one frame (lowest latency)
+
+
+MIN_TIER_WIDTH = 80
+MAX_IDLE_TIERS = 16   # Tiers without viewers whose statistics are kept
+
+
+def load_encoder():
+    """Import OpenCV ahead of the first viewer, the web server starts without it"""
+    importlib.import_module('cv2')   # For the side effect: _encode's own import is then a dict lookup
+
+
+def mjpeg_part(jpeg_bytes):
+    """Wrap an encoded JPEG as one part of a multipart/x-mixed-replace response"""
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n'
+
+
+class StreamTier(namedtuple('StreamTier', 'width quality fps')):
+    """Encoding shared by a group of viewers, width 0 = camera resolution, fps 0 = every frame"""
+
+    @property
+    def label(self):
+        return f"{self.width or 'full'}w_q{self.quality}_{self.fps or 'max'}fps"
+
+
+def make_tier(preset=None, width=None, quality=None, fps=None):
+    """Tier from a STREAM_TIERS preset and/or explicit values, clamped to sane bounds (ValueError if invalid)"""
+    if preset is not None and preset not in config.STREAM_TIERS:
+        raise ValueError(f"Unknown stream tier: {preset}")
+    base = config.STREAM_TIERS.get(preset, {})
+    width = int(width if width is not None else base.get('width', 0))
+    quality = int(quality if quality is not None else base.get('quality', config.STREAM_JPEG_QUALITY))
+    fps = int(fps if fps is not None else base.get('fps', 0))
+    if width:
+        width = max(MIN_TIER_WIDTH, width) // 8 * 8
+    return StreamTier(width, max(10, min(100, quality)), max(0, min(config.TARGET_FPS, fps)))
+
+
+class Subscriber:
+    """Per-client mailbox holding the latest frame(s) for one viewer"""
+
+    def __init__(self, policy=LATEST_ONLY, depth=1, tier=None):
+        self.policy = policy
+        self.tier = tier
+        self.frames = deque(maxlen=1 if policy == LATEST_ONLY else max(1, depth))
+        self.cond = threading.Condition()
+        self.delivered = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.connected_at = time.monotonic()
+        self.closed = False
+
+    def offer(self, item):
+        with self.cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1   # deque discards the oldest entry for us
+            self.frames.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=1.0):
+        """Block until a frame is available, return None on timeout or close"""
+        with self.cond:
+            if not self.frames and not self.closed:
+                self.cond.wait(timeout)
+            if not self.frames:
+                return None
+            self.delivered += 1
+            part = self.frames.popleft()
+            self.bytes_sent += len(part)
+            return part
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def stats(self):
+        duration = max(1e-6, time.monotonic() - self.connected_at)
+        return {"tier": self.tier.label if self.tier else None, "connected_seconds": round(duration, 1),
+                "delivered": self.delivered, "dropped": self.dropped, "bytes": self.bytes_sent,
+                "kbps": round(8 * self.bytes_sent / duration / 1000, 1)}
+
+
+class TierStats:
+    """Cumulative encode cost and output of one tier"""
+
+    def __init__(self):
+        self.viewers = 0
+        self.frames = 0
+        self.bytes = 0
+        self.encode_seconds = 0.0   # Wall time
+        self.cpu_seconds = 0.0      # CPU time of the pump thread
+        self.next_time = 0.0
+
+    def to_dict(self, tier):
+        return {"tier": tier.label, "width": tier.width, "quality": tier.quality, "fps": tier.fps,
+                "viewers": self.viewers, "frames": self.frames, "bytes": self.bytes,
+                "encode_ms": round(1000 * self.encode_seconds / self.frames, 2) if self.frames else None,
+                "cpu_seconds": round(self.cpu_seconds, 3)}
+
+
+class FrameHub:
+    """Encodes frames published in a shared ring buffer once per tier and fans them out to subscribers"""
+
+    def __init__(self, frame_buffer, streaming_enabled_event=None, quality_cap=None):
+        self.frame_buffer = frame_buffer
+        self.streaming_enabled_event = streaming_enabled_event
+        self.quality_cap = quality_cap   # Shared value lowered by the detector's adaptive controller
+        self.subscribers = set()
+        self.holders = 0                 # Other consumers of the raw frames (see live_h264.py)
+        self.tiers = {}                  # StreamTier -> TierStats, kept after the last viewer leaves
+        self.lock = threading.Lock()
+        self.pump_thread = None
+        self.encoding = set()            # Tiers of the frame being encoded, never pruned meanwhile
+        self.published = 0          # Frames fanned out since start
+        self.retired_dropped = 0    # Frames dropped by viewers that have since disconnected
+        self.frame_interval = 0.0   # Smoothed gap between published frames
+
+    def subscribe(self, policy=LATEST_ONLY, depth=1, tier=None):
+        tier = tier or make_tier()
+        sub = Subscriber(policy, depth, tier)
+        with self.lock:
+            self.subscribers.add(sub)
+            self.tiers.setdefault(tier, TierStats()).viewers += 1
+            if self.streaming_enabled_event is not None:
+                self.streaming_enabled_event.set()
+            if self.pump_thread is None or not self.pump_thread.is_alive():
+                self.pump_thread = threading.Thread(target=self._pump, daemon=True)
+                self.pump_thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self.lock:
+            if sub in self.subscribers:
+                self.retired_dropped += sub.dropped
+                self.tiers[sub.tier].viewers -= 1
+                # Forget the oldest idle tiers, except those the pump is encoding right now
+                idle = [tier for tier, stats in self.tiers.items() if not stats.viewers and tier not in self.encoding]
+                for tier in idle[:max(0, len(idle) - MAX_IDLE_TIERS)]:
+                    del self.tiers[tier]
+            self.subscribers.discard(sub)
+            self._update_streaming()
+
+    def hold(self):
+        """Keep the detector publishing frames without subscribing to MJPEG"""
+        with self.lock:
+            self.holders += 1
+            self._update_streaming()
+
+    def release(self):
+        with self.lock:
+            self.holders -= 1
+            self._update_streaming()
+
+    def _update_streaming(self):
+        # Nobody is watching, let the detector skip publishing
+        if self.streaming_enabled_event is not None:
+            if self.subscribers or self.holders:
+                self.streaming_enabled_event.set()
+            else:
+                self.streaming_enabled_event.clear()
+
+    def viewer_count(self):
+        with self.lock:
+            return len(self.subscribers)
+
+    def dropped_frames(self):
+        """Frames skipped by slow viewers, past and present"""
+        with self.lock:
+            return self.retired_dropped + sum(sub.dropped for sub in self.subscribers)
+
+    def stats(self):
+        with self.lock:
+            return {"tiers": [stats.to_dict(tier) for tier, stats in self.tiers.items()],
+                    "clients": [sub.stats() for sub in self.subscribers]}
+
+    def _due(self, tier, stats, now):
+        """Rate limit a tier, with half a frame of slack so jitter does not halve the rate"""
+        if not tier.fps:
+            return True
+        interval = 1.0 / tier.fps
+        if now < stats.next_time - self.frame_interval / 2:
+            return False
+        stats.next_time = max(stats.next_time + interval, now - interval)
+        return True
+
+    def _encode(self, frame, tier, resized, quality_cap):
+        import cv2   # Not needed to import the web server, only once someone watches
+        image = frame
+        if tier.width and frame.shape[1] > tier.width:
+            image = resized.get(tier.width)
+            if image is None:
+                height = int(round(frame.shape[0] * tier.width / frame.shape[1]))
+                image = resized[tier.width] = cv2.resize(frame, (tier.width, height), interpolation=cv2.INTER_AREA)
+        _, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, min(tier.quality, quality_cap)])
+        return mjpeg_part(jpeg.tobytes())
+
+    def _encode_due(self, frame, groups, now):
+        """Encode the frame for every tier that is due, return [(part, subscribers)]"""
+        quality_cap = self.quality_cap.value if self.quality_cap is not None else 100
+        resized = {}   # Tiers of the same width share one resize
+        parts = []
+        for tier, subscribers in groups.items():
+            stats = self.tiers.get(tier)   # Runs on a native thread under gevent, no hub lock here
+            if stats is None or not self._due(tier, stats, now):
+                continue
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            part = self._encode(frame, tier, resized, quality_cap)
+            stats.encode_seconds += time.perf_counter() - started
+            stats.cpu_seconds += time.thread_time() - cpu_started
+            stats.frames += 1
+            stats.bytes += len(part)
+            parts.append((part, subscribers))
+        return parts
+
+    def _pump(self):
+        last_seq = self.frame_buffer.latest_seq
+        last_time = None
+        try:
+            while True:
+                with self.lock:
+                    if not self.subscribers:
+                        return
+                try:
+                    last_seq, last_time = self._pump_once(last_seq, last_time)
+                except Exception as e:
+                    # One bad frame must not leave every viewer of the camera hanging
+                    print(f"❌ Live stream pump error: {e!r}")
+                    time.sleep(0.1)
+        finally:
+            with self.lock:
+                self.encoding = set()
+                self.pump_thread = None   # Still ours: subscribe only replaces a dead pump
+
+    def _pump_once(self, last_seq, last_time):
+        """Encode and fan out the next published frame, returns the updated (last_seq, last_time)"""
+        seq = self.frame_buffer.wait_for_new(last_seq, timeout=1.0)
+        if seq is None:
+            return last_seq, last_time
+        item = self.frame_buffer.read_copy(seq)
+        if item is None:
+            return last_seq, last_time
+        last_seq, frame, _ = item
+        now = time.monotonic()
+        if last_time is not None:
+            self.frame_interval = 0.9 * self.frame_interval + 0.1 * (now - last_time)
+
+        with self.lock:
+            groups = {}
+            for sub in self.subscribers:
+                groups.setdefault(sub.tier, []).append(sub)
+            self.encoding = set(groups)
+        # JPEG encoding runs off the event loop under gevent, hand-off stays on it
+        try:
+            for part, subscribers in run_blocking(self._encode_due, frame, groups, now):
+                for sub in subscribers:
+                    sub.offer(part)
+        finally:
+            with self.lock:
+                self.encoding = set()
+        self.published += 1
+        return last_seq, now
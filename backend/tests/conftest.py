@@ -0,0 +1,35 @@
+# Shared fixtures: clip folders in a temporary directory and an in-memory clip index.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+@pytest.fixture
+def clip_folders(tmp_path, monkeypatch):
+    """Point every recordings folder of config.py into tmp_path and create them"""
+    for name in ('CLIPS_FOLDER', 'STREAM_FOLDER', 'IMAGES_FOLDER', 'THUMBNAILS_FOLDER', 'TIMELINES_FOLDER'):
+        folder = tmp_path / name.lower()
+        folder.mkdir()
+        monkeypatch.setattr(config, name, str(folder))
+    return tmp_path
+
+
+@pytest.fixture
+def clip_db():
+    """Flask app with an empty SQLite clip index, inside an app context"""
+    from flask import Flask
+    from models import db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,73 @@
+# Adaptive preview quality (adaptive.py): degradation order, recovery and the fan curve.
+from adaptive import AdaptiveController, FanController, PREVIEW_FPS, JPEG_QUALITY, MOTION_WIDTH
+
+OVERLOADED = (0.95, 0.0, 0.5)   # busy, missed, cpu_load
+CALM = (0.2, 0.0, 0.2)
+IN_BETWEEN = (0.7, 0.0, 0.2)
+
+
+def make_controller(**kwargs):
+    adjustments = []
+    controller = AdaptiveController(preview_fps=20, jpeg_quality=95, motion_width=320, min_preview_fps=5,
+                                    min_jpeg_quality=50, min_motion_width=160, cpu_high=0.9, cpu_low=0.6,
+                                    on_adjust=adjustments.append, **kwargs)
+    return controller, adjustments
+
+
+def steps(controller, load, count):
+    return [(step["knob"], step["new"]) for step in (controller.update(*load) for _ in range(count)) if step]
+
+
+def test_degrades_cheapest_first_down_to_the_minimums():
+    controller, adjustments = make_controller()
+    assert steps(controller, OVERLOADED, 20) == [
+        (PREVIEW_FPS, 15), (PREVIEW_FPS, 11), (PREVIEW_FPS, 8), (PREVIEW_FPS, 6), (PREVIEW_FPS, 5),
+        (JPEG_QUALITY, 85), (JPEG_QUALITY, 75), (JPEG_QUALITY, 65), (JPEG_QUALITY, 55), (JPEG_QUALITY, 50),
+        (MOTION_WIDTH, 240), (MOTION_WIDTH, 176), (MOTION_WIDTH, 160)]
+    assert len(adjustments) == 13 and adjustments[0]["old"] == 20
+    assert controller[MOTION_WIDTH] % 16 == 0
+
+
+def test_each_overload_signal_counts():
+    for load in [(0.9, 0.0, 0.0), (0.0, 0.2, 0.0), (0.0, 0.0, 0.95)]:
+        controller, _ = make_controller()
+        assert controller.update(*load)["knob"] == PREVIEW_FPS
+
+
+def test_recovers_in_reverse_order_after_calm_intervals():
+    controller, _ = make_controller(recover_after=3)
+    steps(controller, OVERLOADED, 20)
+    assert steps(controller, CALM, 2) == []   # Not calm for long enough yet
+    assert steps(controller, CALM, 1) == [(MOTION_WIDTH, 224)]
+    restored = steps(controller, CALM, 3 * 30)
+    assert restored[:3] == [(MOTION_WIDTH, 304), (MOTION_WIDTH, 320), (JPEG_QUALITY, 60)]
+    assert restored[-1] == (PREVIEW_FPS, 20)
+    assert controller.settings == controller.maximum
+    assert steps(controller, CALM, 10) == []
+
+
+def test_load_in_between_resets_the_calm_count():
+    controller, _ = make_controller(recover_after=3)
+    controller.update(*OVERLOADED)
+    for _ in range(5):
+        assert steps(controller, CALM, 2) == []
+        assert controller.update(*IN_BETWEEN) is None
+    assert controller[PREVIEW_FPS] == 15
+
+
+class FakeRpi:
+    def __init__(self):
+        self.duties = []
+
+    def set_fan_duty(self, duty):
+        self.duties.append(duty)
+
+
+def test_fan_follows_temperature_in_coarse_steps():
+    rpi = FakeRpi()
+    fan = FanController(rpi, min_duty=30, max_duty=100, temp_low=50, temp_high=80)
+    assert fan.update(None) == 30 and fan.update(40) == 30
+    assert fan.update(65) == 65
+    assert fan.update(66) == 65   # Less than 5% change is ignored
+    assert fan.update(90) == 100
+    assert rpi.duties == [65, 100]
@@ -0,0 +1,51 @@
+# App factory and lifecycle (app.py): importing starts nothing, create_app() only configures,
+# start_services()/stop_services() bring a detector up and down. Runs in a child interpreter,
+# since the app module is configured once per process and writes its database and log to the cwd.
+import os
+import subprocess
+import sys
+import textwrap
+
+import config
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LIFECYCLE = textwrap.dedent('''
+    import os, threading, time
+    import config
+    config.CAMERAS = [{"id": "cam0", "source": "synthetic", "width": 160, "height": 120, "fps": 30}]
+    config.DETECTOR_PIN_CORES = False
+
+    import app
+    assert app.notification_queue is None and not app.camera_channels, "import configured the app"
+    assert threading.active_count() == 1, "import started threads"
+
+    app.app.instance_path = os.getcwd()   # Where the relative SQLite URI puts the database
+    assert app.create_app() is app.create_app()
+    channel = app.camera_channels["cam0"]
+    assert channel.process is None, "create_app started a detector"
+    with app.app.app_context():
+        app.db.create_all()
+        app.upgrade_clip_table()
+
+    app.start_services()
+    deadline = time.monotonic() + 30
+    while not channel.heartbeat.ready:
+        assert time.monotonic() < deadline, "no first frame"
+        time.sleep(0.05)
+    detector = channel.process
+    app.stop_services()
+    assert not detector.is_alive(), "detector still running"
+    assert channel.process is detector, "detector restarted during shutdown"
+    assert not app.watchdog_thread.is_alive()
+    print("lifecycle ok")
+''')
+
+
+def test_create_start_stop(tmp_path):
+    env = dict(os.environ, PYTHONPATH=BACKEND)
+    result = subprocess.run([sys.executable, '-c', LIFECYCLE], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=90)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "lifecycle ok" in result.stdout
+    assert (tmp_path / config.CLIPS_FOLDER).is_dir()
@@ -0,0 +1,79 @@
+# Clip index pagination (clip_catalog.py): cursors and keyset pages by time and by motion score.
+from datetime import datetime, timedelta
+
+import pytest
+
+import clip_catalog
+from models import db, Clip
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def index_clips(scores, camera_id='cam0'):
+    """One clip per score, a minute apart, returned in insertion order"""
+    first = Clip.query.count()
+    clips = []
+    for i, score in enumerate(scores):
+        started = START + timedelta(minutes=first + i)
+        name = f"motion_{started:%Y-%m-%d_%H-%M-%S}_{camera_id}.mp4"
+        clips.append(Clip(file_path=name, date=f"{started:%Y-%m-%d}", time=f"{started:%H:%M:%S}",
+                          image_filename=name.replace('.mp4', '.jpg'), camera_id=camera_id,
+                          started_at=started, motion_score=score))
+    db.session.add_all(clips)
+    db.session.commit()
+    return clips
+
+
+def walk(limit, **kwargs):
+    """Every page of a query, following next cursors, as one list of ids"""
+    ids, cursor = [], None
+    while True:
+        rows, cursor = clip_catalog.query_clips(limit=limit, cursor=cursor, **kwargs)
+        ids.extend(clip.id for clip in rows)
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip_by_time(clip_db):
+    clip, = index_clips([0.5])
+    assert clip_catalog.decode_cursor(clip_catalog.encode_cursor(clip)) == (clip.started_at, clip.id)
+
+
+def test_cursor_round_trip_by_motion_keeps_the_exact_float(clip_db):
+    clip, = index_clips([0.1 + 0.2])
+    cursor = clip_catalog.encode_cursor(clip, sort='motion')
+    assert clip_catalog.decode_cursor(cursor, sort='motion') == (0.1 + 0.2, clip.id)
+
+
+def test_time_pages_cover_every_clip_once(clip_db):
+    clips = index_clips([0.0] * 7)
+    ids = [clip.id for clip in clips]
+    assert walk(3) == ids[::-1]
+    assert walk(3, order='asc') == ids
+
+
+def test_motion_pages_break_ties_by_id(clip_db):
+    clips = index_clips([0.2, 0.9, 0.2, 0.5, 0.2, 0.9, 0.0])
+    expected = [clip.id for clip in sorted(clips, key=lambda clip: (clip.motion_score, clip.id), reverse=True)]
+    for limit in (1, 2, 3, 7, 10):
+        assert walk(limit, sort='motion') == expected
+        assert walk(limit, sort='motion', order='asc') == expected[::-1]
+
+
+def test_last_full_page_has_no_cursor(clip_db):
+    index_clips([0.0] * 4)
+    rows, cursor = clip_catalog.query_clips(limit=4)
+    assert len(rows) == 4 and cursor is None
+
+
+def test_filters_apply_to_every_page(clip_db):
+    front = index_clips([0.3, 0.1, 0.3], camera_id='front')
+    index_clips([0.9, 0.8], camera_id='back')
+    expected = [front[2].id, front[0].id, front[1].id]
+    assert walk(1, sort='motion', camera_id='front') == expected
+    assert walk(2, start=front[1].started_at, end=front[2].started_at) == [front[2].id, front[1].id]
+
+
+def test_unknown_sort_is_rejected(clip_db):
+    with pytest.raises(ValueError):
+        clip_catalog.query_clips(sort='size')
@@ -0,0 +1,100 @@
+# Hang detection from the shared-memory detector heartbeat (heartbeat.py), on a fake clock.
+import pytest
+
+import heartbeat
+
+TIMEOUT = 3.0
+STARTUP_TIMEOUT = 20.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(heartbeat.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def beat(clock):
+    beat = heartbeat.Heartbeat()
+    beat.reset()
+    return beat
+
+
+def running(beat):
+    """A detector past its first frame, having just finished a loop"""
+    beat.frame()
+    beat.enter('process')
+    beat.done('process')
+    beat.beat()
+
+
+def test_startup_gets_its_own_timeout(beat, clock):
+    clock.advance(STARTUP_TIMEOUT - 1)
+    assert beat.stall(TIMEOUT, STARTUP_TIMEOUT) is None
+    clock.advance(2)
+    stage, reason, since = beat.stall(TIMEOUT, STARTUP_TIMEOUT)
+    assert stage == 'startup' and reason.startswith('no frame') and since == 1000.0
+
+
+def test_loop_that_stops_beating_is_stuck_in_its_stage(beat, clock):
+    running(beat)
+    beat.enter('housekeeping')
+    clock.advance(TIMEOUT + 0.5)
+    stage, reason, since = beat.stall(TIMEOUT, STARTUP_TIMEOUT)
+    assert stage == 'housekeeping' and 'stuck in housekeeping' in reason and since == 1000.0
+
+
+def test_progress_keeps_long_processing_alive(beat, clock):
+    running(beat)
+    beat.enter('process')
+    for _ in range(5):
+        clock.advance(TIMEOUT - 0.5)
+        beat.progress()
+        # No frame for far longer than the timeout, but the loop is busy processing the last one
+        assert beat.stall(TIMEOUT, STARTUP_TIMEOUT) is None
+
+
+def test_missing_frames_counted_from_the_last_processed_frame(beat, clock):
+    running(beat)
+    beat.enter('process')
+    clock.advance(TIMEOUT + 1)
+    beat.progress()
+    beat.done('process')
+    beat.enter('capture')
+    clock.advance(TIMEOUT - 1)
+    beat.beat()
+    assert beat.stall(TIMEOUT, STARTUP_TIMEOUT) is None
+    clock.advance(1.5)
+    beat.beat()
+    stage, reason, _ = beat.stall(TIMEOUT, STARTUP_TIMEOUT)
+    assert stage == 'capture' and reason.startswith('no frame from the camera')
+
+
+def test_open_clip_survives_until_cleared(beat):
+    assert beat.open_clip() is None
+    beat.set_clip('motion_2026-01-01_12-00-00.mp4', encoder_pid=4242)
+    assert beat.open_clip() == ('motion_2026-01-01_12-00-00.mp4', 4242)
+    beat.set_clip(None)
+    assert beat.open_clip() is None
+
+
+def test_reset_forgets_the_previous_detector(beat, clock):
+    running(beat)
+    beat.set_clip('motion_2026-01-01_12-00-00.mp4', encoder_pid=4242)
+    clock.advance(10)
+    beat.reset()
+    assert not beat.ready and beat.open_clip() is None and beat.stage() == 'startup'
+    assert beat.snapshot() == dict.fromkeys(heartbeat.STAGES)
+    assert beat.stall(TIMEOUT, STARTUP_TIMEOUT) is None
@@ -0,0 +1,77 @@
+# Range parsing and byte-range responses (http_range.py) through the Flask test client.
+import pytest
+from flask import Flask
+
+from http_range import MAX_RANGES, merge_ranges, parse_ranges, send_file_ranges
+
+SIZE = 10_000
+
+
+def test_parse_ranges():
+    assert parse_ranges('bytes=0-99', SIZE) == [(0, 99)]
+    assert parse_ranges('bytes=9000-', SIZE) == [(9000, SIZE - 1)]
+    assert parse_ranges('bytes=-500', SIZE) == [(SIZE - 500, SIZE - 1)]
+    assert parse_ranges('bytes=0-99, 200-20000', SIZE) == [(0, 99), (200, SIZE - 1)]
+    assert parse_ranges('bytes=20000-30000,-0', SIZE) == []   # Nothing satisfiable
+    assert parse_ranges('bytes=a-b', SIZE) is None
+    assert parse_ranges('items=0-1', SIZE) is None
+    assert parse_ranges(None, SIZE) is None
+
+
+def test_merge_ranges():
+    assert merge_ranges([(0, SIZE - 1)] * 500) == [(0, SIZE - 1)]
+    assert merge_ranges([(50, 60), (0, 9), (5, 20), (21, 30)]) == [(0, 30), (50, 60)]
+    assert merge_ranges([(0, 9), (11, 20)]) == [(0, 9), (11, 20)]
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / 'clip.mp4'
+    path.write_bytes(bytes(range(256)) * (SIZE // 256) + b'\0' * (SIZE % 256))
+    app = Flask(__name__)
+    app.add_url_rule('/clip', 'clip', lambda: send_file_ranges(str(path), 'video/mp4'))
+    return app.test_client()
+
+
+def get(client, header):
+    return client.get('/clip', headers={'Range': header})
+
+
+def test_single_range(client):
+    response = get(client, 'bytes=10-19')
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 10-19/{SIZE}'
+    assert response.data == bytes(range(10, 20))
+
+
+def test_overlapping_ranges_are_merged(client):
+    response = get(client, 'bytes=0-9,5-19')
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 0-19/{SIZE}'
+    assert len(response.data) == 20
+
+
+def test_disjoint_ranges_are_multipart(client):
+    response = get(client, 'bytes=100-109,0-9')
+    assert response.status_code == 206
+    assert response.mimetype == 'multipart/byteranges'
+    body = response.data
+    assert body.index(b'bytes 0-9/') < body.index(b'bytes 100-109/')   # Sorted
+    assert len(body) < 1000
+
+
+def test_repeated_whole_file_ranges_send_the_file_once(client):
+    response = get(client, ','.join(['bytes=0-'] + ['0-'] * 499))
+    assert response.status_code == 200
+    assert len(response.data) == SIZE
+
+
+def test_too_many_ranges_send_the_whole_file(client):
+    header = 'bytes=' + ','.join(f'{i * 100}-{i * 100 + 9}' for i in range(MAX_RANGES + 1))
+    response = get(client, header)
+    assert response.status_code == 200
+    assert len(response.data) == SIZE
+
+
+def test_unsatisfiable_range(client):
+    assert get(client, f'bytes={SIZE}-').status_code == 416
@@ -0,0 +1,78 @@
+# Splitting the encoder's fragmented MP4 into boxes and fragments (live_h264.py).
+import io
+import struct
+from types import SimpleNamespace
+
+from live_h264 import H264LiveStream, read_boxes
+
+
+class TrickleStream(io.BytesIO):
+    """A pipe that hands out at most a few bytes per read"""
+
+    def read(self, size=-1):
+        return super().read(min(size, 3) if size and size > 0 else size)
+
+
+def box(box_type, payload=b''):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def large_box(box_type, payload):
+    return struct.pack('>I4sQ', 1, box_type, 16 + len(payload)) + payload
+
+
+def test_read_boxes_across_short_reads():
+    data = box(b'ftyp', b'isom') + large_box(b'mdat', b'x' * 20) + box(b'free')
+    boxes = list(read_boxes(TrickleStream(data)))
+    assert [box_type for box_type, _ in boxes] == [b'ftyp', b'mdat', b'free']
+    assert b''.join(raw for _, raw in boxes) == data
+
+
+def test_read_boxes_to_end_of_stream_and_truncated():
+    to_end = struct.pack('>I4s', 0, b'mdat') + b'rest of the stream'
+    assert list(read_boxes(io.BytesIO(box(b'moof') + to_end))) == [(b'moof', box(b'moof')), (b'mdat', to_end)]
+    truncated = box(b'moof', b'abcd') + box(b'mdat', b'x' * 10)[:-3]
+    assert [box_type for box_type, _ in read_boxes(io.BytesIO(truncated))] == [b'moof']
+
+
+def make_stream():
+    """A stream whose encoder thread counts as running, boxes are fed by hand"""
+    stream = H264LiveStream(SimpleNamespace(frame_buffer=None), fps=10, idle_seconds=0)
+    stream.thread = SimpleNamespace(is_alive=lambda: True)
+    return stream
+
+
+def encoder_output(fragments):
+    data = box(b'ftyp', b'isom') + box(b'moov', b'm' * 10)
+    for i in range(fragments):
+        data += box(b'moof', bytes([i])) + box(b'mdat', b'd' * 8)
+    return data
+
+
+def fragment(i):
+    return box(b'moof', bytes([i])) + box(b'mdat', b'd' * 8)
+
+
+def test_init_segment_travels_with_the_first_fragment():
+    stream = make_stream()
+    early = stream.subscribe()
+    stream._read(SimpleNamespace(stdout=TrickleStream(encoder_output(1))))
+    init = box(b'ftyp', b'isom') + box(b'moov', b'm' * 10)
+    assert stream.init_segment == init
+    assert early.get(0) == init + fragment(0)
+    late = stream.subscribe()
+    stream._broadcast(fragment(1))
+    assert early.get(0) == fragment(1)
+    assert late.get(0) == init + fragment(1)
+    assert stream.fragments == 2
+
+
+def test_new_viewer_keeps_the_init_segment_when_it_falls_behind():
+    stream = make_stream()
+    stream.init_segment = b'INIT'
+    viewer = stream.subscribe()
+    for i in range(5):   # Nothing read yet: later fragments must not push out the init segment
+        stream._broadcast(fragment(i))
+    assert viewer.get(0) == b'INIT' + fragment(0)
+    stream._broadcast(fragment(5))
+    assert viewer.get(0) == fragment(5)
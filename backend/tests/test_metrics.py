@@ -0,0 +1,58 @@
+# Registries, snapshot merging and the Prometheus text output (metrics.py).
+from metrics import Registry, merge_snapshots, render, NULL_CHILD
+
+
+def test_local_series_win_and_remote_series_add_up():
+    local = Registry()
+    local.counter('frames_total', "Frames").inc(5, camera='cam0')   # A forked detector's stale copy
+    cam0, cam1 = Registry(), Registry()
+    cam0.counter('frames_total', "Frames").inc(100, camera='cam0')
+    cam1.counter('frames_total', "Frames").inc(7, camera='cam1')
+    cam0.counter('restarts_total', "Restarts").inc(1)
+    cam1.counter('restarts_total', "Restarts").inc(2)
+    cam0.gauge('fps', "FPS").set(20)
+    cam1.gauge('fps', "FPS").set(15)
+
+    merged = merge_snapshots(local.snapshot(), [cam0.snapshot(), cam1.snapshot()])
+    frames = merged['frames_total'][3]
+    assert frames[(('camera', 'cam0'),)] == 5      # The local series is never replaced
+    assert frames[(('camera', 'cam1'),)] == 7
+    assert merged['restarts_total'][3][()] == 3    # Summed across processes
+    assert merged['fps'][3][()] == 15              # Gauges keep the latest
+    assert local.snapshot()['frames_total'][3][(('camera', 'cam0'),)] == 5   # Inputs untouched
+
+
+def test_histograms_merge_bucket_by_bucket():
+    a, b = Registry(), Registry()
+    a.histogram('seconds', "Time", buckets=(0.1, 1)).observe(0.05)
+    b.histogram('seconds', "Time", buckets=(0.1, 1)).observe(0.5)
+    b.histogram('seconds', "Time", buckets=(0.1, 1)).observe(5)
+    merged = merge_snapshots({}, [a.snapshot(), b.snapshot()])
+    assert merged['seconds'][3][()] == ([1, 1, 1], 5.55, 3)
+
+
+def test_snapshot_of_selected_metrics():
+    registry = Registry()
+    registry.counter('kept_total', "Kept").inc()
+    registry.counter('other_total', "Other").inc()
+    assert list(registry.snapshot({'kept_total'})) == ['kept_total']
+
+
+def test_disabled_registry_hands_out_the_null_child():
+    registry = Registry(enabled=False)
+    counter = registry.counter('frames_total', "Frames")
+    assert counter.labels(camera='cam0') is NULL_CHILD
+    counter.inc(camera='cam0')
+    assert render(registry.snapshot()) == '\n'
+
+
+def test_render():
+    registry = Registry()
+    registry.counter('clips_total', "Clips").inc(2, camera='a"b')
+    registry.histogram('stage_seconds', "Stage time", buckets=(0.01, 0.1)).observe(0.05, stage='motion')
+    text = render(registry.snapshot())
+    assert '# TYPE clips_total counter\nclips_total{camera="a\\"b"} 2\n' in text
+    assert 'stage_seconds_bucket{stage="motion",le="0.01"} 0\n' in text
+    assert 'stage_seconds_bucket{stage="motion",le="0.1"} 1\n' in text
+    assert 'stage_seconds_bucket{stage="motion",le="+Inf"} 1\n' in text
+    assert 'stage_seconds_count{stage="motion"} 1\n' in text
@@ -0,0 +1,100 @@
+# Several cameras side by side: each detector has its own ring, settings and clip names,
+# and one failing leaves the others running. Synthetic sources, no hardware needed.
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import config
+from clip_files import clip_filename, image_filename_for, parse_clip_filename
+from detector_service import DetectorWorker, detector_service
+from frame_buffer import SharedFrameBuffer
+from settings_channel import SharedSettings
+
+CAMERAS = [{"id": "cam0", "source": "synthetic", "width": 320, "height": 240, "fps": 30},
+           {"id": "garage", "source": "synthetic", "width": 160, "height": 120, "fps": 30}]
+
+
+@pytest.fixture
+def rings():
+    rings = {camera["id"]: SharedFrameBuffer.for_frames(camera["width"], camera["height"]) for camera in CAMERAS}
+    yield rings
+    for ring in rings.values():
+        ring.close()
+
+
+def streaming_event(context=threading):
+    event = context.Event()
+    event.set()
+    return event
+
+
+def wait_for(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_workers_keep_separate_rings_and_settings(clip_folders, rings, monkeypatch):
+    monkeypatch.setattr(config, 'CAMERAS', CAMERAS)
+    settings = {camera["id"]: SharedSettings(isArmed=False) for camera in CAMERAS}
+    workers = [DetectorWorker(camera, rings[camera["id"]], None, streaming_event(), settings[camera["id"]])
+               for camera in CAMERAS]
+    settings["garage"].update(isArmed=True, motion_sensitivity=7)
+    try:
+        for worker in workers:
+            worker.camera.start()
+            frame = worker.camera.get_frame(2.0)
+            assert frame is not None
+            worker.process_frame(frame)
+        for camera, worker in zip(CAMERAS, workers):
+            _, view, _ = rings[camera["id"]].read()
+            assert view.shape == (camera["height"], camera["width"], 3)
+            assert rings[camera["id"]].latest_seq == 1
+        assert (workers[0].isArmed, workers[0].motion_sensitivity) == (False, 3)
+        assert (workers[1].isArmed, workers[1].motion_sensitivity) == (True, 7)
+    finally:
+        for worker in workers:
+            worker.stop()
+
+
+def test_clip_names_carry_the_camera(monkeypatch):
+    monkeypatch.setattr(config, 'CAMERAS', CAMERAS)
+    first, second = clip_filename("2025-03-11_23-46-30", "cam0"), clip_filename("2025-03-11_23-46-30", "garage")
+    assert first == "motion_2025-03-11_23-46-30.mp4"   # The first camera keeps the original names
+    assert second == "motion_2025-03-11_23-46-30_garage.mp4"
+    assert image_filename_for(second) == "image_2025-03-11_23-46-30_garage.jpg"
+    assert parse_clip_filename(first)["camera_id"] == "cam0"
+    assert parse_clip_filename(second)["camera_id"] == "garage"
+    assert parse_clip_filename(second)["timestamp"] == "2025-03-11 23-46-30"
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_a_failed_detector_leaves_the_others_running(clip_folders, rings, monkeypatch):
+    monkeypatch.setattr(config, 'CAMERAS', CAMERAS)
+    context = multiprocessing.get_context('fork')   # Children keep the patched config
+    processes = {camera["id"]: context.Process(target=detector_service, daemon=True,
+                                               args=(camera, rings[camera["id"]], None, streaming_event(context),
+                                                     SharedSettings(isArmed=False)))
+                 for camera in CAMERAS}
+    for process in processes.values():
+        process.start()
+    try:
+        wait_for(lambda: all(ring.latest_seq > 0 for ring in rings.values()))
+        os.kill(processes["cam0"].pid, signal.SIGKILL)
+        processes["cam0"].join(5)
+        stopped_at = rings["cam0"].latest_seq
+        running_from = rings["garage"].latest_seq
+        wait_for(lambda: rings["garage"].latest_seq > running_from + 5, timeout=5)
+        assert rings["cam0"].latest_seq == stopped_at
+        _, view, _ = rings["garage"].read()
+        assert view.shape == (120, 160, 3)
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+            process.join(5)
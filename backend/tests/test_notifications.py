@@ -0,0 +1,54 @@
+# Detector → Socket.IO bridge (notifications.py): batching, replay and a failing emit.
+import queue
+
+from notifications import NotificationBridge, STOP
+
+
+def run_bridge(messages, emit, **kwargs):
+    """Feed `messages` through a bridge thread until it has handled them all"""
+    source = queue.Queue()
+    bridge = NotificationBridge(source, emit, **kwargs)
+    for message in messages:
+        source.put(message)
+    source.put(STOP)
+    bridge.start()
+    bridge.thread.join(timeout=5)
+    assert not bridge.thread.is_alive()
+    return bridge
+
+
+def clip(name, **extra):
+    return {"event": "new_clip", "video_filename": name, "camera_id": "cam0", **extra}
+
+
+def test_failing_emit_does_not_stop_the_bridge():
+    emitted = []
+
+    def emit(event, payload):
+        if payload["video_filename"] == "bad.mp4":
+            raise TypeError("Object of type bytes is not JSON serializable")
+        emitted.append(payload["video_filename"])
+
+    bridge = run_bridge([clip("a.mp4"), clip("bad.mp4"), clip("b.mp4")], emit)
+    assert emitted == ["a.mp4", "b.mp4"]
+    assert bridge.errors == 1
+    assert bridge.replay(bridge.boot, 0) is not None   # Still sequenced, a reconnect replays it
+
+
+def test_replay_and_resync():
+    bridge = run_bridge([clip(f"{i}.mp4") for i in range(5)], lambda event, payload: None, replay_size=3)
+    assert [payload["video_filename"] for _, payload in bridge.replay(bridge.boot, 3)] == ["3.mp4", "4.mp4"]
+    assert bridge.replay(bridge.boot, 5) == []
+    assert bridge.replay(bridge.boot, 1) is None   # Buffer no longer reaches back that far
+    assert bridge.replay("other-boot", 4) is None   # Server restarted in between
+
+
+def test_status_events_coalesce_and_are_not_replayed():
+    emitted = []
+    statuses = [{"event": "camera_status", "camera_id": "cam0", "motion": i} for i in range(3)]
+    bridge = run_bridge(statuses + [clip("a.mp4")], lambda event, payload: emitted.append((event, payload)),
+                        batch_window=0.5)
+    assert [(event, payload.get("motion")) for event, payload in emitted] == [("camera_status", 2), ("new_clip", None)]
+    assert bridge.coalesced == 2
+    assert bridge.latest_volatile() == [("camera_status", {"camera_id": "cam0", "motion": 2})]
+    assert [event for event, _ in bridge.replay(bridge.boot, 0)] == ["new_clip"]
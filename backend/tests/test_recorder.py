@@ -0,0 +1,171 @@
+# Recorders (recorder.py): the shared writer thread, and FFmpegRecorder against a stand-in
+# ffmpeg for failures, a stuck encoder and shutdown.
+import os
+import stat
+import sys
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import config
+import recorder
+
+# Copies stdin to the output (last argument); FAKE_FFMPEG=fail exits 1 after the first
+# chunk, FAKE_FFMPEG=stuck writes a little and then never reads again
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys, time
+mode = os.environ.get('FAKE_FFMPEG', 'ok')
+with open(sys.argv[-1], 'wb') as out:
+    out.write(b'fragment')
+    out.flush()
+    if mode == 'stuck':
+        time.sleep(60)
+    while True:
+        data = sys.stdin.buffer.read(65536)
+        if not data:
+            break
+        out.write(data)
+        if mode == 'fail':
+            sys.exit(1)
+"""
+FRAME_SIZE = (64, 48)
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch, clip_folders):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    script = bin_dir / 'ffmpeg'
+    script.write_text(FAKE_FFMPEG)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setattr(config, 'RECORDER_STOP_TIMEOUT', 0.2)
+
+    def start(mode='ok'):
+        monkeypatch.setenv('FAKE_FFMPEG', mode)
+        return recorder.FFmpegRecorder(os.path.join(config.CLIPS_FOLDER, 'motion_2025-01-01_00-00-00.mp4'),
+                                       FRAME_SIZE, 10)
+    return start
+
+
+def frame():
+    return np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+
+
+def test_finished_clip_is_linked_and_announced(fake_ffmpeg):
+    writer = fake_ffmpeg()
+    for _ in range(5):
+        writer.write(frame(), block=True)
+    ready = []
+    writer.stop(on_ready=ready.append)
+    writer.finish(5)
+    assert ready == [writer.stream_path]
+    assert os.path.samefile(writer.stream_path, writer.video_path)
+    assert not writer.flushing
+
+
+def test_failed_encoder_still_announces_what_it_wrote(fake_ffmpeg):
+    writer = fake_ffmpeg('fail')
+    for _ in range(5):
+        writer.write(frame(), block=True)
+    ready = []
+    writer.stop(on_ready=ready.append)
+    writer.finish(5)
+    assert writer.proc.returncode == 1
+    assert ready == [writer.stream_path]
+    assert os.path.exists(writer.video_path)
+
+
+def test_stop_does_not_block_on_a_stuck_encoder(fake_ffmpeg):
+    writer = fake_ffmpeg('stuck')
+    for _ in range(config.RECORDER_QUEUE_FRAMES + 20):   # Fills the pipe, then the queue
+        writer.write(frame())
+    ready = []
+    started = time.monotonic()
+    writer.stop(on_ready=ready.append)
+    assert time.monotonic() - started < 2
+    writer.finish(5)
+    assert writer.proc.returncode is not None
+    assert ready == [writer.stream_path]   # Kept up to what was written
+
+
+def test_finish_kills_an_encoder_that_does_not_flush(fake_ffmpeg):
+    writer = fake_ffmpeg('stuck')
+    ready = []
+    writer.stop(on_ready=ready.append)
+    started = time.monotonic()
+    writer.finish(0.5)
+    assert time.monotonic() - started < 2
+    assert not writer.flushing
+    assert ready == [writer.stream_path]
+
+
+class ListRecorder(recorder.QueuedRecorder):
+    """Writes each frame's colour to a list, `delay` seconds per frame"""
+
+    def __init__(self, preroll=(), delay=0.0):
+        super().__init__('motion_test.mp4', FRAME_SIZE, preroll)
+        self.delay = delay
+        self.written = []
+        self.thread.start()
+
+    def _pack(self, frame):
+        return frame.copy()
+
+    def _write(self, frame):
+        time.sleep(self.delay)
+        self.written.append(int(round(frame[0, 0, 0] / 10)))
+
+    def _close(self):
+        return self.video_path
+
+    _abort = recorder.OpenCVRecorder._abort
+
+
+def packets(*colours):
+    return [(time.time(), cv2.imencode('.jpg', np.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), 10 * colour, np.uint8))[1])
+            for colour in colours]
+
+
+def coloured(colour):
+    return np.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), 10 * colour, np.uint8)
+
+
+def test_frames_and_buffered_packets_are_written_in_order():
+    writer = ListRecorder(preroll=packets(1, 2))
+    writer.write(coloured(3), block=True)
+    writer.write_preroll(packets(4, 5))   # A resumed clip's pause
+    writer.write(coloured(6), block=True)
+    ready = []
+    writer.stop(on_ready=ready.append)
+    writer.finish(5)
+    assert writer.written == [1, 2, 3, 4, 5, 6]
+    assert ready == ['motion_test.mp4']
+
+
+def test_pause_buffer_is_decoded_off_the_callers_thread():
+    writer = ListRecorder(delay=0.01)
+    started = time.monotonic()
+    writer.write_preroll(packets(*[i % 20 for i in range(200)]))
+    writer.write(coloured(1))
+    assert time.monotonic() - started < 0.5   # 200 frames x 10 ms are written meanwhile
+    writer.stop(on_ready=lambda path: None)
+    writer.finish(10)
+    assert len(writer.written) == 201
+
+
+def test_stop_cuts_a_stuck_writer_short(monkeypatch):
+    monkeypatch.setattr(config, 'RECORDER_QUEUE_FRAMES', 5)
+    monkeypatch.setattr(config, 'RECORDER_STOP_TIMEOUT', 0.1)
+    writer = ListRecorder(delay=0.2)
+    for colour in range(10):
+        writer.write(coloured(colour))
+    started = time.monotonic()
+    ready = []
+    writer.stop(on_ready=ready.append)
+    assert time.monotonic() - started < 0.5
+    writer.finish(5)
+    assert ready == ['motion_test.mp4']
+    assert writer.dropped > 0 and len(writer.written) + writer.dropped == 10
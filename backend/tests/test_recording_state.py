@@ -0,0 +1,108 @@
+# Recording state machine (recording_state.py) driven by a fake clock.
+# Usage: python3 -m pytest backend/tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recording_state import RecordingStateMachine, IDLE, RECORDING, COOLDOWN, START, PAUSE, RESUME, SPLIT, STOP
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_machine(post_roll=5, max_length=60, merge_window=10):
+    clock = FakeClock()
+    machine = RecordingStateMachine(post_roll, max_length, merge_window, clock=clock)
+
+    def at(t, motion=False, armed=True):
+        clock.now = t
+        return machine.update(motion, armed)
+    return machine, at
+
+
+def test_starts_on_motion_only():
+    machine, at = make_machine()
+    assert at(0) is None and machine.state == IDLE
+    assert at(1, True) == START and machine.state == RECORDING
+    assert machine.clip_seconds() == 0
+
+
+def test_motion_restarts_the_post_roll():
+    machine, at = make_machine(post_roll=5)
+    at(0, True)
+    assert at(4, True) is None
+    assert at(8.9) is None and machine.state == RECORDING
+    assert at(9) == PAUSE and machine.state == COOLDOWN
+
+
+def test_no_merge_window_stops_after_the_post_roll():
+    machine, at = make_machine(post_roll=5, merge_window=0)
+    at(0, True)
+    assert at(4.9) is None
+    assert at(5) == STOP and machine.state == IDLE
+
+
+def test_motion_within_the_merge_window_resumes_the_clip():
+    machine, at = make_machine(post_roll=5, merge_window=10)
+    at(0, True)
+    assert at(5) == PAUSE
+    assert at(14.9, True) == RESUME and machine.state == RECORDING
+    assert machine.clip_seconds() == 14.9   # Pauses count towards the clip's length
+
+
+def test_merge_window_elapsed_stops_the_clip():
+    machine, at = make_machine(post_roll=5, merge_window=10)
+    at(0, True)
+    assert at(5) == PAUSE
+    assert at(14.9) is None and machine.state == COOLDOWN
+    assert at(15) == STOP and machine.state == IDLE
+    assert machine.clip_seconds() == 0
+    assert at(16, True) == START   # Later motion opens a new clip
+
+
+def test_continuous_motion_is_split_at_max_length():
+    machine, at = make_machine(max_length=60)
+    at(0, True)
+    for t in range(1, 60):
+        assert at(t, True) is None, t
+    assert at(60, True) == SPLIT and machine.state == RECORDING
+    assert machine.clip_seconds() == 0
+    assert at(119, True) is None and at(120, True) == SPLIT
+
+
+def test_resume_past_max_length_splits():
+    machine, at = make_machine(post_roll=5, max_length=60, merge_window=10)
+    at(0, True)
+    at(50, True)
+    assert at(55) == PAUSE
+    assert at(61, True) == SPLIT and machine.state == RECORDING
+    assert machine.clip_seconds() == 0
+
+
+def test_disarming_closes_any_open_clip():
+    machine, at = make_machine()
+    assert at(0, True, armed=False) is None and machine.state == IDLE
+    at(1, True)
+    assert at(2, True, armed=False) == STOP and machine.state == IDLE
+    at(3, True)
+    assert at(8) == PAUSE
+    assert at(9, armed=False) == STOP and machine.state == IDLE
+
+
+def test_counts_every_action():
+    machine, at = make_machine(post_roll=5, max_length=60, merge_window=10)
+    at(0, True)      # START
+    at(5)            # PAUSE
+    at(6, True)      # RESUME
+    at(11)           # PAUSE
+    at(21)           # STOP
+    at(30, True)     # START
+    at(90, True)     # SPLIT
+    assert machine.counts == {START: 2, PAUSE: 2, RESUME: 1, SPLIT: 1, STOP: 1}
@@ -0,0 +1,54 @@
+# Settings endpoints and persistence (app.py, state_manager.py): bad input is rejected before it is
+# stored, and flush() writes a pending change that the daemon persist thread might not get to.
+import json
+
+import pytest
+
+import app as app_module
+import config
+import state_manager
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_manager, 'STATE_FILE', str(tmp_path / 'system_state.json'))
+    monkeypatch.setattr(state_manager, 'state', {"isArmed": False, "motion_sensitivity": 3})
+    # Saved only by flush(), never by a persist thread that could outlive the patched STATE_FILE
+    monkeypatch.setattr(state_manager, '_schedule_save', state_manager._dirty.set)
+    yield tmp_path / 'system_state.json'
+    state_manager._dirty.clear()
+
+
+@pytest.fixture
+def client(state, monkeypatch):
+    monkeypatch.setitem(app_module.camera_channels, 'cam0', object())
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('value', ['high', None, True, 2.5, -1, config.MOTION_SENSITIVITY_MAX + 1])
+def test_bad_sensitivity_is_rejected_and_not_stored(client, value):
+    assert client.post('/api/set_sensitivity', json={'sensitivity': value}).status_code == 400
+    assert client.post('/api/cameras/cam0/settings', json={'sensitivity': value, 'isArmed': True}).status_code == 400
+    assert state_manager.state == {"isArmed": False, "motion_sensitivity": 3}
+
+
+def test_body_must_be_a_json_object(client):
+    assert client.post('/api/set_sensitivity', data='5', content_type='application/json').status_code == 400
+    assert client.post('/api/cameras/cam0/settings', data='oops', content_type='text/plain').status_code == 400
+
+
+def test_whole_number_sensitivity_is_stored_as_int(client):
+    assert client.post('/api/set_sensitivity', json={'sensitivity': 4.0}).status_code == 200
+    assert client.post('/api/cameras/cam0/settings', json={'sensitivity': 0}).get_json()["motion_sensitivity"] == 0
+    assert state_manager.get_motion_sensitivity() == 4
+    assert type(state_manager.get_motion_sensitivity()) is int
+
+
+def test_flush_writes_a_pending_change(state):
+    state_manager.set_armed_status(True)
+    assert not state.exists()
+    state_manager.flush()
+    assert json.loads(state.read_text()) == {"isArmed": True, "motion_sensitivity": 3}
+    state.unlink()
+    state_manager.flush()   # Nothing changed since
+    assert not state.exists()
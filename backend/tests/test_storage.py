@@ -0,0 +1,84 @@
+# Retention and disk quota (storage.py) against a fake disk made of the clip folders.
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import config
+import storage
+from models import db, Clip
+
+Usage = namedtuple('Usage', 'total used free')
+
+
+class FakeDiskStorage(storage.StorageManager):
+    """Disk of `total` bytes holding `other` bytes plus the clip folders, hard links counted once"""
+
+    def __init__(self, app, total, other=0, **kwargs):
+        super().__init__(app, **kwargs)
+        self.total = total
+        self.other = other
+        self.root = os.path.dirname(config.CLIPS_FOLDER)
+
+    def disk_usage(self):
+        inodes = {}
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                stat = os.stat(os.path.join(folder, name))
+                inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+        used = self.other + sum(inodes.values())
+        return Usage(self.total, used, self.total - used)
+
+
+def add_clip(minutes_ago, size, linked=True):
+    """Record a clip of `size` bytes (stream copy hard-linked like the ffmpeg backend) and index it"""
+    started = datetime.now() - timedelta(minutes=minutes_ago)
+    name = f"motion_{started:%Y-%m-%d_%H-%M-%S}.mp4"
+    stream_path = os.path.join(config.STREAM_FOLDER, name)
+    with open(stream_path, 'wb') as file:
+        file.write(b'\0' * size)
+    if linked:
+        os.link(stream_path, os.path.join(config.CLIPS_FOLDER, name))
+    db.session.add(Clip(file_path=name, date=f"{started:%Y-%m-%d}", time=f"{started:%H:%M:%S}",
+                        image_filename=name.replace('motion', 'image').replace('.mp4', '.jpg'),
+                        camera_id='cam0', started_at=started, size=size))
+    db.session.commit()
+    return name
+
+
+def test_hard_linked_clip_counts_once(clip_folders):
+    name = 'motion_2025-01-01_00-00-00.mp4'
+    with open(os.path.join(config.STREAM_FOLDER, name), 'wb') as file:
+        file.write(b'\0' * 1000)
+    os.link(os.path.join(config.STREAM_FOLDER, name), os.path.join(config.CLIPS_FOLDER, name))
+    assert storage.delete_clip_files(name) == 1000
+    assert os.listdir(config.CLIPS_FOLDER) == os.listdir(config.STREAM_FOLDER) == []
+    assert storage.delete_clip_files(name) is None
+
+
+def test_quota_frees_down_to_the_low_watermark(clip_folders, clip_db):
+    names = [add_clip(100 - i, 10_000) for i in range(10)]   # Oldest first
+    manager = FakeDiskStorage(clip_db, total=110_000, other=5_000, high=0.9, low=0.5)   # 95% full
+    manager.enforce()
+    disk = manager.disk_usage()
+    assert disk.used <= 0.5 * disk.total
+    remaining = [clip.file_path for clip in Clip.query.order_by(Clip.started_at).all()]
+    assert remaining == names[-len(remaining):] and len(remaining) == 5
+    assert manager.deleted["quota"] == 5
+    assert manager.freed == 50_000
+
+
+def test_below_the_high_watermark_deletes_nothing(clip_folders, clip_db):
+    for i in range(3):
+        add_clip(10 - i, 10_000)
+    manager = FakeDiskStorage(clip_db, total=100_000, high=0.9, low=0.5)
+    manager.enforce()
+    assert Clip.query.count() == 3
+
+
+def test_retention_deletes_expired_clips(clip_folders, clip_db):
+    add_clip(3 * 24 * 60, 1_000)
+    kept = add_clip(10, 1_000, linked=False)
+    manager = FakeDiskStorage(clip_db, total=1_000_000, retention_days=2)
+    manager.enforce()
+    assert [clip.file_path for clip in Clip.query.all()] == [kept]
+    assert manager.deleted == {"expired": 1, "quota": 0}
@@ -0,0 +1,83 @@
+# Live view fan-out (stream_hub.py): tiers, idle tier pruning and per-viewer mailboxes.
+import numpy as np
+import pytest
+
+import stream_hub
+from frame_buffer import SharedFrameBuffer
+from stream_hub import FrameHub, StreamTier, Subscriber, make_tier, DROP_OLDEST, LATEST_ONLY
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameBuffer.for_frames(320, 240)
+    yield ring
+    ring.close()
+
+
+@pytest.fixture
+def hub(ring):
+    hub = FrameHub(ring)
+    yield hub
+    for sub in list(hub.subscribers):
+        hub.unsubscribe(sub)
+    if hub.pump_thread is not None:
+        hub.pump_thread.join(timeout=3)
+
+
+def test_make_tier_clamps_values():
+    assert make_tier('low') == StreamTier(320, 50, 5)
+    assert make_tier(width=50, quality=500, fps=1000) == StreamTier(stream_hub.MIN_TIER_WIDTH, 100, 20)
+    assert make_tier(width=333).width == 328   # Multiple of 8
+    with pytest.raises(ValueError):
+        make_tier('ultra')
+
+
+def test_idle_tiers_are_pruned_oldest_first(hub, monkeypatch):
+    monkeypatch.setattr(stream_hub, 'MAX_IDLE_TIERS', 2)
+    watching = hub.subscribe(tier=make_tier(width=640))
+    for width in (160, 240, 320, 400):
+        hub.unsubscribe(hub.subscribe(tier=make_tier(width=width)))
+    assert sorted(tier.width for tier in hub.tiers) == [320, 400, 640]   # Two idle, plus the watched one
+    assert hub.tiers[watching.tier].viewers == 1
+
+
+def test_tiers_being_encoded_are_not_pruned(hub, monkeypatch):
+    monkeypatch.setattr(stream_hub, 'MAX_IDLE_TIERS', 0)
+    keep = make_tier(width=160)
+    sub = hub.subscribe(tier=keep)
+    hub.encoding = {keep}   # The pump is encoding a frame for it right now
+    hub.unsubscribe(sub)
+    assert keep in hub.tiers
+    hub.encoding = set()
+    hub.unsubscribe(hub.subscribe(tier=make_tier(width=240)))
+    assert hub.tiers == {}
+
+
+def test_pruned_tier_is_skipped_by_the_encoder(hub):
+    frame = np.zeros((240, 320, 3), np.uint8)
+    gone = make_tier(width=160)
+    assert hub._encode_due(frame, {gone: [Subscriber()]}, now=0.0) == []
+
+
+def test_each_tier_is_encoded_once_per_frame(hub, ring):
+    low, high = make_tier(width=160, quality=50), make_tier()
+    viewers = [hub.subscribe(tier=low), hub.subscribe(tier=low), hub.subscribe(tier=high)]
+    ring.write(np.full((240, 320, 3), 100, np.uint8))
+    parts = [viewer.get(timeout=5) for viewer in viewers]
+    assert all(part is not None and part.startswith(b'--frame\r\n') for part in parts)
+    assert parts[0] is parts[1]              # Same bytes object for viewers on one tier
+    assert len(parts[2]) > len(parts[0])
+    assert hub.tiers[low].frames == hub.tiers[high].frames == 1
+
+
+def test_subscriber_policies():
+    latest = Subscriber(LATEST_ONLY)
+    queued = Subscriber(DROP_OLDEST, depth=2)
+    for part in (b'1', b'2', b'3'):
+        latest.offer(part)
+        queued.offer(part)
+    assert latest.get(0) == b'3' and latest.dropped == 2
+    assert [queued.get(0), queued.get(0)] == [b'2', b'3'] and queued.dropped == 1
+    assert queued.get(0) is None
+    queued.close()
+    assert queued.get(5) is None   # Closed, returns at once
@@ -0,0 +1,70 @@
+# Snapshot sizes and their byte-bounded LRU cache (thumbnails.py).
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import config
+import thumbnails
+from thumbnails import ThumbnailCache
+
+IMAGE = 'image_2025-01-01_00-00-00.jpg'
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    cache = ThumbnailCache(max_bytes=30)
+    cache.put('a', b'x' * 10)
+    cache.put('b', b'x' * 10)
+    cache.put('c', b'x' * 10)
+    assert cache.get('a') is not None   # Now the most recently used
+    cache.put('d', b'x' * 10)
+    assert cache.get('b') is None
+    assert [cache.get(key) is not None for key in 'acd'] == [True, True, True]
+    assert cache.nbytes == 30
+    cache.put('a', b'x' * 5)   # Replacing an entry frees the old bytes
+    assert cache.nbytes == 25
+    cache.put('huge', b'x' * 31)   # Larger than the whole budget, not cached
+    assert cache.get('huge') is None and cache.nbytes == 25
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_discard_prefix():
+    cache = ThumbnailCache(max_bytes=100)
+    cache.put((IMAGE, 'thumb', 'jpeg'), b'x' * 10)
+    cache.put((IMAGE, 'preview', 'webp'), b'x' * 10)
+    cache.put(('other.jpg', 'thumb', 'jpeg'), b'x' * 10)
+    cache.discard_prefix(IMAGE)
+    assert list(cache.items) == [('other.jpg', 'thumb', 'jpeg')] and cache.nbytes == 10
+
+
+@pytest.fixture
+def snapshot(clip_folders, monkeypatch):
+    monkeypatch.setattr(thumbnails, 'cache', ThumbnailCache(1024 * 1024))
+    image = np.full((480, 640, 3), 128, np.uint8)
+    cv2.imwrite(os.path.join(config.IMAGES_FOLDER, IMAGE), image)
+    return image
+
+
+def width_of(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR).shape[1]
+
+
+def test_sizes_are_built_on_request_and_cached(snapshot):
+    data = thumbnails.get_thumbnail(IMAGE, 'thumb')
+    assert width_of(data) == config.THUMBNAIL_SIZES['thumb']
+    assert os.path.exists(thumbnails.thumbnail_path(IMAGE, 'thumb'))
+    assert thumbnails.get_thumbnail(IMAGE, 'thumb') is data   # Served from memory the second time
+    assert width_of(thumbnails.get_thumbnail(IMAGE, 'full')) == 640
+    assert thumbnails.get_thumbnail('image_missing.jpg', 'thumb') is None
+
+
+def test_generate_and_remove(snapshot):
+    thumbnails.generate_thumbnails(snapshot, IMAGE)
+    stored = os.listdir(config.THUMBNAILS_FOLDER)
+    assert sorted(stored) == sorted(os.path.basename(thumbnails.thumbnail_path(IMAGE, size))
+                                    for size in config.THUMBNAIL_SIZES)
+    thumbnails.get_thumbnail(IMAGE, 'preview')
+    freed = thumbnails.remove_thumbnails(IMAGE)
+    assert freed > 0 and os.listdir(config.THUMBNAILS_FOLDER) == []
+    assert thumbnails.cache.nbytes == 0
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import config
+
+# ============================== #
+#     Snapshot thumbnails        #
+# ============================== #
+# Every event snapshot is available in the sizes of config.THUMBNAIL_SIZES
+# ('full' is the original). Sizes are written next to the snapshot when the
+# clip is created, or built on first request, and kept in an in-memory LRU
+# cache bounded by bytes.
+FULL = 'full'
+FORMATS = {'jpeg': ('.jpg', 'image/jpeg'), 'webp': ('.webp', 'image/webp')}
+
+
+class ThumbnailCache:
+    """LRU cache of encoded images bounded by total bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self.items[key] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self.items.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def discard_prefix(self, prefix):
+        with self.lock:
+            for key in [key for key in self.items if key[0] == prefix]:
+                self.nbytes -= len(self.items.pop(key))
+
+
+cache = ThumbnailCache(config.THUMBNAIL_CACHE_BYTES)
+
+
+def thumbnail_path(image_filename, size, fmt='jpeg'):
+    stem = os.path.splitext(image_filename)[0]
+    return os.path.join(config.THUMBNAILS_FOLDER, f"{stem}_{size}{FORMATS[fmt][0]}")
+
+
+def _encode(image, fmt):
+    import cv2
+    if fmt == 'webp':
+        ok, buffer = cv2.imencode('.webp', image, [cv2.IMWRITE_WEBP_QUALITY, config.THUMBNAIL_QUALITY])
+    else:
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, config.THUMBNAIL_QUALITY])
+    return buffer.tobytes() if ok else None
+
+
+def _resize(image, width):
+    import cv2
+    height, original_width = image.shape[:2]
+    if width is None or original_width <= width:
+        return image
+    return cv2.resize(image, (width, int(round(height * width / original_width))), interpolation=cv2.INTER_AREA)
+
+
+def _write(path, data):
+    # Unique temp name: two requests missing the same size may build it at once
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as file:
+        file.write(data)
+    try:
+        os.chmod(file.name, 0o644)   # mkstemp makes it owner-only
+        os.replace(file.name, path)
+    except OSError:
+        os.remove(file.name)
+        raise
+
+
+def generate_thumbnails(image, image_filename):
+    """Write every configured size of a freshly saved snapshot (called when a clip starts)"""
+    os.makedirs(config.THUMBNAILS_FOLDER, exist_ok=True)
+    formats = ['jpeg', 'webp'] if config.THUMBNAIL_WEBP else ['jpeg']
+    for size, width in config.THUMBNAIL_SIZES.items():
+        resized = _resize(image, width)
+        for fmt in formats:
+            data = _encode(resized, fmt)
+            if data is not None:
+                _write(thumbnail_path(image_filename, size, fmt), data)
+
+
+def get_thumbnail(image_filename, size, fmt='jpeg'):
+    """Encoded bytes of a snapshot size, from cache, disk, or built now; None if the snapshot is missing"""
+    key = (image_filename, size, fmt)
+    data = cache.get(key)
+    if data is not None:
+        return data
+    path = thumbnail_path(image_filename, size, fmt)
+    if os.path.exists(path):
+        with open(path, 'rb') as file:
+            data = file.read()
+    else:
+        import cv2   # Only on a cache miss, the web server does not load OpenCV at start-up
+        image = cv2.imread(os.path.join(config.IMAGES_FOLDER, image_filename))
+        if image is None:
+            return None
+        data = _encode(_resize(image, config.THUMBNAIL_SIZES.get(size)), fmt)
+        if data is None:
+            return None
+        os.makedirs(config.THUMBNAILS_FOLDER, exist_ok=True)
+        _write(path, data)
+    cache.put(key, data)
+    return data
+
+
+def remove_thumbnails(image_filename):
+    """Delete every stored size of a snapshot, return the bytes freed"""
+    cache.discard_prefix(image_filename)
+    freed = 0
+    for size in [*config.THUMBNAIL_SIZES, FULL]:
+        for fmt in FORMATS:
+            path = thumbnail_path(image_filename, size, fmt)
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return freed
@@ -0,0 +1,136 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+# ============================== #
+#     Background transcoding     #
+# ============================== #
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+REJECTED = 'rejected'   # Job queue was full
+
+
+class TranscodeJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, input_path, output_path, on_done=None, on_failed=None):
+        self.id = next(self._ids)
+        self.input_path = input_path
+        self.output_path = output_path
+        self.on_done = on_done
+        self.on_failed = on_failed
+        self.status = QUEUED
+        self.attempts = 0
+        self.error = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "input": self.input_path,
+            "output": self.output_path,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "wait_time": (self.started_at - self.queued_at) if self.started_at else None,
+            "run_time": (self.finished_at - self.started_at) if self.finished_at and self.started_at else None,
+        }
+
+
+class TranscodePool:
+    """Bounded job queue served by a few worker threads running ffmpeg at low priority
+
+    `convert(input_path, output_path, niceness)` does the actual work and
+    returns True on success. `on_status(job_dict)` is called on every state
+    change so the caller can forward progress, and the job's own `on_done`
+    only fires once the output file is ready. Its `on_failed` fires instead
+    when the job is rejected or runs out of retries, so the input is never
+    left without anyone knowing.
+    """
+
+    def __init__(self, convert, workers=1, queue_size=8, niceness=10, retries=2, on_status=None, history=50):
+        self.convert = convert
+        self.niceness = niceness
+        self.retries = retries
+        self.on_status = on_status
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.history = OrderedDict()
+        self.history_size = history
+        self.lock = threading.Lock()
+        for i in range(max(1, workers)):
+            threading.Thread(target=self._worker, name=f"transcode-{i}", daemon=True).start()
+
+    def submit(self, input_path, output_path, on_done=None, on_failed=None):
+        """Queue a conversion without blocking, the job is rejected (`on_failed` runs now) if the queue is full"""
+        job = TranscodeJob(input_path, output_path, on_done, on_failed)
+        self._remember(job)
+        if not self.jobs.full():
+            self._set_status(job, QUEUED)
+            try:
+                self.jobs.put_nowait(job)
+                return job
+            except queue.Full:
+                pass
+        job.error = "transcode queue full"
+        print(f"❌ Transcode queue full, keeping unconverted clip: {input_path}")
+        self._finish(job, REJECTED)
+        return job
+
+    def status(self):
+        """Snapshot of recent jobs, newest last"""
+        with self.lock:
+            return [job.to_dict() for job in self.history.values()]
+
+    def pending(self):
+        return self.jobs.qsize()
+
+    def _remember(self, job):
+        with self.lock:
+            self.history[job.id] = job
+            while len(self.history) > self.history_size:
+                self.history.popitem(last=False)
+
+    def _set_status(self, job, status):
+        job.status = status
+        if self.on_status is not None:
+            try:
+                self.on_status(job.to_dict())
+            except Exception as e:
+                print(f"❌ Transcode status callback failed: {e}")
+
+    def _finish(self, job, status):
+        """Set the final status and run the job's callback for it"""
+        self._set_status(job, status)
+        callback = job.on_done if status == DONE else job.on_failed
+        if callback is not None:
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"❌ Transcode {status} callback failed: {e}")
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            job.started_at = time.time()
+            self._set_status(job, RUNNING)
+            ok = False
+            while not ok and job.attempts <= self.retries:
+                job.attempts += 1
+                try:
+                    ok = self.convert(job.input_path, job.output_path, self.niceness)
+                except Exception as e:
+                    job.error = str(e)
+                    ok = False
+                if not ok and job.attempts <= self.retries:
+                    time.sleep(min(2 ** job.attempts, 30))   # Back off before retrying
+            job.finished_at = time.time()
+            if ok:
+                job.error = None
+            self._finish(job, DONE if ok else FAILED)
+            self.jobs.task_done()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { FaTrash } from 'react-icons/fa';  // Import trash icon
 import { FaDownload } from 'react-icons/fa';  // Import download icon
 import { io } from 'socket.io-client';
@@ -6,16 +6,63 @@ import { io } from 'socket.io-client';
 export default function ClipsList() {
     const [clips, setClips] = useState([]);
     const [selectedVideo, setSelectedVideo] = useState(null);  // Video selected for playback
+    const [nextCursor, setNextCursor] = useState(null);  // Cursor of the next page, null when done
+    const [sort, setSort] = useState('time');  // 'time' (newest first) or 'motion' (most motion first)
+    const [peakTime, setPeakTime] = useState(null);  // Peak-motion moment of the selected clip, from its timeline
+    const lastEvent = useRef(null);  // { boot, seq } of the last server event, sent back on reconnect
+    const sortRef = useRef(sort);  // Current sort for the socket handlers, which are set up only once
+    const hasMoreRef = useRef(false);  // Whether pages are left to load, for the socket handlers too
 
-    useEffect(() => {
-        fetch(`${process.env.REACT_APP_API_BASE_URL}/api/clips`)
+    // Fetch one page of clips (newest or most motion first) from the server-side index
+    const loadClips = (cursor, sortKey = sort) => {
+        const params = `?sort=${sortKey}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+        fetch(`${process.env.REACT_APP_API_BASE_URL}/api/clips${params}`)
             .then(res => res.json())
-            .then(setClips)
+            .then(data => {
+                setClips((prevClips) => cursor ? [...prevClips, ...data.clips] : data.clips);
+                setNextCursor(data.next_cursor);
+                hasMoreRef.current = Boolean(data.next_cursor);
+            })
             .catch(error => console.error('Error fetching clips:', error));
+    };
+
+    useEffect(() => {
+        loadClips(null);
         // Connect to WebSocket for real-time updates
         const socket = io(process.env.REACT_APP_API_BASE_URL);
         socket.on('new_clip', (newClip) => {
-            setClips((prevClips) => [newClip, ...prevClips]); // Add new clips at the top
+            lastEvent.current = { boot: newClip.boot, seq: newClip.seq };
+            setClips((prevClips) => {
+                if (prevClips.some(clip => clip.video_filename === newClip.video_filename)) return prevClips;
+                if (sortRef.current !== 'motion') return [newClip, ...prevClips]; // Add new clips at the top
+                // Most motion first: insert by score, ahead of equal scores like the server's newest-id tie-break
+                const score = newClip.motion_score || 0;
+                const index = prevClips.findIndex(clip => clip.motion_score <= score);
+                if (index === -1) {
+                    // Below every loaded clip: a page still to load brings it, unless this was the last page
+                    return hasMoreRef.current ? prevClips : [...prevClips, newClip];
+                }
+                return [...prevClips.slice(0, index), newClip, ...prevClips.slice(index)];
+            });
+        });
+        // Clips removed by the server's retention and disk quota
+        socket.on('clips_deleted', (event) => {
+            lastEvent.current = { boot: event.boot, seq: event.seq };
+            const deleted = new Set(event.video_filenames);
+            setClips((prevClips) => prevClips.filter(clip => !deleted.has(clip.video_filename)));
+        });
+        // Catch up on events missed while disconnected, or reload if the server can't replay them
+        socket.on('connect', () => {
+            if (lastEvent.current) {
+                socket.emit('resume', { boot: lastEvent.current.boot, since: lastEvent.current.seq });
+            }
+        });
+        socket.on('position', (position) => {
+            if (!lastEvent.current) lastEvent.current = position;  // Start of the event stream for this page
+        });
+        socket.on('resync', (position) => {
+            lastEvent.current = position;
+            loadClips(null, sortRef.current);
         });
 
         return () => socket.disconnect();
@@ -52,7 +99,15 @@ export default function ClipsList() {
         return sortedGrouped;
     };
 
-    const groupedClips = groupByDate(clips);
+    // Sorted by motion the server order is kept, grouping by date would undo it
+    const groupedClips = sort === 'motion' ? (clips.length ? { 'Most motion first': clips } : {}) : groupByDate(clips);
+
+    const handleSortChange = () => {
+        const nextSort = sort === 'time' ? 'motion' : 'time';
+        sortRef.current = nextSort;
+        setSort(nextSort);
+        loadClips(null, nextSort);
+    };
 
     const handleDelete = async (filename) => {
         await fetch(`${process.env.REACT_APP_API_BASE_URL}/api/delete_clip/${filename}`, { method: 'DELETE' });
@@ -68,14 +123,35 @@ export default function ClipsList() {
         link.click();
         document.body.removeChild(link);
     };
-    const handleImageClick = (videoFilename) => {
+    const handleImageClick = (clip) => {
         // Toggle video playback when image is clicked
-        setSelectedVideo(selectedVideo === videoFilename ? null : videoFilename);
+        const selecting = selectedVideo !== clip.video_filename;
+        setSelectedVideo(selecting ? clip.video_filename : null);
+        setPeakTime(null);
+        if (selecting && clip.id) {
+            // The motion timeline is a few KB, no need to decode the video to find the action
+            fetch(`${process.env.REACT_APP_API_BASE_URL}/api/clips/${clip.id}/timeline`)
+                .then(res => res.ok ? res.json() : null)
+                .then(timeline => {
+                    if (timeline && timeline.summary.samples > 0) setPeakTime(timeline.summary.peak_time);
+                })
+                .catch(() => {});  // Clips recorded before timelines existed just play from the start
+        }
+    };
+    // Start playback at the peak-motion moment once both the video and its timeline are there
+    const seekToPeak = (video) => {
+        if (video && peakTime !== null && video.readyState >= 1 && video.dataset.peak !== String(peakTime)) {
+            video.currentTime = peakTime;
+            video.dataset.peak = String(peakTime);
+        }
     };
 
     return (
         <div style={styles.container}>
             <h2>Recorded Clips</h2>
+            <button style={styles.sortButton} onClick={handleSortChange}>
+                {sort === 'time' ? 'Sort by motion' : 'Sort by time'}
+            </button>
             {/*{clips.length === 0 && <p>No clips available</p>}*/}
             {Object.keys(groupedClips).length === 0 && <p>No clips available</p>}
 
@@ -88,18 +164,24 @@ export default function ClipsList() {
                             {/* Timestamp Display */}
                             <div style={styles.infoContainer}>
                                 <p style={styles.timestamp}>{clip.timestamp}</p>
+                                {clip.motion_score > 0 && (
+                                    <p style={styles.motionScore}>Motion {(100 * clip.motion_score).toFixed(1)}%</p>
+                                )}
                             </div>
                             {/* Thumbnail Image */}
                             <img
-                                src={`${process.env.REACT_APP_API_BASE_URL}/api/image/${clip.image_filename}`}
+                                src={`${process.env.REACT_APP_API_BASE_URL}/api/image/${clip.image_filename}?size=thumb&format=auto`}
                                 alt="Captured Image"
+                                loading="lazy"
+                                decoding="async"
                                 style={styles.imagePreview}
-                                onClick={() => handleImageClick(clip.video_filename)}
+                                onClick={() => handleImageClick(clip)}
                                 //onClick={() => setSelectedVideo(clip.video_filename)}  // Click image to play video
                             />
                             {/* Playable Video (if selected) */}
                             {selectedVideo === clip.video_filename && (
-                                <video controls width="320" height="240" autoPlay>
+                                <video controls width="320" height="240" autoPlay
+                                       ref={seekToPeak} onLoadedMetadata={(e) => seekToPeak(e.target)}>
                                     <source
                                         src={`${process.env.REACT_APP_API_BASE_URL}/api/video/${clip.video_filename}`}
                                         type="video/mp4"
@@ -128,6 +210,11 @@ export default function ClipsList() {
                     ))}
                 </div>
             ))}
+            {nextCursor && (
+                <button style={styles.loadMoreButton} onClick={() => loadClips(nextCursor)}>
+                    Load more
+                </button>
+            )}
         </div>
     );
 }
@@ -176,6 +263,11 @@ const styles = {
         color: '#4CAF50',
         marginBottom: '5px'
     },
+    motionScore: {
+        fontSize: '12px',
+        color: '#666',
+        margin: '0 0 5px 0'
+    },
     imagePreview: {
         width: '100px',
         height: 'auto',
@@ -218,5 +310,23 @@ const styles = {
     },
     icon: {
         fontSize: '18px'
+    },
+    loadMoreButton: {
+        backgroundColor: '#4CAF50',
+        color: '#fff',
+        border: 'none',
+        padding: '8px 16px',
+        borderRadius: '5px',
+        cursor: 'pointer',
+        width: '100%'
+    },
+    sortButton: {
+        backgroundColor: '#fff',
+        color: '#4CAF50',
+        border: '1px solid #4CAF50',
+        padding: '4px 10px',
+        borderRadius: '5px',
+        cursor: 'pointer',
+        marginBottom: '10px'
     }
 };
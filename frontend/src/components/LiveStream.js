@@ -1,22 +1,164 @@
-import React from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+import { io } from 'socket.io-client';
+
+// Codec of the H.264 live view (baseline profile, see backend/live_h264.py)
+const H264_CODEC = 'video/mp4; codecs="avc1.42E01F"';
+const h264Supported = () => window.MediaSource && MediaSource.isTypeSupported(H264_CODEC);
+
+// Pick a live view quality tier (see STREAM_TIERS in backend/config.py) for this device
+function streamTier() {
+    const connection = navigator.connection;
+    if (connection && (connection.saveData || ['slow-2g', '2g', '3g'].includes(connection.effectiveType))) {
+        return 'low';
+    }
+    return window.innerWidth * (window.devicePixelRatio || 1) < 1000 ? 'medium' : 'high';
+}
+
+// Plays the fragmented MP4 live stream through Media Source Extensions
+function H264Player({ url, onError }) {
+    const videoRef = useRef(null);
+
+    useEffect(() => {
+        const video = videoRef.current;
+        const mediaSource = new MediaSource();
+        const controller = new AbortController();
+        const pending = [];
+        let sourceBuffer = null;
+        video.src = URL.createObjectURL(mediaSource);
+
+        const append = () => {
+            if (sourceBuffer && !sourceBuffer.updating && pending.length) {
+                sourceBuffer.appendBuffer(pending.shift());
+            }
+        };
+
+        mediaSource.addEventListener('sourceopen', async () => {
+            sourceBuffer = mediaSource.addSourceBuffer(H264_CODEC);
+            sourceBuffer.mode = 'sequence';  // Play through fragments the server skipped
+            sourceBuffer.addEventListener('updateend', () => {
+                const buffered = video.buffered;
+                if (buffered.length) {
+                    const liveEdge = buffered.end(buffered.length - 1);
+                    if (liveEdge - video.currentTime > 1.5) {
+                        video.currentTime = liveEdge - 0.2;  // Fell behind, jump back to live
+                    }
+                    if (!pending.length && video.currentTime - buffered.start(0) > 10) {
+                        sourceBuffer.remove(buffered.start(0), video.currentTime - 5);  // Keep memory bounded
+                        return;
+                    }
+                }
+                append();
+            });
+            try {
+                const response = await fetch(url, { signal: controller.signal });
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                const reader = response.body.getReader();
+                for (;;) {
+                    const { done, value } = await reader.read();
+                    if (done) throw new Error('Live stream ended');
+                    pending.push(value);
+                    append();
+                }
+            } catch (error) {
+                if (!controller.signal.aborted) onError(error);
+            }
+        });
+
+        return () => {
+            controller.abort();
+            URL.revokeObjectURL(video.src);
+        };
+    }, [url, onError]);
+
+    return (
+        <video ref={videoRef} autoPlay muted playsInline
+               style={{ width: '100%', height: 'auto', border: '2px solid #4CAF50' }} />
+    );
+}
+
+// Recording state, motion and brightness of the live camera, drawn here instead of into every frame
+// (see OVERLAY_PREVIEW and the camera_status event in the backend)
+function CameraStatus() {
+    const [cameraId, setCameraId] = useState(null);  // The live view shows the first camera
+    const [statuses, setStatuses] = useState({});
+
+    useEffect(() => {
+        fetch(`${process.env.REACT_APP_API_BASE_URL}/api/cameras`)
+            .then(res => res.json())
+            .then(cameras => { if (cameras.length) setCameraId(cameras[0].id); })
+            .catch(error => console.error('Error fetching cameras:', error));
+        const socket = io(process.env.REACT_APP_API_BASE_URL);
+        socket.on('camera_status', (status) => {
+            setStatuses((prev) => ({ ...prev, [status.camera_id]: status }));
+        });
+        return () => socket.disconnect();
+    }, []);
+
+    const status = statuses[cameraId];
+    if (!status) return null;
+    return (
+        <div style={status.state === 'REC' ? { ...styles.status, ...styles.recording } : styles.status}>
+            {status.state} Motion: {status.motion}({status.sensitivity})<br />
+            Brightness: {status.brightness}
+        </div>
+    );
+}
 
 export default function LiveStream() {
+    const [useH264, setUseH264] = useState(h264Supported());
+    const [h264Error, setH264Error] = useState(null);
+
+    useEffect(() => {
+        if (h264Error) console.warn('H.264 live view unavailable, using MJPEG:', h264Error);
+    }, [h264Error]);
+
+    const h264 = useH264 && !h264Error;
     return (
         <div style={styles.container}>
             {/*<h3>Live Video Stream</h3>*/}
-            <img
-                src={`${process.env.REACT_APP_API_BASE_URL}/api/video_stream`}
-                alt="Live Stream"
-                style={{ width: '100%', height: 'auto', border: '2px solid #4CAF50' }}
-            />
+            <CameraStatus />
+            {h264 ? (
+                <H264Player url={`${process.env.REACT_APP_API_BASE_URL}/api/live.mp4`} onError={setH264Error} />
+            ) : (
+                <img
+                    src={`${process.env.REACT_APP_API_BASE_URL}/api/video_stream?tier=${streamTier()}`}
+                    alt="Live Stream"
+                    style={{ width: '100%', height: 'auto', border: '2px solid #4CAF50' }}
+                />
+            )}
+            {h264Supported() && (
+                <button style={styles.modeButton} onClick={() => { setH264Error(null); setUseH264(!h264); }}>
+                    {h264 ? 'H.264' : 'MJPEG'}
+                </button>
+            )}
         </div>
     );
 }
 const styles = {
     container: {
+        position: 'relative',  // Anchors the status overlay
         backgroundColor: '#d1d1d1', // Light grey background for the header
         padding: '1px',
         alignItems: 'center',
         margin: '1px 0'
+    },
+    status: {
+        position: 'absolute',
+        top: '40px',
+        left: '10px',
+        color: '#0f0',
+        fontFamily: 'sans-serif',
+        fontSize: '14px',
+        textShadow: '0 0 3px #000',
+        pointerEvents: 'none'
+    },
+    recording: {
+        color: '#f44'
+    },
+    modeButton: {
+        fontSize: '12px',
+        padding: '2px 8px',
+        margin: '2px',
+        cursor: 'pointer'
     }
-};
\ No newline at end of file
+};
@@ -76,7 +76,7 @@ $VENV_SOURCE
 
 # Start Flask backend
 cd $PROJECT_PATH/backend || exit 1
-nohup $PYTHON_CMD app.py > backend.log 2>&1 &
+nohup $PYTHON_CMD server.py > backend.log 2>&1 &
 
 # Start React frontend
 cd $PROJECT_PATH/frontend || exit 1
@@ -100,7 +100,7 @@ Type=simple
 User=$USER_NAME
 WorkingDirectory=$PROJECT_PATH/backend
 
-ExecStart=/usr/bin/python3 $PROJECT_PATH/backend/app.py
+ExecStart=/usr/bin/python3 $PROJECT_PATH/backend/server.py
 
 Restart=always
 RestartSec=5
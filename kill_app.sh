@@ -1,9 +1,34 @@
 #!/bin/bash
 
-# Kills processes whose command contains "app.py"
-ps aux | grep "app.py" | grep -v grep | awk '{print $2}' | xargs -r kill -9
+# Every descendant of a process: detectors restarted by server.py are forked by its
+# forkserver, so they are grandchildren and `pkill -P` on the server alone misses them
+descendants() {
+    for child in $(pgrep -P "$1"); do
+        echo "$child"
+        descendants "$child"
+    done
+}
+
+# Asks a server to stop (SIGTERM: it stops its detectors and releases the camera),
+# then kills whatever is left of it and its descendants after 5 seconds
+stop_server() {
+    local pid=$1
+    local tree
+    tree=$(descendants "$pid")
+    kill -TERM "$pid" 2>/dev/null
+    for _ in $(seq 1 10); do
+        kill -0 "$pid" 2>/dev/null || break
+        sleep 0.5
+    done
+    kill -9 "$pid" $tree 2>/dev/null
+}
+
+# Stops processes whose command contains "app.py" or "server.py", with their detector processes
+for pid in $(ps aux | grep -E "app.py|server.py" | grep -v grep | awk '{print $2}'); do
+    stop_server "$pid"
+done
 
 # Kills processes whose command contains "serve -s"
 ps aux | grep "serve -s" | grep -v grep | awk '{print $2}' | xargs -r kill -9
 
-echo "Processes containing 'app.py' or 'serve -s' have been killed."
+echo "Processes containing 'app.py', 'server.py' or 'serve -s' have been killed."